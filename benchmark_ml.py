@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+ML EEG Analysis Benchmarks
+Measures latency and memory of the ML models against signal length
+
+Usage:
+    python benchmark_ml.py transformer [--lengths 2560 7680 ...] [--repeats 3]
+    python benchmark_ml.py features [--signals 256] [--length 2560] [--workers 1 4 8]
+    python benchmark_ml.py backends [--lengths 2560 7680] [--batch-sizes 1 8] [--transformer-patch-size 32]
+    python benchmark_ml.py quantization [--signals 100] [--length 2560] [--modes linear full]
+    python benchmark_ml.py cascade [--signals 100] [--thresholds 0.5 0.7 0.9]
+    python benchmark_ml.py lstm [--length 2560] [--strides 8 16 32]
+    python benchmark_ml.py complexity [--lengths 2560 10000 100000] [--max-pairs 2000000]
+
+Each measurement runs in a fresh spawned process so peak RSS reflects a
+single model configuration and signal length.
+"""
+
+import argparse
+import multiprocessing as mp
+import resource
+import sys
+import time
+from typing import Dict, List
+
+# Transformer configurations compared by the 'transformer' benchmark
+TRANSFORMER_CONFIGS = {
+    'per-sample/full': {},
+    'patch32/full': {'patch_size': 32},
+    'patch32/local': {'patch_size': 32, 'attention': 'local'},
+    'patch32/linear': {'patch_size': 32, 'attention': 'linear'},
+}
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of the current process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _run_isolated(fn, *args):
+    """Run fn(*args) in a fresh process and return its result"""
+    ctx = mp.get_context('spawn')
+    with ctx.Pool(1) as pool:
+        return pool.apply(fn, args)
+
+def _measure_transformer(config: Dict, length: int, repeats: int) -> Dict[str, float]:
+    """Time one EEGTransformer configuration on a single signal of the given length"""
+    import torch
+    from ml_eeg_analyzer import EEGTransformer
+
+    model = EEGTransformer(**config).eval()
+    x = torch.randn(1, length, 1)
+    rss_before = _peak_rss_mb()
+
+    try:
+        with torch.no_grad():
+            model(x)  # Warm-up
+            start = time.perf_counter()
+            for _ in range(repeats):
+                model(x)
+            latency = (time.perf_counter() - start) / repeats
+    except RuntimeError as e:
+        return {'error': str(e).split('\n')[0]}
+
+    peak = _peak_rss_mb()
+    return {
+        'latency_ms': latency * 1000,
+        'peak_rss_mb': peak,
+        'rss_increase_mb': peak - rss_before
+    }
+
+def benchmark_transformer(lengths: List[int], repeats: int, max_full_length: int) -> None:
+    """Compare per-sample full attention against the patch-tokenized variants"""
+    print(f"{'config':<18}{'samples':>10}{'latency ms':>14}{'peak RSS MB':>14}{'RSS +MB':>10}")
+    print("-" * 66)
+    for name, config in TRANSFORMER_CONFIGS.items():
+        for length in lengths:
+            if name == 'per-sample/full' and length > max_full_length:
+                print(f"{name:<18}{length:>10}{'skipped (> --max-full-length)':>38}")
+                continue
+            result = _run_isolated(_measure_transformer, config, length, repeats)
+            if 'error' in result:
+                print(f"{name:<18}{length:>10}  failed: {result['error']}")
+                continue
+            print(f"{name:<18}{length:>10}{result['latency_ms']:>14.1f}"
+                  f"{result['peak_rss_mb']:>14.1f}{result['rss_increase_mb']:>10.1f}")
+
+def benchmark_features(num_signals: int, length: int, workers: List[int], repeats: int) -> None:
+    """Batch feature extraction time in process against ParallelFeatureExtractor pools"""
+    import numpy as np
+    from ml_eeg_analyzer import ParallelFeatureExtractor
+
+    signals = [np.random.randn(length) for _ in range(num_signals)]
+    print(f"{num_signals} signals x {length} samples")
+    print(f"{'workers':<10}{'seconds':>10}{'signals/s':>12}")
+    print("-" * 32)
+    for count in workers:
+        extractor = ParallelFeatureExtractor(count, min_batch=1)
+        extractor.extract(signals[:max(count, 1)])  # Warm-up: start the pool and import in the workers
+        start = time.perf_counter()
+        for _ in range(repeats):
+            extractor.extract(signals)
+        elapsed = (time.perf_counter() - start) / repeats
+        extractor.shutdown()
+        print(f"{count:<10}{elapsed:>10.3f}{num_signals / elapsed:>12.1f}")
+
+def _measure_backend(backend: str, length: int, batch_size: int, repeats: int, model_options: Dict) -> Dict[str, float]:
+    """Time ensemble forward passes with one inference backend, plus compiled-vs-eager parity"""
+    import torch
+    from ml_eeg_analyzer import EEGEnsembleModel
+
+    torch.manual_seed(0)
+    model = EEGEnsembleModel(backend=backend, **model_options)
+    data_tensor = torch.randn(batch_size, 1, length)
+
+    try:
+        start = time.perf_counter()
+        if backend != 'eager':
+            # Compile up front; serving would run eagerly until the background build finishes
+            model.compiled_networks(data_tensor.shape[1:])
+        model._ensemble_probabilities(data_tensor)  # Warm-up
+        warmup = time.perf_counter() - start
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model._ensemble_probabilities(data_tensor)
+            latencies.append(time.perf_counter() - start)
+    except RuntimeError as e:
+        return {'error': str(e).split('\n')[0]}
+
+    latencies.sort()
+    result = {
+        'warmup_s': warmup,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'peak_rss_mb': _peak_rss_mb()
+    }
+    if backend != 'eager':
+        result['max_diff'] = model.verify_compiled(length)['ensemble']
+    return result
+
+def benchmark_backends(lengths: List[int], batch_sizes: List[int], repeats: int, model_options: Dict) -> None:
+    """Compare eager PyTorch against the compiled TorchScript backend"""
+    print(f"{'backend':<13}{'samples':>9}{'batch':>7}{'warm-up s':>11}{'p50 ms':>10}{'p99 ms':>10}"
+          f"{'peak RSS MB':>13}{'max |diff|':>12}")
+    print("-" * 85)
+    for length in lengths:
+        for batch_size in batch_sizes:
+            for backend in ('eager', 'torchscript'):
+                result = _run_isolated(_measure_backend, backend, length, batch_size, repeats, model_options)
+                if 'error' in result:
+                    print(f"{backend:<13}{length:>9}{batch_size:>7}  failed: {result['error']}")
+                    continue
+                parity = f"{result['max_diff']:>12.2e}" if 'max_diff' in result else f"{'-':>12}"
+                print(f"{backend:<13}{length:>9}{batch_size:>7}{result['warmup_s']:>11.2f}{result['p50_ms']:>10.1f}"
+                      f"{result['p99_ms']:>10.1f}{result['peak_rss_mb']:>13.1f}{parity}")
+
+def _synthetic_corpus(num_signals: int, length: int, sample_rate: int, seed: int):
+    """Fixed corpus of delta to gamma rhythms with noise, every seventh signal with a spike train"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(length) / sample_rate
+    signals = []
+    for i in range(num_signals):
+        freq = (2.0, 6.0, 10.0, 20.0, 35.0)[i % 5] * rng.uniform(0.9, 1.1)
+        x = rng.uniform(10, 50) * np.sin(2 * np.pi * freq * t + rng.uniform(0, 2 * np.pi))
+        if i % 7 == 0:
+            x[::max(1, sample_rate // 3)] += rng.uniform(100, 200)
+        signals.append(x + rng.normal(0, 5, length))
+    return np.stack(signals)
+
+def _state_size_mb(network) -> float:
+    """Serialized size of a network's state dict in MB"""
+    import io
+    import torch
+
+    buffer = io.BytesIO()
+    torch.save(network.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+def benchmark_quantization(num_signals: int, length: int, sample_rate: int, batch_size: int, repeats: int,
+                           seed: int, modes: List[str], model_options: Dict) -> None:
+    """Accuracy drift and latency of the dynamic int8 ensemble modes against fp32 on a fixed corpus"""
+    import numpy as np
+    import torch
+    import torch.nn.functional as F
+    from ml_eeg_analyzer import EEGEnsembleModel
+
+    torch.manual_seed(seed)
+    reference = EEGEnsembleModel(sample_rate=sample_rate, quantize='none', **model_options)
+    models = {'fp32': reference}
+    for mode in modes:
+        quantized = EEGEnsembleModel(sample_rate=sample_rate, quantize=mode, **model_options)
+        for name, network in reference.networks().items():
+            quantized.networks()[name].load_state_dict(network.state_dict())
+        models[f'int8/{mode}'] = quantized
+    for model in models.values():
+        model.prepare_inference()
+
+    corpus = torch.FloatTensor(_synthetic_corpus(num_signals, length, sample_rate, seed)).unsqueeze(1)
+    print(f"{num_signals} synthetic signals x {length} samples at {sample_rate} Hz")
+
+    logits = {label: {} for label in models}
+    with torch.inference_mode():
+        for label, model in models.items():
+            for name, network in model.networks().items():
+                outputs = []
+                for start in range(0, num_signals, batch_size):
+                    outputs.append(network(model._network_input(name, corpus[start:start + batch_size])))
+                logits[label][name] = torch.cat(outputs)
+
+    def blend(model_logits):
+        return sum(w * F.softmax(model_logits[name], dim=1) for w, name in zip(reference.weights, reference.networks()))
+
+    fp32_probabilities = blend(logits['fp32'])
+    for label, model in models.items():
+        if label == 'fp32':
+            continue
+        int8_probabilities = blend(logits[label])
+        agreement = (fp32_probabilities.argmax(1) == int8_probabilities.argmax(1)).float().mean().item()
+        probability_drift = (fp32_probabilities - int8_probabilities).abs()
+        confidence_drift = (fp32_probabilities.max(1).values - int8_probabilities.max(1).values).abs()
+
+        print(f"\n{label}")
+        print(f"{'network':<20}{'max |logit diff|':>18}{'fp32 MB':>10}{'int8 MB':>10}")
+        print("-" * 58)
+        for name in reference.networks():
+            diff = (logits['fp32'][name] - logits[label][name]).abs().max().item()
+            print(f"{name:<20}{diff:>18.4f}{_state_size_mb(reference.networks()[name]):>10.2f}"
+                  f"{_state_size_mb(model.networks()[name]):>10.2f}")
+        print(f"Predicted class agreement: {agreement * 100:.1f}%")
+        print(f"Probability drift: mean {probability_drift.mean().item():.4f}, max {probability_drift.max().item():.4f}")
+        print(f"Confidence drift: mean {confidence_drift.mean().item():.4f}, max {confidence_drift.max().item():.4f}")
+
+    print(f"\n{'ensemble':<14}{'p50 ms (1 signal)':>19}{f'ms/signal (batch {batch_size})':>24}")
+    print("-" * 57)
+    for label, model in models.items():
+        with torch.inference_mode():
+            model._ensemble_probabilities(corpus[:1])  # Warm-up
+            single = []
+            for i in range(repeats):
+                start = time.perf_counter()
+                model._ensemble_probabilities(corpus[i % num_signals:i % num_signals + 1])
+                single.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            model._ensemble_probabilities(corpus[:batch_size])
+            batched = (time.perf_counter() - start) / min(batch_size, num_signals)
+        print(f"{label:<14}{float(np.median(single)) * 1000:>19.1f}{batched * 1000:>24.1f}")
+
+def benchmark_cascade(num_signals: int, length: int, sample_rate: int, thresholds: List[float],
+                      seed: int, model_options: Dict) -> None:
+    """Latency, networks run and agreement with the full blend for cascade thresholds"""
+    import torch
+    from ml_eeg_analyzer import EEGEnsembleModel
+
+    torch.manual_seed(seed)
+    blend = EEGEnsembleModel(sample_rate=sample_rate, ensemble_mode='blend', **model_options)
+    corpus = torch.FloatTensor(_synthetic_corpus(num_signals, length, sample_rate, seed)).unsqueeze(1)
+    print(f"{num_signals} synthetic signals x {length} samples at {sample_rate} Hz, one signal per call")
+
+    def run(model):
+        """Predicted class and networks run per signal, plus mean latency"""
+        model._ensemble_probabilities(corpus[:1])  # Warm-up
+        results = []
+        start = time.perf_counter()
+        for i in range(num_signals):
+            probabilities, evaluated = model._ensemble_probabilities(corpus[i:i + 1])
+            results.append({'predicted_class': int(probabilities[0].argmax()), 'models_evaluated': evaluated[0]})
+        return results, (time.perf_counter() - start) / num_signals
+
+    reference, blend_latency = run(blend)
+    print(f"{'mode':<18}{'ms/signal':>11}{'networks/signal':>17}{'agreement':>11}")
+    print("-" * 57)
+    print(f"{'blend':<18}{blend_latency * 1000:>11.1f}{3.0:>17.2f}{'-':>11}")
+    for threshold in thresholds:
+        cascade = EEGEnsembleModel(sample_rate=sample_rate, ensemble_mode='cascade',
+                                   cascade_threshold=threshold, **model_options)
+        for name, network in blend.networks().items():
+            cascade.networks()[name].load_state_dict(network.state_dict())
+        results, latency = run(cascade)
+        networks_run = sum(len(r['models_evaluated']) for r in results) / num_signals
+        agreement = sum(r['predicted_class'] == b['predicted_class'] for r, b in zip(results, reference)) / num_signals
+        print(f"{f'cascade@{threshold}':<18}{latency * 1000:>11.1f}{networks_run:>17.2f}{agreement * 100:>10.1f}%")
+
+def benchmark_lstm(length: int, sample_rate: int, strides: List[int], batch_size: int, repeats: int) -> None:
+    """Per-window EEGLSTM latency for each front end, and padded+packed vs one-by-one variable-length batches"""
+    import numpy as np
+    import torch
+    from ml_eeg_analyzer import EEGLSTM
+
+    torch.manual_seed(0)
+    rng = np.random.default_rng(0)
+    window = torch.randn(1, length, 1)
+    # Variable-length batch: windows between a quarter and the full length
+    signals = [rng.standard_normal(int(n)) for n in rng.integers(length // 4, length + 1, batch_size)]
+    padded, lengths = EEGLSTM.pad_batch(signals)
+    print(f"{length}-sample windows at {sample_rate} Hz; variable-length batch of {batch_size}")
+    print(f"{'front end':<16}{'steps':>7}{'ms/window':>11}{'speed-up':>10}{'one-by-one ms':>15}{'packed ms':>11}")
+    print("-" * 70)
+
+    def timed(fn) -> float:
+        """Median wall time of fn in ms after one warm-up call"""
+        fn()
+        latencies = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - start)
+        return float(np.median(latencies)) * 1000
+
+    configs = [('raw', 1)] + [(frontend, stride) for frontend in ('conv', 'bandpower') for stride in strides]
+    baseline = None
+    for frontend, stride in configs:
+        model = EEGLSTM(frontend=frontend, stride=stride, sample_rate=sample_rate).eval()
+        with torch.inference_mode():
+            per_window = timed(lambda: model(window))
+            one_by_one = timed(lambda: [model(torch.FloatTensor(s).view(1, -1, 1)) for s in signals])
+            packed = timed(lambda: model(padded, lengths))
+        baseline = baseline or per_window
+        steps = int(model.sequence_lengths(torch.tensor([length]))[0])
+        print(f"{model.variant:<16}{steps:>7}{per_window:>11.1f}{baseline / per_window:>9.1f}x"
+              f"{one_by_one:>15.1f}{packed:>11.1f}")
+
+def benchmark_complexity(lengths: List[int], sample_rate: int, max_exact_length: int, max_pairs: int) -> None:
+    """Time exact and sampled SampEn/ApEn and permutation entropy against window length, with the sampling error"""
+    from complexity_metrics import approximate_entropy, permutation_entropy, sample_entropy
+
+    estimators = {'SampEn': sample_entropy, 'ApEn': approximate_entropy}
+    print(f"Synthetic EEG at {sample_rate} Hz; exact SampEn/ApEn up to {max_exact_length} samples, "
+          f"sampled from {max_pairs} pairs")
+    print(f"{'samples':>9}{'PermEn ms':>11}"
+          + ''.join(f"{label + ' exact ms':>17}{'sampled ms':>12}{'|error|':>9}" for label in estimators))
+    print("-" * (20 + 38 * len(estimators)))
+    for length in lengths:
+        x = _synthetic_corpus(1, length, sample_rate, seed=length)[0]
+        start = time.perf_counter()
+        permutation_entropy(x)
+        row = f"{length:>9}{(time.perf_counter() - start) * 1000:>11.1f}"
+        for estimator in estimators.values():
+            exact = None
+            if length <= max_exact_length:
+                start = time.perf_counter()
+                exact = estimator(x, max_exact_length=None)
+                row += f"{(time.perf_counter() - start) * 1000:>17.1f}"
+            else:
+                row += f"{'skipped':>17}"
+            # A max_exact_length of 1 forces the sampled estimate at every length
+            start = time.perf_counter()
+            sampled = estimator(x, max_exact_length=1, max_pairs=max_pairs)
+            row += f"{(time.perf_counter() - start) * 1000:>12.1f}"
+            row += f"{abs(sampled - exact):>9.4f}" if exact is not None else f"{'-':>9}"
+        print(row)
+
+def main():
+    """Parse arguments and run the selected benchmark"""
+    parser = argparse.ArgumentParser(description='ML EEG Analysis benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    transformer = subparsers.add_parser('transformer', help='EEGTransformer latency and peak RSS vs signal length')
+    transformer.add_argument('--lengths', type=int, nargs='+', default=[2560, 7680, 15360, 46080, 76800],
+                             help='Signal lengths in samples (default: 10 s to 5 min at 256 Hz)')
+    transformer.add_argument('--repeats', type=int, default=3)
+    transformer.add_argument('--max-full-length', type=int, default=7680,
+                             help='Longest signal to try with per-sample full attention')
+
+    features = subparsers.add_parser('features', help='Batch feature extraction throughput vs worker processes')
+    features.add_argument('--signals', type=int, default=256)
+    features.add_argument('--length', type=int, default=2560)
+    features.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4, 8],
+                          help='Pool sizes to compare (0 = in process)')
+    features.add_argument('--repeats', type=int, default=3)
+
+    backends = subparsers.add_parser('backends', help='Ensemble latency with eager vs TorchScript inference, plus parity')
+    backends.add_argument('--lengths', type=int, nargs='+', default=[2560, 7680])
+    backends.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8])
+    backends.add_argument('--repeats', type=int, default=20)
+    backends.add_argument('--transformer-patch-size', type=int, default=32,
+                          help='Transformer patch size (1 = per-sample tokens, slow on long signals)')
+    backends.add_argument('--transformer-attention', default='full', choices=['full', 'local', 'linear'])
+
+    quantization = subparsers.add_parser('quantization', help='Dynamic int8 vs fp32 ensemble: accuracy drift and latency')
+    quantization.add_argument('--signals', type=int, default=100)
+    quantization.add_argument('--length', type=int, default=2560)
+    quantization.add_argument('--sample-rate', type=int, default=256)
+    quantization.add_argument('--batch-size', type=int, default=16)
+    quantization.add_argument('--repeats', type=int, default=20)
+    quantization.add_argument('--seed', type=int, default=0, help='Seed for the corpus and the fp32 weights')
+    quantization.add_argument('--modes', nargs='+', default=['linear', 'full'], choices=['linear', 'full'])
+    quantization.add_argument('--transformer-patch-size', type=int, default=32,
+                              help='Transformer patch size (1 = per-sample tokens, slow on long signals)')
+    quantization.add_argument('--transformer-attention', default='full', choices=['full', 'local', 'linear'])
+
+    cascade = subparsers.add_parser('cascade', help='Cascade ensemble latency and agreement vs the full blend')
+    cascade.add_argument('--signals', type=int, default=100)
+    cascade.add_argument('--length', type=int, default=2560)
+    cascade.add_argument('--sample-rate', type=int, default=256)
+    cascade.add_argument('--thresholds', type=float, nargs='+', default=[0.5, 0.7, 0.9])
+    cascade.add_argument('--seed', type=int, default=0)
+    cascade.add_argument('--transformer-patch-size', type=int, default=32,
+                         help='Transformer patch size (1 = per-sample tokens, slow on long signals)')
+
+    lstm = subparsers.add_parser('lstm', help='EEGLSTM latency per front end, and packed variable-length batches')
+    lstm.add_argument('--length', type=int, default=2560)
+    lstm.add_argument('--sample-rate', type=int, default=256)
+    lstm.add_argument('--strides', type=int, nargs='+', default=[8, 16, 32])
+    lstm.add_argument('--batch-size', type=int, default=8, help='Signals in the variable-length batch')
+    lstm.add_argument('--repeats', type=int, default=10)
+
+    complexity = subparsers.add_parser('complexity', help='Sample, approximate and permutation entropy latency')
+    complexity.add_argument('--lengths', type=int, nargs='+', default=[2560, 10000, 30000, 100000])
+    complexity.add_argument('--sample-rate', type=int, default=256)
+    complexity.add_argument('--max-exact-length', type=int, default=30000,
+                            help='Longest window to run exact SampEn/ApEn on (their cost grows as N^2)')
+    complexity.add_argument('--max-pairs', type=int, default=2000000,
+                            help='Template pairs compared by the sampled SampEn/ApEn estimates')
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'transformer':
+        benchmark_transformer(args.lengths, args.repeats, args.max_full_length)
+    elif args.benchmark == 'features':
+        benchmark_features(args.signals, args.length, args.workers, args.repeats)
+    elif args.benchmark == 'quantization':
+        benchmark_quantization(args.signals, args.length, args.sample_rate, args.batch_size, args.repeats, args.seed,
+                               args.modes, {
+            'transformer_patch_size': args.transformer_patch_size,
+            'transformer_attention': args.transformer_attention
+        })
+    elif args.benchmark == 'cascade':
+        benchmark_cascade(args.signals, args.length, args.sample_rate, args.thresholds, args.seed,
+                          {'transformer_patch_size': args.transformer_patch_size})
+    elif args.benchmark == 'lstm':
+        benchmark_lstm(args.length, args.sample_rate, args.strides, args.batch_size, args.repeats)
+    elif args.benchmark == 'complexity':
+        benchmark_complexity(args.lengths, args.sample_rate, args.max_exact_length, args.max_pairs)
+    elif args.benchmark == 'backends':
+        benchmark_backends(args.lengths, args.batch_sizes, args.repeats, {
+            'transformer_patch_size': args.transformer_patch_size,
+            'transformer_attention': args.transformer_attention
+        })
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+EEG Complexity Metrics
+Entropy measures of signal regularity for the feature pipeline
+
+This module provides:
+- sample_entropy: SampEn(m, r), estimated from sampled template pairs for long windows
+- approximate_entropy: ApEn(m, r), estimated from sampled template pairs for long windows
+- permutation_entropy: normalized Shannon entropy of ordinal patterns
+- complexity_features: selected metrics for every row of a (channels, samples) array, with timings
+
+SampEn and ApEn count pairs of length-m templates within a Chebyshev
+tolerance of r standard deviations. Instead of comparing every pair, the
+templates are sorted by their first sample and each one is only compared
+with the successors whose first sample is within tolerance, stopping at the
+first that is not. The work is proportional to the number of near pairs,
+not N^2, and every comparison step is vectorized over all templates.
+
+The number of near pairs still grows as N^2, so by default windows longer
+than MAX_EXACT_LENGTH samples are estimated from MAX_PAIRS template pairs
+drawn with a fixed seed, which bounds the cost at any length.
+"""
+
+import math
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+# Longest window counted exactly by default (about 0.07 s); longer ones are sampled
+MAX_EXACT_LENGTH = 10_000
+
+# Template pairs compared by the sampled estimates by default (about 0.1 s at any length)
+MAX_PAIRS = 2_000_000
+
+
+def _sampled(length: int, total_pairs: int, max_exact_length: Optional[int], max_pairs: int) -> bool:
+    """Whether a window of length samples is estimated from max_pairs sampled template pairs"""
+    return bool(max_exact_length) and length > max_exact_length and total_pairs > max_pairs
+
+
+def _pair_matches(x: np.ndarray, i: np.ndarray, j: np.ndarray, m: int,
+                  tolerance: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Whether the templates starting at i and j are within tolerance over m and over m + 1 samples"""
+    distance = np.zeros(np.broadcast_shapes(i.shape, j.shape))
+    for k in range(m):
+        distance = np.maximum(distance, np.abs(x[i + k] - x[j + k]))
+    match_m = distance <= tolerance
+    return match_m, match_m & (np.abs(x[i + m] - x[j + m]) <= tolerance)
+
+
+def _template_pairs(x: np.ndarray, m: int, tolerance: float,
+                    n: int) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Near template pairs from a sorted-window search over the first n templates
+
+    Yields (a, b, match_m, match_m1) per search step, where a and b are sorted
+    positions of paired templates and the masks say whether the pair is within
+    tolerance over m and over m + 1 samples. Samples past the end of x never
+    match, so templates without an (m + 1)-th sample only count for m.
+    """
+    padded = np.append(x, np.nan)
+    order = np.argsort(x[:n], kind='stable')
+    columns = [padded[k:k + n][order] for k in range(m + 1)]
+    first = columns[0]
+    # One past the last candidate of each template in sorted order
+    end = np.searchsorted(first, first + tolerance, side='right')
+
+    active = np.nonzero(end > np.arange(n) + 1)[0]
+    step = 1
+    while active.size:
+        partner = active + step
+        match_m = np.ones(active.size, dtype=bool)
+        for k in range(1, m):
+            match_m &= np.abs(columns[k][active] - columns[k][partner]) <= tolerance
+        match_m1 = match_m & (np.abs(columns[m][active] - columns[m][partner]) <= tolerance)
+        yield active, partner, match_m, match_m1
+        step += 1
+        # Early termination: a template stops once its next successor is out of range
+        active = active[end[active] > active + step]
+
+
+def sample_entropy(x: np.ndarray, m: int = 2, r: float = 0.2, max_exact_length: Optional[int] = MAX_EXACT_LENGTH,
+                   max_pairs: int = MAX_PAIRS, seed: int = 0) -> float:
+    """
+    Sample entropy -ln(A / B) with tolerance r * std
+
+    B and A count template pairs (self-matches excluded) within tolerance over
+    m and m + 1 samples, using the same N - m templates for both. When no
+    pair matches over m + 1 samples the upper bound ln(pairs) is returned.
+
+    Exact counting costs one comparison per pair that is near on the first
+    sample, which grows as N^2. Windows longer than max_exact_length samples
+    (None or 0: never) estimate A / B from max_pairs pairs drawn uniformly
+    with a fixed seed, so the result is reproducible.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x) - m
+    if n < 2:
+        return 0.0
+    tolerance = r * np.std(x)
+    total_pairs = n * (n - 1) // 2
+
+    if _sampled(len(x), total_pairs, max_exact_length, max_pairs):
+        rng = np.random.default_rng(seed)
+        i = rng.integers(0, n, max_pairs)
+        j = (i + rng.integers(1, n, max_pairs)) % n
+        match_m, match_m1 = _pair_matches(x, i, j, m, tolerance)
+        matches = np.count_nonzero(match_m)
+        matches_next = np.count_nonzero(match_m1)
+    else:
+        matches = matches_next = 0
+        for _, _, match_m, match_m1 in _template_pairs(x, m, tolerance, n):
+            matches += np.count_nonzero(match_m)
+            matches_next += np.count_nonzero(match_m1)
+
+    if matches == 0 or matches_next == 0:
+        return float(np.log(total_pairs))
+    return float(np.log(matches / matches_next))
+
+
+def approximate_entropy(x: np.ndarray, m: int = 2, r: float = 0.2,
+                        max_exact_length: Optional[int] = MAX_EXACT_LENGTH, max_pairs: int = MAX_PAIRS,
+                        seed: int = 0) -> float:
+    """
+    Approximate entropy Phi_m - Phi_(m+1) with tolerance r * std
+
+    Phi_k averages the log fraction of templates (self-match included) within
+    tolerance of each of the N - k + 1 templates of length k.
+
+    Windows longer than max_exact_length samples (None or 0: never) average
+    over evenly spaced templates, with a seeded offset, instead of all of
+    them. Each one's fraction is still counted exactly, over the candidates
+    the sorted search finds for it, and as many templates are taken as fit
+    in about max_pairs comparisons. Averaging exact fractions keeps the
+    estimate unbiased, which estimating them from random partners would not.
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x) - m + 1
+    if n < 2:
+        return 0.0
+    tolerance = r * np.std(x)
+
+    if _sampled(len(x), n * (n - 1) // 2, max_exact_length, max_pairs):
+        padded = np.append(x, np.nan)
+        order = np.argsort(x[:n], kind='stable')
+        first = x[:n][order]
+        start = np.searchsorted(first, first - tolerance, side='left')
+        candidates = np.searchsorted(first, first + tolerance, side='right') - start
+        # Every template is its own candidate, so the total is at least n
+        templates = min(n, max(1, int(max_pairs * n / candidates.sum())))
+        offset = np.random.default_rng(seed).random()
+        positions = ((offset + np.arange(templates)) * n / templates).astype(int)
+        rank = np.empty(n, dtype=int)
+        rank[order] = np.arange(n)
+        start, candidates = start[rank[positions]], candidates[rank[positions]]
+
+        # Flatten each template's run of sorted candidates into (owner, partner) pairs
+        owner = np.repeat(np.arange(templates), candidates)
+        within = np.arange(owner.size) - np.repeat(np.cumsum(candidates) - candidates, candidates)
+        partner = order[np.repeat(start, candidates) + within]
+        match_m, match_m1 = _pair_matches(padded, positions[owner], partner, m, tolerance)
+        counts_m = np.bincount(owner, weights=match_m, minlength=templates)
+        counts_m1 = np.bincount(owner, weights=match_m1, minlength=templates)
+        longer = positions < n - 1
+        return float(np.mean(np.log(counts_m / n)) - np.mean(np.log(counts_m1[longer] / (n - 1))))
+
+    # Every template matches itself
+    counts_m = np.ones(n)
+    counts_m1 = np.ones(n)
+    for a, b, match_m, match_m1 in _template_pairs(x, m, tolerance, n):
+        for positions in (a, b):
+            counts_m += np.bincount(positions, weights=match_m, minlength=n)
+            counts_m1 += np.bincount(positions, weights=match_m1, minlength=n)
+
+    # The last template has no (m + 1)-th sample and only counts for length m
+    order = np.argsort(x[:n], kind='stable')
+    longer = order < n - 1
+    phi_m = np.mean(np.log(counts_m / n))
+    phi_m1 = np.mean(np.log(counts_m1[longer] / (n - 1)))
+    return float(phi_m - phi_m1)
+
+
+def permutation_entropy(x: np.ndarray, order: int = 3, delay: int = 1, normalize: bool = True) -> float:
+    """Shannon entropy of the ordinal patterns of order samples taken every delay samples, in bits or normalized to [0, 1]"""
+    x = np.asarray(x, dtype=float)
+    span = (order - 1) * delay + 1
+    if len(x) < span:
+        return 0.0
+    windows = np.lib.stride_tricks.sliding_window_view(x, span)[:, ::delay]
+    # Each permutation maps to a unique integer code
+    codes = np.argsort(windows, axis=1, kind='stable') @ (order ** np.arange(order))
+    _, counts = np.unique(codes, return_counts=True)
+    p = counts / counts.sum()
+    entropy = float(np.sum(p * np.log2(1 / p)))
+    return entropy / math.log2(math.factorial(order)) if normalize else entropy
+
+
+# Metrics selectable by name in the feature pipeline
+COMPLEXITY_METRICS: Dict[str, Callable[[np.ndarray], float]] = {
+    'sample_entropy': sample_entropy,
+    'approximate_entropy': approximate_entropy,
+    'permutation_entropy': permutation_entropy
+}
+
+
+def validate_metrics(metrics: Iterable[str]) -> Tuple[str, ...]:
+    """Metric names as a tuple, raising ValueError for unknown ones"""
+    metrics = tuple(metrics)
+    unknown = [name for name in metrics if name not in COMPLEXITY_METRICS]
+    if unknown:
+        raise ValueError(f"Unknown complexity metric(s) {unknown}. Use any of {tuple(COMPLEXITY_METRICS)}")
+    return metrics
+
+
+def complexity_features(data: np.ndarray, metrics: Iterable[str],
+                        options: Optional[Dict[str, Dict]] = None) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+    """
+    Selected metrics for every row of a (channels, samples) array
+
+    Args:
+        data: Signals shaped (channels, samples)
+        metrics: Names from COMPLEXITY_METRICS
+        options: Keyword arguments per metric name, e.g. {'sample_entropy': {'max_pairs': 10**6}}
+
+    Returns:
+        (values, timings): one value per row for each metric, and the
+        milliseconds each metric took over all rows
+    """
+    rows = np.atleast_2d(data)
+    options = options or {}
+    values, timings = {}, {}
+    for name in validate_metrics(metrics):
+        metric = COMPLEXITY_METRICS[name]
+        start = time.perf_counter()
+        values[name] = np.array([metric(row, **options.get(name, {})) for row in rows])
+        timings[name] = (time.perf_counter() - start) * 1000
+    return values, timings
@@ -0,0 +1,536 @@
+"""
+EEG Signal I/O
+Decoding and encoding of signal payloads for the analysis APIs
+
+Supported binary payloads:
+- application/octet-stream: raw little-endian float32 (default) or float64 samples
+- application/x-npy: a single NumPy .npy array
+- application/x-npz: several signals in one NumPy .npz archive (batch requests)
+
+Raw and .npy bodies are read with np.frombuffer, so samples never pass
+through intermediate Python lists or float objects.
+
+Text uploads (CSV/TXT) are parsed in blocks by pandas' C reader and either
+copied into a growing float32 buffer or handed chunk by chunk to the
+windowed analysis pipeline. Multi-channel CSVs are read in one pass into a
+(channels, samples) array, skipping the time column.
+
+EDF, EDF+ and BDF recordings are memory-mapped by EDFReader, so only the
+channels and time ranges that are actually analyzed are ever read.
+"""
+
+import io
+import os
+import zipfile
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+OCTET_STREAM = 'application/octet-stream'
+NPY = 'application/x-npy'
+NPZ = 'application/x-npz'
+
+BINARY_TYPES = (OCTET_STREAM, NPY, NPZ)
+
+# Column names treated as timestamps or sample indices rather than channels
+TIME_COLUMN_NAMES = ('time', 'times', 'timestamp', 't', 'seconds', 'time_s', 'sample', 'samples', 'index')
+
+_NPY_MAGIC = b'\x93NUMPY'
+_ZIP_MAGIC = b'PK\x03\x04'
+
+
+def _raw_dtype(dtype: str) -> np.dtype:
+    """Little-endian float dtype for raw sample buffers"""
+    if dtype not in ('float32', 'float64'):
+        raise ValueError(f"Unsupported raw dtype '{dtype}'. Use float32 or float64")
+    return np.dtype(dtype).newbyteorder('<')
+
+
+def _read_npy(body: bytes) -> np.ndarray:
+    """Zero-copy view of an in-memory .npy file"""
+    stream = io.BytesIO(body)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(stream)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(stream)
+    if dtype.hasobject:
+        raise ValueError("Object arrays are not accepted")
+    count = int(np.prod(shape))
+    array = np.frombuffer(body, dtype=dtype, count=count, offset=stream.tell())
+    return array.reshape(shape, order='F' if fortran_order else 'C')
+
+
+def decode_signal(body: bytes, content_type: str, dtype: str = 'float32') -> np.ndarray:
+    """
+    Decode a single signal from a binary request body
+
+    Args:
+        body: Raw request body
+        content_type: MIME type of the body
+        dtype: Sample type of raw octet-stream bodies (float32 or float64)
+
+    Returns:
+        1D array of samples (a read-only view over body where possible)
+    """
+    if content_type == NPY or body.startswith(_NPY_MAGIC):
+        signal = _read_npy(body)
+    elif content_type == OCTET_STREAM:
+        signal = np.frombuffer(body, dtype=_raw_dtype(dtype))
+    else:
+        raise ValueError(f"Unsupported content type '{content_type}'")
+
+    if signal.ndim != 1:
+        raise ValueError(f"Expected a 1D signal, got shape {signal.shape}")
+    return signal
+
+
+def decode_signals(body: bytes, content_type: str, dtype: str = 'float32',
+                   lengths: Optional[Sequence[int]] = None) -> List[np.ndarray]:
+    """
+    Decode several signals from a binary batch request body
+
+    Accepted layouts:
+    - .npz archive with one array per signal, in archive order
+    - .npy 2D array shaped (signals, samples)
+    - raw samples of all signals concatenated, split by lengths
+
+    Returns:
+        List of 1D arrays
+    """
+    if content_type == NPZ or body.startswith(_ZIP_MAGIC):
+        if not body.startswith(_ZIP_MAGIC):
+            raise ValueError("Invalid .npz archive: body is not a zip file")
+        try:
+            with np.load(io.BytesIO(body), allow_pickle=False) as archive:
+                return [np.ravel(archive[name]) for name in archive.files]
+        except (zipfile.BadZipFile, KeyError, OSError, EOFError) as e:
+            # Malformed archives are client errors like any other undecodable body
+            raise ValueError(f"Invalid .npz archive: {str(e)}") from e
+
+    if content_type == NPY or body.startswith(_NPY_MAGIC):
+        signals = _read_npy(body)
+        if signals.ndim != 2:
+            raise ValueError(f"Expected a 2D (signals, samples) array, got shape {signals.shape}")
+        return list(signals)
+
+    if content_type == OCTET_STREAM:
+        samples = np.frombuffer(body, dtype=_raw_dtype(dtype))
+        if not lengths:
+            raise ValueError("Raw batch bodies need a 'lengths' parameter")
+        if any(length <= 0 for length in lengths):
+            raise ValueError(f"Signal lengths must be positive, got {list(lengths)}")
+        if sum(lengths) != len(samples):
+            raise ValueError(f"Signal lengths add up to {sum(lengths)} but the body holds {len(samples)} samples")
+        return np.split(samples, np.cumsum(lengths)[:-1])
+
+    raise ValueError(f"Unsupported content type '{content_type}'")
+
+
+def encode_signal(signal: np.ndarray, content_type: str, dtype: str = 'float32') -> Tuple[bytes, str]:
+    """
+    Encode a signal as a binary response body
+
+    Returns:
+        (body, content_type) tuple
+    """
+    if content_type == NPY:
+        buffer = io.BytesIO()
+        np.save(buffer, np.asarray(signal), allow_pickle=False)
+        return buffer.getvalue(), NPY
+    return np.asarray(signal, dtype=_raw_dtype(dtype)).tobytes(), OCTET_STREAM
+
+
+def preferred_binary_type(accept_mimetypes) -> Optional[str]:
+    """Binary MIME type the client explicitly asked for in its Accept header, if any"""
+    for content_type in (NPY, OCTET_STREAM):
+        if content_type in accept_mimetypes.values():
+            return content_type
+    return None
+
+
+def iter_signal_chunks(stream: IO, file_format: str, column: Optional[str] = None,
+                       chunk_rows: int = 65536) -> Iterator[np.ndarray]:
+    """
+    Yield float32 sample chunks from a CSV or TXT upload without reading it whole
+
+    CSV: one signal column, the first channel column unless column is given.
+    TXT: whitespace-separated numbers, flattened in reading order.
+    """
+    if file_format == 'csv':
+        reader = pd.read_csv(stream, chunksize=chunk_rows, engine='c')
+    elif file_format == 'txt':
+        reader = pd.read_csv(stream, chunksize=chunk_rows, engine='c', header=None, sep=r'\s+', dtype=np.float32)
+    else:
+        raise ValueError(f"Unsupported file format '{file_format}'. Use CSV or TXT")
+
+    with reader:
+        for chunk in reader:
+            if file_format == 'txt':
+                yield chunk.to_numpy(dtype=np.float32).ravel()
+                continue
+            if column is None:
+                column = select_channels(chunk)[0][0]
+            elif column not in chunk.columns:
+                raise ValueError(f"Column '{column}' not found in CSV")
+            yield chunk[column].to_numpy(dtype=np.float32)
+
+
+def read_signal(stream: IO, file_format: str, column: Optional[str] = None, chunk_rows: int = 65536) -> np.ndarray:
+    """
+    Read a whole CSV or TXT signal into one float32 array
+
+    The output buffer is preallocated from the stream size when it is known
+    and grown geometrically otherwise, so peak memory stays close to the
+    float32 result instead of several times the text size.
+    """
+    return _concatenate(iter_signal_chunks(stream, file_format, column, chunk_rows), stream_size(stream))
+
+
+def read_channels(stream: IO, channels: Optional[Sequence[str]] = None, time_column: Optional[str] = None,
+                  chunk_rows: int = 65536) -> Tuple[np.ndarray, List[str], Optional[str]]:
+    """
+    Read several CSV channels in one pass
+
+    Args:
+        stream: CSV upload
+        channels: Columns to read, default every numeric column except the time column
+        time_column: Column holding timestamps, detected when not given
+
+    Returns:
+        (data, channel_names, time_column) with data shaped (channels, samples) as float32
+    """
+    size = stream_size(stream)
+    selected: List[str] = []
+
+    def blocks() -> Iterator[np.ndarray]:
+        nonlocal selected, time_column
+        with pd.read_csv(stream, chunksize=chunk_rows, engine='c') as reader:
+            for chunk in reader:
+                if not selected:
+                    selected, time_column = select_channels(chunk, channels, time_column)
+                yield chunk[selected].to_numpy(dtype=np.float32).T
+
+    data = _concatenate(blocks(), size)
+    if not selected:
+        raise ValueError('No data found in CSV')
+    return data, selected, time_column
+
+
+def detect_time_column(frame: pd.DataFrame) -> Optional[str]:
+    """
+    Name of the column holding timestamps or sample indices, if any
+
+    A column counts as time when its name is a usual time label, or when it is
+    the first of several numeric columns and strictly increasing.
+    """
+    for name in frame.columns:
+        if str(name).strip().lower() in TIME_COLUMN_NAMES:
+            return name
+    numeric_cols = frame.select_dtypes(include=[np.number]).columns
+    if len(numeric_cols) > 1:
+        first = frame[numeric_cols[0]].to_numpy()
+        if len(first) > 1 and np.all(np.diff(first) > 0):
+            return numeric_cols[0]
+    return None
+
+
+def select_channels(frame: pd.DataFrame, channels: Optional[Sequence[str]] = None,
+                    time_column: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+    """
+    Resolve the channel columns and time column of a CSV block
+
+    Returns:
+        (channel_names, time_column)
+    """
+    if time_column is None:
+        time_column = detect_time_column(frame)
+    elif time_column not in frame.columns:
+        raise ValueError(f"Time column '{time_column}' not found in CSV")
+
+    if channels:
+        missing = [name for name in channels if name not in frame.columns]
+        if missing:
+            raise ValueError(f"Columns not found in CSV: {', '.join(map(str, missing))}")
+        return list(channels), time_column
+
+    numeric_cols = frame.select_dtypes(include=[np.number]).columns
+    selected = [name for name in numeric_cols if name != time_column]
+    if not selected:
+        raise ValueError('No numeric data found in CSV')
+    return selected, time_column
+
+
+def _concatenate(blocks: Iterable[np.ndarray], size_hint: int = 0) -> np.ndarray:
+    """
+    Join float32 blocks along their last axis into one preallocated buffer
+
+    The buffer is sized from size_hint, the text size in bytes (assuming about
+    8 bytes per value), and grown geometrically when that turns out too small,
+    so peak memory stays close to the float32 result.
+    """
+    buffer: Optional[np.ndarray] = None
+    filled = 0
+    for block in blocks:
+        n = block.shape[-1]
+        if buffer is None:
+            leading = block.shape[:-1]
+            width = int(np.prod(leading)) or 1
+            buffer = np.empty(leading + (max(n, size_hint // (8 * width)),), dtype=np.float32)
+        elif filled + n > buffer.shape[-1]:
+            grown = np.empty(buffer.shape[:-1] + (max(2 * buffer.shape[-1], filled + n),), dtype=np.float32)
+            grown[..., :filled] = buffer[..., :filled]
+            buffer = grown
+        buffer[..., filled:filled + n] = block
+        filled += n
+    if buffer is None:
+        return np.empty(0, dtype=np.float32)
+    return buffer[..., :filled]
+
+
+def stream_size(stream: IO) -> int:
+    """Remaining bytes in a seekable stream, or 0 when unknown"""
+    try:
+        position = stream.tell()
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return max(size - position, 0)
+    except (AttributeError, OSError, ValueError):
+        return 0
+
+
+def parse_numeric_text(text: str) -> Optional[np.ndarray]:
+    """
+    Parse whitespace-separated numbers with NumPy's C text reader
+
+    Returns None when the text is not a regular numeric table (ragged rows or
+    non-numeric tokens), so callers can fall back to line-by-line parsing.
+    """
+    try:
+        return np.loadtxt(io.StringIO(text), dtype=np.float64, ndmin=1).ravel()
+    except ValueError:
+        return None
+
+
+class EDFReader:
+    """
+    Memory-mapped reader for EDF, EDF+ and BDF recordings
+
+    The header is parsed up front and the data records are mapped as a
+    structured array with one field per signal, so every channel is a strided
+    view over the file. Reading a channel or a time range only touches the
+    records it covers; digital values are converted to physical units as they
+    are read. Annotation signals (EDF+/BDF+) are listed but never analyzed.
+
+    Args:
+        source: Path to the recording, or a binary file object backed by a
+            real file (e.g. an upload spooled to disk). Objects without a
+            file descriptor are read into memory instead.
+    """
+
+    ANNOTATION_LABELS = ('EDF Annotations', 'BDF Annotations')
+
+    def __init__(self, source: Union[str, os.PathLike, IO[bytes]]):
+        self._file = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+        self._file.seek(0)
+        header = self._file.read(256)
+        if len(header) < 256:
+            raise ValueError('File is too short to be an EDF/BDF recording')
+
+        self.is_bdf = header[0:1] == b'\xff'
+        self.file_type = 'BDF' if self.is_bdf else 'EDF'
+        reserved = self._field(header, 192, 44)
+        if reserved.startswith(('EDF+', 'BDF+')):
+            self.file_type = reserved[:5]
+        self.patient = self._field(header, 8, 80)
+        self.recording = self._field(header, 88, 80)
+        self.start = f"{self._field(header, 168, 8)} {self._field(header, 176, 8)}"
+        self.header_bytes = self._number(header, 184, 8, int)
+        self.record_duration = self._number(header, 244, 8, float)
+        num_signals = self._number(header, 252, 4, int)
+        if num_signals <= 0 or self.header_bytes != 256 * (num_signals + 1):
+            raise ValueError('Invalid EDF/BDF header')
+
+        extended = self._file.read(256 * num_signals)
+        if len(extended) < 256 * num_signals:
+            raise ValueError('Truncated EDF/BDF signal headers')
+
+        def column(offset: int, width: int) -> List[str]:
+            start = offset * num_signals
+            return [self._field(extended, start + i * width, width) for i in range(num_signals)]
+
+        labels = column(0, 16)
+        units = column(96, 8)
+        physical_min = [float(v) for v in column(104, 8)]
+        physical_max = [float(v) for v in column(112, 8)]
+        digital_min = [float(v) for v in column(120, 8)]
+        digital_max = [float(v) for v in column(128, 8)]
+        prefilters = column(136, 80)
+        samples_per_record = [int(v) for v in column(216, 8)]
+
+        self.signals: List[Dict[str, Any]] = []
+        for i in range(num_signals):
+            span = digital_max[i] - digital_min[i]
+            gain = (physical_max[i] - physical_min[i]) / span if span else 1.0
+            self.signals.append({
+                'label': labels[i],
+                'unit': units[i],
+                'prefilter': prefilters[i],
+                'samples_per_record': samples_per_record[i],
+                'sample_rate': samples_per_record[i] / self.record_duration if self.record_duration else 0.0,
+                'gain': gain,
+                'offset': physical_min[i] - digital_min[i] * gain
+            })
+
+        # One structured record: every signal's samples back to back
+        sample_width = 3 if self.is_bdf else 2
+        self._record_dtype = np.dtype([
+            (f's{i}', ('u1', (n, 3)) if self.is_bdf else ('<i2', (n,)))
+            for i, n in enumerate(samples_per_record)
+        ])
+        record_bytes = sum(samples_per_record) * sample_width
+
+        data_bytes = stream_size(self._file)
+        declared = self._number(header, 236, 8, int)
+        available = data_bytes // record_bytes if record_bytes else 0
+        # -1 means the record count was never written (e.g. an interrupted recording)
+        self.num_records = available if declared < 0 else min(declared, available)
+        self._records = self._map_records()
+
+    @staticmethod
+    def _field(block: bytes, offset: int, width: int) -> str:
+        """ASCII header field with padding stripped"""
+        return block[offset:offset + width].decode('ascii', errors='replace').strip()
+
+    def _number(self, block: bytes, offset: int, width: int, kind):
+        """Numeric header field"""
+        text = self._field(block, offset, width)
+        try:
+            return kind(float(text))
+        except ValueError:
+            raise ValueError(f"Invalid EDF/BDF header field '{text}'")
+
+    def _map_records(self) -> np.ndarray:
+        """Data records as a structured array, memory-mapped when the source has a file descriptor"""
+        if self.num_records == 0:
+            return np.empty(0, dtype=self._record_dtype)
+        try:
+            self._file.fileno()
+            return np.memmap(self._file, dtype=self._record_dtype, mode='r',
+                             offset=self.header_bytes, shape=(self.num_records,))
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            self._file.seek(self.header_bytes)
+            body = self._file.read(self.num_records * self._record_dtype.itemsize)
+            return np.frombuffer(body, dtype=self._record_dtype, count=self.num_records)
+
+    @property
+    def channels(self) -> List[str]:
+        """Labels of the data signals, annotation signals excluded"""
+        return [s['label'] for s in self.signals if s['label'] not in self.ANNOTATION_LABELS]
+
+    @property
+    def duration(self) -> float:
+        """Recording length in seconds"""
+        return self.num_records * self.record_duration
+
+    def channel_index(self, channel: Union[int, str]) -> int:
+        """Signal index of a channel given by label or index"""
+        if isinstance(channel, str):
+            labels = [s['label'] for s in self.signals]
+            if channel not in labels:
+                raise ValueError(f"Channel '{channel}' not found in recording")
+            return labels.index(channel)
+        if not 0 <= channel < len(self.signals):
+            raise ValueError(f"Channel index {channel} out of range")
+        return channel
+
+    def sample_rate(self, channel: Union[int, str]) -> float:
+        """Sampling rate of a channel in Hz"""
+        return self.signals[self.channel_index(channel)]['sample_rate']
+
+    def raw(self, channel: Union[int, str]) -> np.ndarray:
+        """Digital samples of a channel as a zero-copy (records, samples_per_record[, 3]) view"""
+        return self._records[f's{self.channel_index(channel)}']
+
+    def read(self, channel: Union[int, str], start: float = 0.0, duration: Optional[float] = None) -> np.ndarray:
+        """
+        Physical samples of a channel over a time range, as float32
+
+        Only the data records that overlap [start, start + duration) are read.
+        """
+        index = self.channel_index(channel)
+        first, last = self._sample_range(index, start, duration)
+        return self._read_samples(index, first, last)
+
+    def read_channels(self, channels: Optional[Sequence[Union[int, str]]] = None, start: float = 0.0,
+                      duration: Optional[float] = None) -> Tuple[np.ndarray, List[str], float]:
+        """
+        Several channels over a time range, stacked as (channels, samples)
+
+        Channels default to every data signal at the first channel's rate.
+
+        Returns:
+            (data, channel_names, sample_rate)
+        """
+        if channels is None:
+            if not self.channels:
+                raise ValueError('Recording has no data channels')
+            rate = self.sample_rate(self.channels[0])
+            channels = [label for label in self.channels if self.sample_rate(label) == rate]
+        indices = [self.channel_index(channel) for channel in channels]
+        rates = {self.signals[i]['sample_rate'] for i in indices}
+        if len(rates) > 1:
+            raise ValueError('Selected channels have different sample rates')
+        data = np.stack([self.read(i, start, duration) for i in indices])
+        return data, [self.signals[i]['label'] for i in indices], rates.pop()
+
+    def iter_chunks(self, channel: Union[int, str], start: float = 0.0, duration: Optional[float] = None,
+                    chunk_seconds: float = 60.0) -> Iterator[np.ndarray]:
+        """Yield a channel's physical samples over a time range, chunk_seconds at a time"""
+        index = self.channel_index(channel)
+        first, last = self._sample_range(index, start, duration)
+        step = max(int(round(chunk_seconds * self.signals[index]['sample_rate'])), 1)
+        for position in range(first, last, step):
+            yield self._read_samples(index, position, min(position + step, last))
+
+    def _sample_range(self, index: int, start: float, duration: Optional[float]) -> Tuple[int, int]:
+        """[first, last) sample indices of a time range, clipped to the recording"""
+        rate = self.signals[index]['sample_rate']
+        total = self.num_records * self.signals[index]['samples_per_record']
+        first = min(max(int(round(start * rate)), 0), total)
+        last = total if duration is None else min(first + int(round(duration * rate)), total)
+        return first, max(last, first)
+
+    def _read_samples(self, index: int, first: int, last: int) -> np.ndarray:
+        """Decode samples [first, last) of a signal from the records that hold them"""
+        if last <= first:
+            return np.empty(0, dtype=np.float32)
+        spr = self.signals[index]['samples_per_record']
+        records = self._records[f's{index}'][first // spr:-(-last // spr)]
+        offset = first - (first // spr) * spr
+        return self._scale(index, records).reshape(-1)[offset:offset + last - first]
+
+    def _scale(self, index: int, records: np.ndarray) -> np.ndarray:
+        """Convert digital samples to physical float32 values"""
+        if self.is_bdf:
+            # Little-endian 24-bit two's complement
+            digital = records[..., 0].astype(np.int32) | (records[..., 1].astype(np.int32) << 8) | \
+                (records[..., 2].astype(np.int32) << 16)
+            digital = (digital ^ 0x800000) - 0x800000
+        else:
+            digital = records
+        signal = self.signals[index]
+        return (digital * np.float32(signal['gain']) + np.float32(signal['offset'])).astype(np.float32, copy=False)
+
+    def info(self) -> Dict[str, Any]:
+        """Recording metadata"""
+        return {
+            'file_type': self.file_type,
+            'start': self.start,
+            'duration': self.duration,
+            'num_records': self.num_records,
+            'record_duration': self.record_duration,
+            'channels': self.channels,
+            'sample_rates': {s['label']: s['sample_rate'] for s in self.signals}
+        }
@@ -9,7 +9,7 @@ This API provides:
 - Model information and status
 """
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 import numpy as np
 import pandas as pd
@@ -18,11 +18,17 @@ import logging
 import os
 import tempfile
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import traceback
 
+from complexity_metrics import validate_metrics
+from eeg_io import BINARY_TYPES, EDFReader, decode_signal, decode_signals, iter_signal_chunks, read_channels, read_signal
+
 # Import our ML analyzer
-from ml_eeg_analyzer import ML_EEGAnalyzer, analyze_eeg_with_ml
+from ml_eeg_analyzer import MODEL_VERSION, feature_store, get_ml_analyzer, model_registry
+from ml_jobs import QueueFullError, job_queue
+from ml_scheduler import inference_scheduler
+from result_cache import result_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,8 +38,117 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)
 
-# Initialize ML analyzer
-ml_analyzer = ML_EEGAnalyzer()
+# The ML analyzer is created lazily on first request. Set ML_PRELOAD_MODELS=true to
+# build the ensembles at import instead, e.g. in a `gunicorn --preload` master, so
+# forked workers share the model parameters rather than each building their own.
+if os.environ.get('ML_PRELOAD_MODELS', 'False').lower() == 'true':
+    preload_rates = os.environ.get('ML_PRELOAD_SAMPLE_RATES', '256')
+    model_registry.preload(int(rate) for rate in preload_rates.split(','))
+    get_ml_analyzer()
+
+def _read_signal_payload() -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+    """
+    Read one EEG signal and its options from the request
+    
+    JSON bodies carry the signal in 'data' with options alongside it. Binary
+    bodies (raw float32/float64 or .npy, see eeg_io) carry only the samples and
+    take options such as sample_rate and dtype from the query string.
+    Raises ValueError for malformed binary bodies.
+    """
+    if request.mimetype in BINARY_TYPES:
+        options = request.args.to_dict()
+        body = request.get_data(cache=False)
+        if not body:
+            return None, options
+        return decode_signal(body, request.mimetype, options.get('dtype', 'float32')), options
+    
+    data = request.get_json(silent=True)
+    if not data or 'data' not in data:
+        return None, data or {}
+    return np.array(data['data'], dtype=float), data
+
+def _read_batch_payload() -> Tuple[Optional[List], Dict[str, Any]]:
+    """
+    Read several EEG signals and their options from the request
+    
+    JSON bodies carry the signals in 'signals'. Binary bodies may be an .npz
+    archive, a 2D .npy array, or concatenated raw samples split by a
+    comma-separated 'lengths' query parameter.
+    Raises ValueError for malformed binary bodies.
+    """
+    if request.mimetype in BINARY_TYPES:
+        options = request.args.to_dict()
+        body = request.get_data(cache=False)
+        if not body:
+            return None, options
+        lengths = [int(n) for n in options['lengths'].split(',')] if 'lengths' in options else None
+        return decode_signals(body, request.mimetype, options.get('dtype', 'float32'), lengths), options
+    
+    data = request.get_json(silent=True)
+    if not data or 'signals' not in data:
+        return None, data or {}
+    return data['signals'], data
+
+def _option_flag(options: Dict[str, Any], name: str) -> bool:
+    """Boolean option that may come from JSON or from a query string"""
+    value = options.get(name, False)
+    if isinstance(value, str):
+        return value.lower() in ('true', '1', 'yes')
+    return bool(value)
+
+def _submit_job(job_type: str, signals: List[np.ndarray], sample_rate: int,
+                signal_indices: Optional[List[int]] = None, extra: Optional[Dict[str, Any]] = None):
+    """Queue an analysis job and answer 202 with its id, or 503 with Retry-After when the queue is full"""
+    try:
+        job_id = job_queue.submit(job_type, signals, sample_rate, signal_indices)
+    except QueueFullError as e:
+        response = jsonify({
+            'error': str(e),
+            'status': 'error'
+        })
+        response.headers['Retry-After'] = os.environ.get('ML_JOB_RETRY_AFTER', '5')
+        return response, 503
+    
+    response = jsonify(dict(extra or {}, job_id=job_id, status='queued', status_url=f'/api/jobs/{job_id}'))
+    response.headers['Location'] = f'/api/jobs/{job_id}'
+    return response, 202
+
+def _remember_features(result: Optional[Dict[str, Any]]) -> None:
+    """Put a served result's features back in the feature store, so its signal_id resolves in this process"""
+    if result and all(key in result for key in ('signal_id', 'sample_rate', 'features')):
+        feature_store.put(result['signal_id'], result['sample_rate'], result['features'])
+
+def _cached_json(namespace: str, eeg_data: np.ndarray, params: Dict[str, Any], compute,
+                 stores_features: bool = False) -> Response:
+    """
+    Serve a JSON result from the result cache, or compute and cache it
+    
+    The key covers the samples, params, the model version, the analyzer's
+    model options and its effective serving settings (ensemble mode, cascade
+    threshold, network variants, quantization, canonical rate). compute() returns the result dict; results with an 'error'
+    are never cached. X-Cache is HIT, MISS or BYPASS (cache disabled), and
+    hits also name the tier that served them in X-Cache-Tier. With
+    stores_features, a hit re-stores the cached features, since the feature
+    store may have evicted them or belong to a restarted process.
+    """
+    if not result_cache.enabled:
+        return Response(app.json.dumps(compute()), mimetype='application/json', headers={'X-Cache': 'BYPASS'})
+    
+    analyzer = get_ml_analyzer()
+    key = result_cache.key(namespace, eeg_data, model_version=MODEL_VERSION, model_options=analyzer.model_options,
+                           serving_settings=analyzer.serving_settings(), **params)
+    body, tier = result_cache.get(key)
+    if body is not None:
+        if stores_features:
+            _remember_features(json.loads(body))
+        return Response(body, mimetype='application/json',
+                        headers={'X-Cache': 'HIT', 'X-Cache-Tier': tier, 'X-Cache-Key': key})
+    
+    result = compute()
+    body = app.json.dumps(result).encode()
+    if 'error' not in result:
+        result_cache.put(key, body)
+    return Response(body, mimetype='application/json', headers={'X-Cache': 'MISS', 'X-Cache-Key': key})
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -53,36 +168,58 @@ def analyze_eeg():
     Expected input:
     - JSON with 'data' field containing EEG signal
     - Optional 'sample_rate' field (default: 256)
+    
+    Alternatively a binary body (application/octet-stream raw float32/float64,
+    or application/x-npy) with 'sample_rate' and 'dtype' as query parameters.
+    
+    With 'async' set the analysis is queued and the response is 202 with a
+    job id to poll at /api/jobs/<job_id>. Synchronous results are cached by
+    content (see _cached_json), and concurrent synchronous requests share
+    batched forward passes through the inference scheduler.
     """
     try:
-        data = request.get_json()
+        try:
+            eeg_data, options = _read_signal_payload()
+        except ValueError as e:
+            return jsonify({
+                'error': str(e),
+                'status': 'error'
+            }), 400
         
-        if not data or 'data' not in data:
+        if eeg_data is None:
             return jsonify({
                 'error': 'Missing EEG data',
                 'status': 'error'
             }), 400
         
         # Extract data
-        eeg_data = np.array(data['data'], dtype=float)
-        sample_rate = data.get('sample_rate', 256)
+        sample_rate = int(options.get('sample_rate', 256))
         
-        # Validate data
-        if len(eeg_data) < 100:
+        # Validate data; the minimum counts samples after resampling to the analysis rate
+        minimum = get_ml_analyzer().min_input_samples(sample_rate)
+        if len(eeg_data) < minimum:
             return jsonify({
-                'error': 'Insufficient data points (minimum 100 required)',
+                'error': f'Insufficient data points (minimum {minimum} required)',
                 'status': 'error'
             }), 400
         
-        # Perform analysis
-        results = ml_analyzer.analyze_eeg_data(eeg_data, sample_rate)
+        if _option_flag(options, 'async'):
+            return _submit_job('analyze', [eeg_data], sample_rate)
         
-        # Add API metadata
-        results['api_version'] = '1.0.0'
-        results['processing_time'] = datetime.now().isoformat()
+        def analyze():
+            if inference_scheduler.enabled:
+                results = inference_scheduler.analyze(eeg_data, sample_rate)
+            else:
+                results = get_ml_analyzer().analyze_eeg_data(eeg_data, sample_rate)
+            
+            # Add API metadata
+            results['api_version'] = '1.0.0'
+            results['processing_time'] = datetime.now().isoformat()
+            
+            logger.info(f"Analysis completed for {len(eeg_data)} data points")
+            return results
         
-        logger.info(f"Analysis completed for {len(eeg_data)} data points")
-        return jsonify(results)
+        return _cached_json('analyze', eeg_data, {'sample_rate': sample_rate}, analyze, stores_features=True)
         
     except Exception as e:
         logger.error(f"Error in analysis: {str(e)}")
@@ -93,12 +230,101 @@ def analyze_eeg():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@app.route('/api/analyze-stream', methods=['POST'])
+def analyze_eeg_stream():
+    """
+    Analyze a long EEG recording in sliding windows
+    
+    Expected input:
+    - JSON with 'data' field containing EEG signal
+    - Optional 'sample_rate' field (default: 256)
+    - Optional 'window_seconds' (default: 4.0) and 'hop_seconds' (default: 1.0)
+    - Optional 'incremental' flag to update moments and band powers in O(hop) per window
+    
+    Binary bodies are accepted as for /api/analyze, with options in the query string.
+    Streams newline-delimited JSON, one analysis result per window.
+    """
+    try:
+        try:
+            eeg_data, options = _read_signal_payload()
+        except ValueError as e:
+            return jsonify({
+                'error': str(e),
+                'status': 'error'
+            }), 400
+        
+        if eeg_data is None:
+            return jsonify({
+                'error': 'Missing EEG data',
+                'status': 'error'
+            }), 400
+        
+        sample_rate = int(options.get('sample_rate', 256))
+        window_seconds = float(options.get('window_seconds', 4.0))
+        hop_seconds = float(options.get('hop_seconds', 1.0))
+        incremental = _option_flag(options, 'incremental')
+        
+        window = int(round(window_seconds * sample_rate))
+        minimum = get_ml_analyzer().min_input_samples(sample_rate)
+        if window < minimum:
+            return jsonify({
+                'error': f'Window too short (minimum {minimum} data points required)',
+                'status': 'error'
+            }), 400
+        if hop_seconds <= 0:
+            return jsonify({
+                'error': 'hop_seconds must be positive',
+                'status': 'error'
+            }), 400
+        if len(eeg_data) < window:
+            return jsonify({
+                'error': f'Insufficient data points (at least one {window}-sample window required)',
+                'status': 'error'
+            }), 400
+        
+        def generate():
+            analyzer = get_ml_analyzer()
+            try:
+                for result in analyzer.analyze_stream(eeg_data, sample_rate, window_seconds, hop_seconds,
+                                                      incremental=incremental):
+                    result['api_version'] = '1.0.0'
+                    yield json.dumps(result) + '\n'
+            except Exception as e:
+                # Headers are already sent, so the failure is reported as a final record
+                logger.error(f"Error in stream analysis: {str(e)}")
+                yield json.dumps({'error': str(e), 'status': 'error'}) + '\n'
+        
+        logger.info(f"Streaming analysis started for {len(eeg_data)} data points")
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        logger.error(f"Error in stream analysis: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': str(e),
+            'status': 'error',
+            'timestamp': datetime.now().isoformat()
+        }), 500
+
 @app.route('/api/analyze-file', methods=['POST'])
 def analyze_eeg_file():
     """
     Analyze EEG data from uploaded file
     
-    Supports: CSV, TXT, EDF files
+    Supports: CSV, TXT, EDF/EDF+ and BDF files
+    
+    Form fields:
+    - Optional 'sample_rate' (default: 256; EDF/BDF use the rate in the header)
+    - CSV only: 'column' to analyze a single column, or comma-separated
+      'channels' plus 'time_column' (both detected by default). Several
+      channels are analyzed in one pass with per-channel and montage results
+    - EDF/BDF: 'column' or comma-separated 'channels' by label, and an
+      optional 'start_seconds'/'duration_seconds' range. The upload is
+      memory-mapped, so only the selected range is decoded; streaming
+      analyzes one channel
+    - Optional 'stream' flag: analyze in sliding windows while the file is
+      parsed and return NDJSON, with 'window_seconds', 'hop_seconds' and
+      'incremental' as for /api/analyze-stream
     """
     try:
         if 'file' not in request.files:
@@ -108,7 +334,6 @@ def analyze_eeg_file():
             }), 400
         
         file = request.files['file']
-        sample_rate = int(request.form.get('sample_rate', 256))
         
         if file.filename == '':
             return jsonify({
@@ -120,40 +345,142 @@ def analyze_eeg_file():
         filename = file.filename.lower()
         
         if filename.endswith('.csv'):
-            # Read CSV file
-            df = pd.read_csv(file)
-            # Assume first numeric column is EEG data
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
-            if len(numeric_cols) == 0:
+            file_format = 'csv'
+        elif filename.endswith('.txt'):
+            file_format = 'txt'
+        elif filename.endswith(('.edf', '.bdf')):
+            file_format = 'edf'
+        else:
+            return jsonify({
+                'error': 'Unsupported file format. Use CSV, TXT, EDF or BDF',
+                'status': 'error'
+            }), 400
+        
+        # CSV: a single 'column' or every channel column; TXT: one signal
+        column = request.form.get('column')
+        channels = [name.strip() for name in request.form['channels'].split(',')] \
+            if request.form.get('channels') else None
+        
+        # Numeric options, validated up front for both the streamed and the whole-file path
+        try:
+            sample_rate = int(request.form.get('sample_rate', 256))
+            start_seconds = float(request.form.get('start_seconds', 0.0))
+            duration = request.form.get('duration_seconds')
+            duration_seconds = float(duration) if duration else None
+            window_seconds = float(request.form.get('window_seconds', 4.0))
+            hop_seconds = float(request.form.get('hop_seconds', 1.0))
+        except ValueError:
+            return jsonify({
+                'error': 'sample_rate, start_seconds, duration_seconds, window_seconds and hop_seconds must be numbers',
+                'status': 'error'
+            }), 400
+        if sample_rate <= 0 or start_seconds < 0 or window_seconds <= 0 or hop_seconds <= 0 or \
+                (duration_seconds is not None and duration_seconds <= 0):
+            return jsonify({
+                'error': 'sample_rate, window_seconds, hop_seconds and duration_seconds must be positive '
+                         'and start_seconds must not be negative',
+                'status': 'error'
+            }), 400
+        
+        recording = None
+        if file_format == 'edf':
+            try:
+                # Werkzeug spools large uploads to a temporary file, which is mapped in place
+                recording = EDFReader(file.stream)
+            except ValueError as e:
+                return jsonify({
+                    'error': str(e),
+                    'status': 'error'
+                }), 400
+            if not recording.channels:
                 return jsonify({
-                    'error': 'No numeric data found in CSV',
+                    'error': 'Recording has no data channels',
                     'status': 'error'
                 }), 400
-            eeg_data = df[numeric_cols[0]].values
+            if column is not None:
+                channels = [column]
+        
+        if _option_flag(request.form, 'stream'):
+            # Parse in blocks and feed them straight into the windowed pipeline
+            spool = None
+            if recording is not None:
+                # The mapping outlives the upload, so records are decoded as the windows advance
+                column = channels[0] if channels else recording.channels[0]
+                sample_rate = int(round(recording.sample_rate(column)))
+                chunks = recording.iter_chunks(column, start_seconds, duration_seconds)
+            else:
+                # Spooled to a file we own because Werkzeug closes request files
+                # before the streamed response is consumed
+                spool = tempfile.TemporaryFile()
+                file.save(spool)
+                spool.seek(0)
+                chunks = iter_signal_chunks(spool, file_format, column)
+            filename = file.filename
+            incremental = _option_flag(request.form, 'incremental')
             
-        elif filename.endswith('.txt'):
-            # Read TXT file
-            content = file.read().decode('utf-8')
-            lines = content.strip().split('\n')
-            eeg_data = np.array([float(line.strip()) for line in lines if line.strip()])
+            def generate():
+                analyzer = get_ml_analyzer()
+                windows = 0
+                try:
+                    for result in analyzer.analyze_stream(chunks, sample_rate, window_seconds, hop_seconds,
+                                                          incremental=incremental):
+                        result['filename'] = filename
+                        result['api_version'] = '1.0.0'
+                        windows += 1
+                        yield json.dumps(result) + '\n'
+                except Exception as e:
+                    # Headers are already sent, so the failure is reported as a final record
+                    logger.error(f"Error in streamed file analysis: {str(e)}")
+                    yield json.dumps({'error': str(e), 'status': 'error'}) + '\n'
+                    return
+                finally:
+                    if spool is not None:
+                        spool.close()
+                if windows == 0:
+                    yield json.dumps({'error': 'Insufficient data points for one analysis window', 'status': 'error'}) + '\n'
             
-        else:
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        channel_names = None
+        time_column = None
+        try:
+            if recording is not None:
+                eeg_channels, channel_names, rate = recording.read_channels(channels, start_seconds, duration_seconds)
+                sample_rate = int(round(rate))
+                eeg_data = eeg_channels[0]
+            elif file_format == 'csv' and column is None:
+                eeg_channels, channel_names, time_column = read_channels(
+                    file.stream, channels, request.form.get('time_column'))
+                eeg_data = eeg_channels[0]
+            else:
+                eeg_data = read_signal(file.stream, file_format, column)
+        except ValueError as e:
             return jsonify({
-                'error': 'Unsupported file format. Use CSV or TXT',
+                'error': str(e),
                 'status': 'error'
             }), 400
         
-        # Validate data
-        if len(eeg_data) < 100:
+        # Validate data; the minimum counts samples after resampling to the analysis rate
+        minimum = get_ml_analyzer().min_input_samples(sample_rate)
+        if len(eeg_data) < minimum:
             return jsonify({
-                'error': 'Insufficient data points (minimum 100 required)',
+                'error': f'Insufficient data points (minimum {minimum} required)',
                 'status': 'error'
             }), 400
         
         # Perform analysis
-        results = ml_analyzer.analyze_eeg_data(eeg_data, sample_rate)
+        if channel_names is not None and len(channel_names) > 1:
+            results = get_ml_analyzer().analyze_eeg_channels(eeg_channels, sample_rate, channel_names)
+        else:
+            results = get_ml_analyzer().analyze_eeg_data(eeg_data, sample_rate)
+            if channel_names is not None:
+                results['channel_names'] = channel_names
         
         # Add file metadata
+        if recording is not None:
+            results['recording'] = recording.info()
+        else:
+            results['time_column'] = time_column
         results['filename'] = file.filename
         results['file_size'] = len(eeg_data)
         results['api_version'] = '1.0.0'
@@ -175,7 +502,11 @@ def analyze_eeg_file():
 def get_model_info():
     """Get information about the ML models"""
     try:
-        model_info = ml_analyzer.get_model_info()
+        model_info = get_ml_analyzer().get_model_info()
+        model_info['model_cache'] = model_registry.cache_info()
+        model_info['result_cache'] = result_cache.info()
+        model_info['feature_store'] = feature_store.info()
+        model_info['inference_scheduler'] = inference_scheduler.info()
         model_info['timestamp'] = datetime.now().isoformat()
         return jsonify(model_info)
     except Exception as e:
@@ -189,28 +520,56 @@ def get_model_info():
 def extract_features():
     """
     Extract features from EEG data without classification
+    
+    Accepts the same JSON or binary bodies as /api/analyze. Results are
+    cached by content. An optional 'metrics' list selects exact complexity
+    metrics (sample_entropy, approximate_entropy, permutation_entropy); the
+    time each took is returned as metric_timings_ms.
     """
     try:
-        data = request.get_json()
+        try:
+            eeg_data, options = _read_signal_payload()
+        except ValueError as e:
+            return jsonify({
+                'error': str(e),
+                'status': 'error'
+            }), 400
         
-        if not data or 'data' not in data:
+        if eeg_data is None:
             return jsonify({
                 'error': 'Missing EEG data',
                 'status': 'error'
             }), 400
         
-        eeg_data = np.array(data['data'], dtype=float)
-        sample_rate = data.get('sample_rate', 256)
-        
-        # Extract features only
-        features = ml_analyzer.preprocessor.extract_features(eeg_data)
+        sample_rate = int(options.get('sample_rate', 256))
+        metrics = options.get('metrics')
+        if metrics is not None:
+            try:
+                if isinstance(metrics, str):
+                    metrics = [name for name in metrics.split(',') if name]
+                metrics = list(validate_metrics(metrics))
+            except (TypeError, ValueError) as e:
+                return jsonify({
+                    'error': str(e),
+                    'status': 'error'
+                }), 400
         
-        return jsonify({
-            'features': features,
-            'sample_rate': sample_rate,
-            'data_length': len(eeg_data),
-            'timestamp': datetime.now().isoformat()
-        })
+        def features():
+            # Extract features only; they are stored for later /api/analyze and /api/risk-scores calls
+            timings = {}
+            signal_id, features = get_ml_analyzer().extract_features(eeg_data, sample_rate, metrics=metrics,
+                                                                     timings=timings)
+            return {
+                'signal_id': signal_id,
+                'features': features,
+                'metric_timings_ms': timings,
+                'sample_rate': sample_rate,
+                'data_length': len(eeg_data),
+                'timestamp': datetime.now().isoformat()
+            }
+        
+        return _cached_json('features', eeg_data, {'sample_rate': sample_rate, 'metrics': metrics}, features,
+                            stores_features=True)
         
     except Exception as e:
         logger.error(f"Error extracting features: {str(e)}")
@@ -219,22 +578,52 @@ def extract_features():
             'status': 'error'
         }), 500
 
+@app.route('/api/risk-scores/<signal_id>', methods=['GET'])
+def get_risk_scores(signal_id):
+    """
+    Risk scores of a signal already sent to /api/features, /api/analyze or /api/batch-analyze
+    
+    Scores are recomputed from the stored features, so the signal is neither
+    re-sent nor re-filtered. The store is per process and bounded by
+    ML_FEATURE_STORE_SIZE; unknown or evicted ids return 404.
+    """
+    results = get_ml_analyzer().risk_scores(signal_id)
+    if results is None:
+        return jsonify({
+            'error': 'Unknown signal id; send the signal to /api/features first',
+            'status': 'error'
+        }), 404
+    results['timestamp'] = datetime.now().isoformat()
+    return jsonify(results)
+
 @app.route('/api/batch-analyze', methods=['POST'])
 def batch_analyze():
     """
     Analyze multiple EEG signals in batch
+    
+    Accepts JSON with a 'signals' list, or a binary body: an .npz archive
+    (application/x-npz), a 2D .npy array, or concatenated raw samples with a
+    comma-separated 'lengths' query parameter.
+    
+    With 'async' set the valid signals are queued as one job (202, poll
+    /api/jobs/<job_id>) and rejected signals are reported immediately.
     """
     try:
-        data = request.get_json()
+        try:
+            signals, options = _read_batch_payload()
+        except ValueError as e:
+            return jsonify({
+                'error': str(e),
+                'status': 'error'
+            }), 400
         
-        if not data or 'signals' not in data:
+        if signals is None:
             return jsonify({
                 'error': 'Missing signals data',
                 'status': 'error'
             }), 400
         
-        signals = data['signals']
-        sample_rate = data.get('sample_rate', 256)
+        sample_rate = int(options.get('sample_rate', 256))
         
         if not isinstance(signals, list) or len(signals) == 0:
             return jsonify({
@@ -242,26 +631,41 @@ def batch_analyze():
                 'status': 'error'
             }), 400
         
-        results = []
+        results = [None] * len(signals)
+        valid_indices = []
+        valid_signals = []
+        minimum = get_ml_analyzer().min_input_samples(sample_rate)
         for i, signal_data in enumerate(signals):
             try:
                 eeg_data = np.array(signal_data, dtype=float)
-                if len(eeg_data) >= 100:
-                    result = ml_analyzer.analyze_eeg_data(eeg_data, sample_rate)
-                    result['signal_index'] = i
-                    results.append(result)
+                if len(eeg_data) >= minimum:
+                    valid_indices.append(i)
+                    valid_signals.append(eeg_data)
                 else:
-                    results.append({
+                    results[i] = {
                         'signal_index': i,
                         'error': 'Insufficient data points',
                         'status': 'error'
-                    })
+                    }
             except Exception as e:
-                results.append({
+                results[i] = {
                     'signal_index': i,
                     'error': str(e),
                     'status': 'error'
-                })
+                }
+        
+        if valid_signals and _option_flag(options, 'async'):
+            return _submit_job('batch', valid_signals, sample_rate, valid_indices, extra={
+                'total_signals': len(signals),
+                'rejected': [r for r in results if r is not None]
+            })
+        
+        # Run all valid signals through the ensemble in batched forward passes
+        if valid_signals:
+            batch_results = get_ml_analyzer().analyze_eeg_batch(valid_signals, sample_rate)
+            for i, result in zip(valid_indices, batch_results):
+                result['signal_index'] = i
+                results[i] = result
         
         return jsonify({
             'results': results,
@@ -277,70 +681,123 @@ def batch_analyze():
             'status': 'error'
         }), 500
 
+@app.route('/api/jobs', methods=['GET'])
+def jobs_info():
+    """Job queue status: workers, queue bound and job counts by state"""
+    return jsonify(job_queue.info())
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Status, progress and (once completed) results of a queued analysis
+    
+    Results hold one entry per submitted signal, None until its chunk finishes.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Job not found',
+            'status': 'error'
+        }), 404
+    # Workers featurize in their own processes; store the features here so the ids resolve
+    for result in job['results']:
+        _remember_features(result)
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued analysis; chunks that already started run to completion"""
+    if not job_queue.cancel(job_id):
+        return jsonify({
+            'error': 'Job not found or already finished',
+            'status': 'error'
+        }), 404
+    return jsonify({'job_id': job_id, 'status': 'cancelled'})
+
+def _validate_signal(eeg_data: np.ndarray) -> Dict[str, Any]:
+    """Format and quality checks behind /api/validate"""
+    # Perform validation checks
+    validation_results = {
+        'data_length': len(eeg_data),
+        'is_valid': True,
+        'warnings': [],
+        'errors': []
+    }
+    
+    # Check data length
+    if len(eeg_data) < 100:
+        validation_results['errors'].append('Insufficient data points (minimum 100 required)')
+        validation_results['is_valid'] = False
+    elif len(eeg_data) < 1000:
+        validation_results['warnings'].append('Limited data points may affect accuracy')
+    
+    # Check for NaN values
+    if np.any(np.isnan(eeg_data)):
+        validation_results['errors'].append('Data contains NaN values')
+        validation_results['is_valid'] = False
+    
+    # Check for infinite values
+    if np.any(np.isinf(eeg_data)):
+        validation_results['errors'].append('Data contains infinite values')
+        validation_results['is_valid'] = False
+    
+    # Check data range
+    data_range = np.max(eeg_data) - np.min(eeg_data)
+    if data_range == 0:
+        validation_results['errors'].append('Data has no variation (constant values)')
+        validation_results['is_valid'] = False
+    
+    # Check for outliers
+    z_scores = np.abs((eeg_data - np.mean(eeg_data)) / np.std(eeg_data))
+    outlier_count = np.sum(z_scores > 3)
+    if outlier_count > len(eeg_data) * 0.1:  # More than 10% outliers
+        validation_results['warnings'].append(f'High number of outliers detected ({outlier_count})')
+    
+    validation_results['statistics'] = {
+        'mean': float(np.mean(eeg_data)),
+        'std': float(np.std(eeg_data)),
+        'min': float(np.min(eeg_data)),
+        'max': float(np.max(eeg_data)),
+        'outlier_count': int(outlier_count)
+    }
+    
+    validation_results['timestamp'] = datetime.now().isoformat()
+    
+    return validation_results
+
 @app.route('/api/validate', methods=['POST'])
 def validate_data():
     """
     Validate EEG data format and quality
+    
+    Accepts the same JSON or binary bodies as /api/analyze. Results are
+    cached by content. The response carries the signal's id, which
+    /api/risk-scores accepts once the signal has been analyzed.
     """
     try:
-        data = request.get_json()
+        try:
+            eeg_data, options = _read_signal_payload()
+        except ValueError as e:
+            return jsonify({
+                'error': str(e),
+                'status': 'error'
+            }), 400
         
-        if not data or 'data' not in data:
+        if eeg_data is None:
             return jsonify({
                 'error': 'Missing EEG data',
                 'status': 'error'
             }), 400
         
-        eeg_data = np.array(data['data'], dtype=float)
-        
-        # Perform validation checks
-        validation_results = {
-            'data_length': len(eeg_data),
-            'is_valid': True,
-            'warnings': [],
-            'errors': []
-        }
-        
-        # Check data length
-        if len(eeg_data) < 100:
-            validation_results['errors'].append('Insufficient data points (minimum 100 required)')
-            validation_results['is_valid'] = False
-        elif len(eeg_data) < 1000:
-            validation_results['warnings'].append('Limited data points may affect accuracy')
-        
-        # Check for NaN values
-        if np.any(np.isnan(eeg_data)):
-            validation_results['errors'].append('Data contains NaN values')
-            validation_results['is_valid'] = False
-        
-        # Check for infinite values
-        if np.any(np.isinf(eeg_data)):
-            validation_results['errors'].append('Data contains infinite values')
-            validation_results['is_valid'] = False
-        
-        # Check data range
-        data_range = np.max(eeg_data) - np.min(eeg_data)
-        if data_range == 0:
-            validation_results['errors'].append('Data has no variation (constant values)')
-            validation_results['is_valid'] = False
-        
-        # Check for outliers
-        z_scores = np.abs((eeg_data - np.mean(eeg_data)) / np.std(eeg_data))
-        outlier_count = np.sum(z_scores > 3)
-        if outlier_count > len(eeg_data) * 0.1:  # More than 10% outliers
-            validation_results['warnings'].append(f'High number of outliers detected ({outlier_count})')
-        
-        validation_results['statistics'] = {
-            'mean': float(np.mean(eeg_data)),
-            'std': float(np.std(eeg_data)),
-            'min': float(np.min(eeg_data)),
-            'max': float(np.max(eeg_data)),
-            'outlier_count': int(outlier_count)
-        }
-        
-        validation_results['timestamp'] = datetime.now().isoformat()
-        
-        return jsonify(validation_results)
+        sample_rate = int(options.get('sample_rate', 256))
+        
+        def validate():
+            # The checks look at raw samples; only the id is shared with the feature store
+            validation_results = _validate_signal(eeg_data)
+            validation_results['signal_id'] = feature_store.signal_id(eeg_data, sample_rate)
+            return validation_results
+        
+        return _cached_json('validate', eeg_data, {'sample_rate': sample_rate}, validate)
         
     except Exception as e:
         logger.error(f"Error in data validation: {str(e)}")
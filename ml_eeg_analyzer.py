@@ -25,136 +25,370 @@ from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split, cross_val_score
 from sklearn.metrics import accuracy_score, precision_recall_fscore_support, confusion_matrix
 import scipy.signal as signal
-from scipy.fft import fft, fftfreq
 import joblib
+import inspect
 import json
 import logging
-from typing import Dict, List, Tuple, Optional, Union
+import math
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
 import warnings
+from collections import OrderedDict
+
+from result_cache import content_hash
+from complexity_metrics import MAX_EXACT_LENGTH, MAX_PAIRS, complexity_features, validate_metrics
+from signal_processing import (BandPowerEngine, PolyphaseResampler, SOSFilterBank, StreamingSOSFilter,
+                               filter_bank as default_filter_bank, resampler as default_resampler)
 warnings.filterwarnings('ignore')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Reported with every result; bump when model outputs change so cached results are not reused
+MODEL_VERSION = '1.2.0'
+
 class EEGPreprocessor:
     """
     Advanced EEG Signal Preprocessing Pipeline
     Based on research standards for EEG analysis
     """
     
-    def __init__(self, sample_rate: int = 256, notch_freq: float = 50.0):
+    # Standard EEG frequency bands in Hz (inclusive bounds)
+    FREQUENCY_BANDS = {
+        'delta': (0.5, 4),
+        'theta': (4, 8),
+        'alpha': (8, 13),
+        'beta': (13, 30),
+        'gamma': (30, 100)
+    }
+    
+    def __init__(self, sample_rate: int = 256, notch_freq: float = 50.0, filter_bank: Optional[SOSFilterBank] = None,
+                 spectral_method: str = 'fft', welch_nperseg: Optional[int] = None,
+                 resampler: Optional[PolyphaseResampler] = None, complexity_metrics: Optional[Iterable[str]] = None,
+                 entropy_max_exact_length: Optional[int] = None, entropy_max_pairs: Optional[int] = None):
         self.sample_rate = sample_rate
         self.notch_freq = notch_freq
         self.scaler = StandardScaler()
+        # Filter designs are cached per (sample_rate, band, order) and shared across preprocessors
+        self.filter_bank = filter_bank or default_filter_bank
+        # Band powers from rfft or Welch ('welch' averages segments of welch_nperseg samples, default 2 s)
+        self.band_power_engine = BandPowerEngine(self.FREQUENCY_BANDS, method=spectral_method, nperseg=welch_nperseg)
+        # Anti-aliasing filters are cached per rate pair and shared across preprocessors
+        self.resampler = resampler or default_resampler
+        # Exact complexity metrics added to every feature set, default ML_COMPLEXITY_METRICS
+        # (comma-separated, unset: none). SampEn and ApEn of windows longer than
+        # entropy_max_exact_length samples, default ML_ENTROPY_MAX_EXACT_LENGTH (10000; 0: always
+        # exact), are estimated from about entropy_max_pairs template pairs, default ML_ENTROPY_MAX_PAIRS.
+        if complexity_metrics is None:
+            complexity_metrics = [name for name in os.environ.get('ML_COMPLEXITY_METRICS', '').split(',') if name]
+        self.complexity_metrics = validate_metrics(complexity_metrics)
+        self.entropy_max_exact_length = entropy_max_exact_length if entropy_max_exact_length is not None else \
+            int(os.environ.get('ML_ENTROPY_MAX_EXACT_LENGTH', MAX_EXACT_LENGTH))
+        self.entropy_max_pairs = entropy_max_pairs if entropy_max_pairs is not None else \
+            int(os.environ.get('ML_ENTROPY_MAX_PAIRS', MAX_PAIRS))
+        
+    def resample(self, data: np.ndarray, from_rate: float) -> np.ndarray:
+        """Polyphase-resample data recorded at from_rate to this preprocessor's rate along the last axis"""
+        return self.resampler.resample(data, from_rate, self.sample_rate)
         
     def apply_notch_filter(self, data: np.ndarray) -> np.ndarray:
         """Apply notch filter to remove power line interference"""
-        b, a = signal.iirnotch(self.notch_freq, 30, self.sample_rate)
-        return signal.filtfilt(b, a, data)
+        sos = self.filter_bank.notch(self.sample_rate, self.notch_freq, 30)
+        return signal.sosfiltfilt(sos, data)
     
     def apply_bandpass_filter(self, data: np.ndarray, low_freq: float = 0.5, high_freq: float = 40.0) -> np.ndarray:
         """Apply bandpass filter for EEG frequency range"""
-        nyquist = self.sample_rate / 2
-        low = low_freq / nyquist
-        high = high_freq / nyquist
-        b, a = signal.butter(4, [low, high], btype='band')
-        return signal.filtfilt(b, a, data)
+        sos = self.filter_bank.bandpass(self.sample_rate, low_freq, high_freq, 4)
+        return signal.sosfiltfilt(sos, data)
+    
+    def apply_filters(self, data: np.ndarray, low_freq: float = 0.5, high_freq: float = 40.0) -> np.ndarray:
+        """Apply notch and bandpass filters in a single zero-phase pass"""
+        sos = self.filter_bank.notch_bandpass(self.sample_rate, self.notch_freq, low_freq, high_freq, 4, 30)
+        return signal.sosfiltfilt(sos, data)
     
     def remove_artifacts(self, data: np.ndarray, threshold: float = 3.0) -> np.ndarray:
-        """Remove artifacts using statistical outlier detection"""
-        z_scores = np.abs((data - np.mean(data)) / np.std(data))
+        """Remove artifacts using statistical outlier detection (per channel for 2D input)"""
+        z_scores = np.abs((data - np.mean(data, axis=-1, keepdims=True)) / np.std(data, axis=-1, keepdims=True))
         clean_data = data.copy()
         clean_data[z_scores > threshold] = np.nan
         # Interpolate missing values
-        clean_data = pd.Series(clean_data).interpolate().values
+        if clean_data.ndim == 1:
+            clean_data = pd.Series(clean_data).interpolate().values
+        else:
+            clean_data = pd.DataFrame(clean_data.T).interpolate().values.T
         return clean_data
     
-    def extract_features(self, data: np.ndarray) -> Dict[str, float]:
+    def extract_features(self, data: np.ndarray, filtered: bool = False, metrics: Optional[Iterable[str]] = None,
+                         timings: Optional[Dict[str, float]] = None) -> Dict[str, float]:
         """Extract comprehensive EEG features"""
-        # Apply preprocessing
-        data = self.apply_notch_filter(data)
-        data = self.apply_bandpass_filter(data)
-        data = self.remove_artifacts(data)
+        features = self.extract_features_matrix(np.asarray(data, dtype=float)[np.newaxis, :], filtered=filtered,
+                                                metrics=metrics, timings=timings)
+        return {name: float(value) for name, value in features.iloc[0].items()}
+    
+    def extract_features_matrix(self, data: np.ndarray, channel_names: Optional[List[str]] = None,
+                                filtered: bool = False, metrics: Optional[Iterable[str]] = None,
+                                timings: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+        """
+        Extract EEG features for every channel at once
         
-        # Compute FFT
-        fft_vals = fft(data)
-        freqs = fftfreq(len(data), 1/self.sample_rate)
+        Args:
+            data: EEG signals shaped (channels, samples)
+            channel_names: Optional row labels, one per channel
+            filtered: True if data already went through the notch/bandpass filters
+            metrics: Exact complexity metrics to add (names from COMPLEXITY_METRICS),
+                default the preprocessor's complexity_metrics
+            timings: If given, filled with the milliseconds each complexity metric took
+            
+        Returns:
+            DataFrame of shape (channels, features) with the same columns as extract_features
+        """
+        data = np.atleast_2d(np.asarray(data, dtype=float))
         
-        # Power spectral density
-        psd = np.abs(fft_vals) ** 2
+        # Apply preprocessing
+        if not filtered:
+            data = self.apply_filters(data)
+        data = self.remove_artifacts(data)
         
         # Frequency band powers
-        delta_mask = (freqs >= 0.5) & (freqs <= 4)
-        theta_mask = (freqs >= 4) & (freqs <= 8)
-        alpha_mask = (freqs >= 8) & (freqs <= 13)
-        beta_mask = (freqs >= 13) & (freqs <= 30)
-        gamma_mask = (freqs >= 30) & (freqs <= 100)
-        
-        delta_power = np.mean(psd[delta_mask]) if np.any(delta_mask) else 0
-        theta_power = np.mean(psd[theta_mask]) if np.any(theta_mask) else 0
-        alpha_power = np.mean(psd[alpha_mask]) if np.any(alpha_mask) else 0
-        beta_power = np.mean(psd[beta_mask]) if np.any(beta_mask) else 0
-        gamma_power = np.mean(psd[gamma_mask]) if np.any(gamma_mask) else 0
+        band_powers = self.band_power_engine.band_powers(data, self.sample_rate)
+        features = {f'{band}_power': power for band, power in band_powers.items()}
         
         # Statistical features
-        mean_val = np.mean(data)
-        std_val = np.std(data)
-        variance = np.var(data)
-        skewness = self._calculate_skewness(data)
-        kurtosis = self._calculate_kurtosis(data)
+        features['mean'] = np.mean(data, axis=-1)
+        features['std'] = np.std(data, axis=-1)
+        features['variance'] = np.var(data, axis=-1)
+        features['skewness'] = self._calculate_skewness(data)
+        features['kurtosis'] = self._calculate_kurtosis(data)
         
         # Entropy and complexity measures
-        shannon_entropy = self._calculate_shannon_entropy(data)
-        sample_entropy = self._calculate_sample_entropy(data)
+        features['shannon_entropy'] = self._calculate_shannon_entropy(data)
+        features['sample_entropy'] = self._calculate_sample_entropy(data)
+        
+        # Exact complexity metrics; an exact sample_entropy replaces the dispersion estimate above
+        metrics = self.complexity_metrics if metrics is None else validate_metrics(metrics)
+        if metrics:
+            values, elapsed = complexity_features(data, metrics, self.complexity_options())
+            features.update(values)
+            if timings is not None:
+                timings.update(elapsed)
         
         # Connectivity features (simplified)
-        coherence = self._calculate_coherence(data)
+        features['coherence'] = self._calculate_coherence(data)
         
-        return {
-            'delta_power': delta_power,
-            'theta_power': theta_power,
-            'alpha_power': alpha_power,
-            'beta_power': beta_power,
-            'gamma_power': gamma_power,
-            'mean': mean_val,
-            'std': std_val,
-            'variance': variance,
-            'skewness': skewness,
-            'kurtosis': kurtosis,
-            'shannon_entropy': shannon_entropy,
-            'sample_entropy': sample_entropy,
-            'coherence': coherence,
-            'total_power': delta_power + theta_power + alpha_power + beta_power + gamma_power
-        }
+        features['total_power'] = sum(features[f'{band}_power'] for band in self.FREQUENCY_BANDS)
+        
+        return pd.DataFrame(features, index=channel_names)
+    
+    def complexity_options(self) -> Dict[str, Dict[str, Optional[int]]]:
+        """Keyword arguments per complexity metric: the exact-length and pair bounds of SampEn and ApEn"""
+        bounds = {'max_exact_length': self.entropy_max_exact_length, 'max_pairs': self.entropy_max_pairs}
+        return {'sample_entropy': bounds, 'approximate_entropy': bounds}
     
     def _calculate_skewness(self, data: np.ndarray) -> float:
-        """Calculate skewness of the signal"""
-        mean = np.mean(data)
-        std = np.std(data)
-        return np.mean(((data - mean) / std) ** 3)
+        """Calculate skewness of the signal along the last axis"""
+        mean = np.mean(data, axis=-1, keepdims=True)
+        std = np.std(data, axis=-1, keepdims=True)
+        return np.mean(((data - mean) / std) ** 3, axis=-1)
     
     def _calculate_kurtosis(self, data: np.ndarray) -> float:
-        """Calculate kurtosis of the signal"""
-        mean = np.mean(data)
-        std = np.std(data)
-        return np.mean(((data - mean) / std) ** 4) - 3
+        """Calculate kurtosis of the signal along the last axis"""
+        mean = np.mean(data, axis=-1, keepdims=True)
+        std = np.std(data, axis=-1, keepdims=True)
+        return np.mean(((data - mean) / std) ** 4, axis=-1) - 3
     
-    def _calculate_shannon_entropy(self, data: np.ndarray) -> float:
-        """Calculate Shannon entropy"""
-        hist, _ = np.histogram(data, bins=50, density=True)
-        hist = hist[hist > 0]
-        return -np.sum(hist * np.log2(hist))
+    def _calculate_shannon_entropy(self, data: np.ndarray, bins: int = 50) -> float:
+        """Calculate Shannon entropy of the density histogram along the last axis"""
+        rows = np.atleast_2d(data)
+        low = rows.min(axis=-1)
+        high = rows.max(axis=-1)
+        # Match np.histogram for constant signals
+        constant = high == low
+        low = np.where(constant, low - 0.5, low)
+        high = np.where(constant, high + 0.5, high)
+        width = (high - low) / bins
+        
+        # Histogram every row with one bincount over row-offset bin indices
+        bin_index = np.clip(((rows - low[:, None]) / width[:, None]).astype(int), 0, bins - 1)
+        bin_index += np.arange(len(rows))[:, None] * bins
+        counts = np.bincount(bin_index.ravel(), minlength=len(rows) * bins).reshape(len(rows), bins)
+        
+        hist = counts / (rows.shape[-1] * width[:, None])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entropy = -np.sum(np.where(hist > 0, hist * np.log2(hist), 0.0), axis=-1)
+        return entropy if np.ndim(data) > 1 else entropy[0]
     
     def _calculate_sample_entropy(self, data: np.ndarray, m: int = 2, r: float = 0.2) -> float:
         """Calculate sample entropy (simplified version)"""
-        # Simplified implementation for computational efficiency
-        return np.std(data) / np.mean(np.abs(np.diff(data)))
+        # Simplified implementation for computational efficiency; select the
+        # 'sample_entropy' complexity metric for the exact value
+        return np.std(data, axis=-1) / np.mean(np.abs(np.diff(data, axis=-1)), axis=-1)
     
     def _calculate_coherence(self, data: np.ndarray) -> float:
         """Calculate signal coherence (simplified)"""
         # Simplified coherence calculation
-        return 1.0 / (1.0 + np.std(data))
+        return 1.0 / (1.0 + np.std(data, axis=-1))
+
+class IncrementalFeatureAccumulator:
+    """
+    Sliding-window EEG features updated in O(hop) per step
+    
+    Keeps the current window in a ring buffer together with:
+    - running sums of x, x^2, x^3, x^4 for mean, variance, skewness and kurtosis
+    - the running sum of |diff| used by the sample entropy estimate
+    - a sliding DFT of the rfft bins that fall inside the EEG bands
+    
+    Shannon entropy and the preprocessor's configured complexity metrics are
+    computed from the whole window when features are requested, since their
+    histogram edges and template matches depend on the full window; Shannon
+    entropy is a single O(window) pass. Features match
+    EEGPreprocessor.extract_features(window, filtered=True) apart from artifact
+    interpolation, which is skipped. Every resync_every steps the running sums
+    are recomputed exactly to remove floating-point drift.
+    """
+    
+    def __init__(self, window: int, preprocessor: EEGPreprocessor, resync_every: int = 64):
+        self.window = window
+        self.preprocessor = preprocessor
+        self.resync_every = resync_every
+        
+        # Only the rfft bins covered by a band are tracked by the sliding DFT
+        engine = preprocessor.band_power_engine
+        starts, stops = engine.fft_layout(window, preprocessor.sample_rate)
+        self._first_bin = int(starts.min())
+        self._band_starts = starts - self._first_bin
+        self._band_stops = stops - self._first_bin
+        self._bin_numbers = np.arange(self._first_bin, int(stops.max()))
+        self._twiddles: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        
+        self._buffer = np.zeros(window)
+        self._position = 0  # Index of the oldest sample once the buffer is full
+        self._seen = 0
+        self._steps_since_sync = 0
+    
+    @property
+    def ready(self) -> bool:
+        """True once a full window has been pushed"""
+        return self._seen >= self.window
+    
+    def current_window(self) -> np.ndarray:
+        """Copy of the current window in time order"""
+        if not self.ready:
+            return self._buffer[:self._seen].copy()
+        return np.roll(self._buffer, -self._position)
+    
+    def push(self, samples: np.ndarray) -> None:
+        """Append new (already filtered) samples, sliding the window forward"""
+        samples = np.asarray(samples, dtype=float).ravel()
+        if len(samples) == 0:
+            return
+        
+        if not self.ready:
+            take = min(self.window - self._seen, len(samples))
+            self._buffer[self._seen:self._seen + take] = samples[:take]
+            self._seen += take
+            samples = samples[take:]
+            if self.ready:
+                self._resync()
+            if len(samples) == 0:
+                return
+        
+        if len(samples) >= self.window:
+            # Nothing of the old window survives, so start over from the newest samples
+            self._buffer[:] = samples[-self.window:]
+            self._position = 0
+            self._seen += len(samples)
+            self._resync()
+            return
+        
+        self._slide(samples)
+    
+    def features(self) -> Dict[str, float]:
+        """Feature dictionary for the current window, with the same keys as extract_features"""
+        if not self.ready:
+            raise ValueError(f"Need {self.window} samples before features are available, got {self._seen}")
+        if self._steps_since_sync >= self.resync_every:
+            self._resync()
+        
+        n = self.window
+        mean = self._sums[0] / n
+        raw2, raw3, raw4 = self._sums[1] / n, self._sums[2] / n, self._sums[3] / n
+        variance = max(raw2 - mean ** 2, 0.0)
+        std = np.sqrt(variance)
+        m3 = raw3 - 3 * mean * raw2 + 2 * mean ** 3
+        m4 = raw4 - 4 * mean * raw3 + 6 * mean ** 2 * raw2 - 3 * mean ** 4
+        
+        powers = self.preprocessor.band_power_engine.reduce_bands(
+            np.abs(self._spectrum) ** 2, self._band_starts, self._band_stops)
+        features = {f'{band}_power': float(power) for band, power in powers.items()}
+        window = self.current_window()
+        
+        features.update({
+            'mean': float(mean),
+            'std': float(std),
+            'variance': float(variance),
+            'skewness': float(m3 / std ** 3) if std > 0 else 0.0,
+            'kurtosis': float(m4 / variance ** 2 - 3) if variance > 0 else 0.0,
+            'shannon_entropy': float(self.preprocessor._calculate_shannon_entropy(window)),
+            'sample_entropy': float(std / (self._abs_diff_sum / (n - 1))) if self._abs_diff_sum > 0 else 0.0,
+            'coherence': float(1.0 / (1.0 + std)),
+        })
+        
+        # Configured complexity metrics; an exact sample_entropy replaces the dispersion estimate above
+        if self.preprocessor.complexity_metrics:
+            values, _ = complexity_features(window, self.preprocessor.complexity_metrics,
+                                            self.preprocessor.complexity_options())
+            features.update({name: float(value[0]) for name, value in values.items()})
+        features['total_power'] = sum(features[f'{band}_power'] for band in self.preprocessor.FREQUENCY_BANDS)
+        return features
+    
+    def _resync(self) -> None:
+        """Recompute every running statistic exactly from the current window"""
+        window = self.current_window()
+        self._sums = np.array([np.sum(window ** p) for p in range(1, 5)])
+        self._abs_diff_sum = float(np.sum(np.abs(np.diff(window))))
+        self._spectrum = np.fft.rfft(window)[self._bin_numbers]
+        self._steps_since_sync = 0
+    
+    def _twiddle(self, hop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cached (per-sample twiddle matrix, per-hop rotation) for a hop length"""
+        if hop not in self._twiddles:
+            k = self._bin_numbers[:, None]
+            i = np.arange(hop)[None, :]
+            self._twiddles[hop] = (
+                np.exp(-2j * np.pi * k * i / self.window),
+                np.exp(2j * np.pi * self._bin_numbers * hop / self.window)
+            )
+        return self._twiddles[hop]
+    
+    def _slide(self, new: np.ndarray) -> None:
+        """Advance the window by len(new) < window samples"""
+        hop = len(new)
+        index = (self._position + np.arange(hop + 1)) % self.window
+        leaving = self._buffer[index[:hop]]
+        after_leaving = self._buffer[index[hop]]
+        newest = self._buffer[(self._position - 1) % self.window]
+        
+        # Moments
+        for p in range(1, 5):
+            self._sums[p - 1] += np.sum(new ** p) - np.sum(leaving ** p)
+        
+        # Sum of |diff|: drop the diffs that start in the leaving samples, add those ending in the new ones
+        self._abs_diff_sum += (np.abs(np.diff(np.concatenate([[newest], new]))).sum()
+                               - np.abs(np.diff(np.concatenate([leaving, [after_leaving]]))).sum())
+        
+        # Sliding DFT: X_k <- e^{j2pi k h/N} (X_k + sum_i (new_i - leaving_i) e^{-j2pi k i/N})
+        twiddle, rotation = self._twiddle(hop)
+        self._spectrum = rotation * (self._spectrum + twiddle @ (new - leaving))
+        
+        self._buffer[index[:hop]] = new
+        self._position = (self._position + hop) % self.window
+        self._seen += hop
+        self._steps_since_sync += 1
 
 class EEGNet(nn.Module):
     """
@@ -194,21 +428,49 @@ class EEGNet(nn.Module):
             nn.Linear(16, num_classes)
         )
         
+        # Set by fold_batch_norm(); folded batch norms are skipped in forward
+        self.batch_norm_folded = False
+        
+    def _conv_bn(self, conv: nn.Conv2d, bn: nn.BatchNorm2d, x: torch.Tensor) -> torch.Tensor:
+        """Convolution followed by its batch norm, unless the batch norm was folded into it"""
+        x = conv(x)
+        return x if self.batch_norm_folded else bn(x)
+    
+    def fold_batch_norm(self) -> None:
+        """
+        Fold every batch norm's running statistics into the preceding convolution
+        
+        For inference only. The batch norms are reset to the identity, so the
+        state dict keeps its layout and still loads into an unfolded EEGNet
+        with identical eval-mode outputs.
+        """
+        if self.batch_norm_folded:
+            return
+        for conv, bn in ((self.temporal_conv, self.temporal_bn), (self.spatial_conv, self.spatial_bn),
+                         (self.separable_conv, self.separable_bn), (self.pointwise_conv, self.pointwise_bn)):
+            conv.weight, conv.bias = torch.nn.utils.fuse_conv_bn_weights(
+                conv.weight, conv.bias, bn.running_mean, bn.running_var, bn.eps, bn.weight, bn.bias)
+            with torch.no_grad():
+                bn.reset_parameters()
+                # running_var of 1 - eps makes the identity exact: x / sqrt(var + eps) == x
+                bn.running_var.fill_(1.0 - bn.eps)
+        self.batch_norm_folded = True
+        
     def forward(self, x):
         # Input shape: (batch, channels, time)
         x = x.unsqueeze(1)  # Add channel dimension
         
         # Temporal convolution
-        x = F.elu(self.temporal_bn(self.temporal_conv(x)))
-        x = F.elu(self.spatial_bn(self.spatial_conv(x)))
+        x = F.elu(self._conv_bn(self.temporal_conv, self.temporal_bn, x))
+        x = F.elu(self._conv_bn(self.spatial_conv, self.spatial_bn, x))
         x = F.avg_pool2d(x, (1, 4))
-        x = F.dropout(x, 0.25)
+        x = F.dropout(x, 0.25, self.training)
         
         # Separable convolution
-        x = F.elu(self.separable_bn(self.separable_conv(x)))
-        x = F.elu(self.pointwise_bn(self.pointwise_conv(x)))
+        x = F.elu(self._conv_bn(self.separable_conv, self.separable_bn, x))
+        x = F.elu(self._conv_bn(self.pointwise_conv, self.pointwise_bn, x))
         x = F.avg_pool2d(x, (1, 8))
-        x = F.dropout(x, 0.25)
+        x = F.dropout(x, 0.25, self.training)
         
         # Classification
         x = self.classifier(x)
@@ -217,53 +479,264 @@ class EEGNet(nn.Module):
 class EEGLSTM(nn.Module):
     """
     LSTM-based model for temporal EEG analysis
+    
+    Front ends (what one recurrent step sees):
+    - 'raw': one sample per step (original behaviour)
+    - 'conv': a strided convolution over windows of 2 * stride samples, one every stride samples
+    - 'bandpower': log band powers of a Hann-windowed half-second frame, one every stride samples
+    
+    The strided front ends cut the number of sequential LSTM steps by stride.
     """
     
-    def __init__(self, input_size: int = 1, hidden_size: int = 128, num_layers: int = 2, num_classes: int = 5):
+    FRONTENDS = ('raw', 'conv', 'bandpower')
+    
+    def __init__(self, input_size: int = 1, hidden_size: int = 128, num_layers: int = 2, num_classes: int = 5,
+                 frontend: str = 'raw', stride: int = 16, sample_rate: int = 256, frontend_channels: int = 32):
         super(EEGLSTM, self).__init__()
         
+        if frontend not in self.FRONTENDS:
+            raise ValueError(f"Unknown LSTM front end '{frontend}'. Use one of {self.FRONTENDS}")
+        
         self.hidden_size = hidden_size
         self.num_layers = num_layers
+        self.frontend = frontend
+        self.stride = 1 if frontend == 'raw' else stride
+        
+        if frontend == 'conv':
+            self.kernel_size = 2 * stride
+            self.frontend_conv = nn.Conv1d(input_size, frontend_channels, self.kernel_size, stride=stride)
+            lstm_input_size = frontend_channels
+        elif frontend == 'bandpower':
+            # Half-second frames give 2 Hz bins, enough to separate the delta band
+            self.kernel_size = max(2 * stride, sample_rate // 2)
+            freqs = torch.fft.rfftfreq(self.kernel_size, 1 / sample_rate)
+            bands = torch.stack([((freqs >= low) & (freqs < high)).float()
+                                 for low, high in EEGPreprocessor.FREQUENCY_BANDS.values()], dim=1)
+            self.register_buffer('band_matrix', bands, persistent=False)
+            self.register_buffer('window', torch.hann_window(self.kernel_size), persistent=False)
+            lstm_input_size = input_size * bands.shape[1]
+        else:
+            self.kernel_size = 1
+            lstm_input_size = input_size
+        # Frames are centred, so a signal of T samples gives about T / stride steps
+        self.padding = (self.kernel_size - self.stride) // 2
         
-        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True, dropout=0.2)
+        self.lstm = nn.LSTM(lstm_input_size, hidden_size, num_layers, batch_first=True, dropout=0.2)
         self.dropout = nn.Dropout(0.5)
         self.fc = nn.Linear(hidden_size, num_classes)
+    
+    @property
+    def variant(self) -> str:
+        """Front end and stride, e.g. 'conv16'; weights only fit models of the same variant"""
+        return 'raw' if self.frontend == 'raw' else f'{self.frontend}{self.stride}'
+    
+    def sequence_lengths(self, lengths: torch.Tensor) -> torch.Tensor:
+        """Number of LSTM steps for signals of the given sample counts"""
+        if self.frontend == 'raw':
+            return lengths
+        return ((lengths + 2 * self.padding - self.kernel_size) // self.stride + 1).clamp(min=1)
+    
+    def _encode(self, x):
+        """Map (batch, time, features) samples to (batch, steps, lstm input) frames"""
+        if self.frontend == 'raw':
+            return x
         
-    def forward(self, x):
-        # x shape: (batch, time, features)
-        lstm_out, _ = self.lstm(x)
-        lstm_out = lstm_out[:, -1, :]  # Take last output
+        x = x.transpose(1, 2)  # (batch, features, time)
+        x = F.pad(x, (self.padding, self.padding))
+        if x.shape[-1] < self.kernel_size:
+            x = F.pad(x, (0, self.kernel_size - x.shape[-1]))
+        if self.frontend == 'conv':
+            return F.relu(self.frontend_conv(x)).transpose(1, 2)
+        
+        frames = x.unfold(-1, self.kernel_size, self.stride) * self.window  # (batch, features, steps, kernel)
+        power = torch.fft.rfft(frames).abs().pow(2) @ self.band_matrix
+        power = torch.log(power + 1e-6).permute(0, 2, 1, 3)  # (batch, steps, features, bands)
+        return power.reshape(power.shape[0], power.shape[1], -1)
+    
+    def forward(self, x, lengths: Optional[torch.Tensor] = None):
+        """
+        x shape: (batch, time, features). For a zero-padded batch of signals with
+        different lengths pass their sample counts as lengths: the frames are
+        packed so every row ends on its own last step, not on the padding.
+        """
+        x = self._encode(x)
+        if lengths is None:
+            lstm_out, _ = self.lstm(x)
+            lstm_out = lstm_out[:, -1, :]  # Take last output
+        else:
+            steps = self.sequence_lengths(lengths).clamp(max=x.shape[1])
+            packed = nn.utils.rnn.pack_padded_sequence(x, steps.cpu(), batch_first=True, enforce_sorted=False)
+            _, (hidden, _) = self.lstm(packed)
+            lstm_out = hidden[-1]  # Last layer's state at each row's last step
         lstm_out = self.dropout(lstm_out)
         output = self.fc(lstm_out)
         return output
+    
+    @staticmethod
+    def pad_batch(signals: List[np.ndarray]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Zero-pad 1D signals (or (time, features) arrays) into a (batch, time, features) tensor plus their lengths"""
+        tensors = [torch.as_tensor(np.asarray(s, dtype=np.float32)) for s in signals]
+        tensors = [t.unsqueeze(-1) if t.dim() == 1 else t for t in tensors]
+        lengths = torch.tensor([t.shape[0] for t in tensors])
+        return nn.utils.rnn.pad_sequence(tensors, batch_first=True), lengths
+
+class LinearAttentionEncoderLayer(nn.Module):
+    """
+    Transformer encoder layer with kernelized linear attention
+    Based on: Katharopoulos, A., et al. "Transformers are RNNs: Fast autoregressive transformers with linear attention." ICML 2020.
+    
+    Uses the elu(x) + 1 feature map so attention cost grows linearly with the number of tokens.
+    """
+    
+    def __init__(self, d_model: int = 128, nhead: int = 8, dim_feedforward: int = 512, dropout: float = 0.1):
+        super(LinearAttentionEncoderLayer, self).__init__()
+        
+        self.nhead = nhead
+        self.qkv_projection = nn.Linear(d_model, 3 * d_model)
+        self.out_projection = nn.Linear(d_model, d_model)
+        
+        # Feed-forward block (post-norm, matching nn.TransformerEncoderLayer)
+        self.linear1 = nn.Linear(d_model, dim_feedforward)
+        self.linear2 = nn.Linear(dim_feedforward, d_model)
+        self.norm1 = nn.LayerNorm(d_model)
+        self.norm2 = nn.LayerNorm(d_model)
+        self.dropout = nn.Dropout(dropout)
+        self.dropout1 = nn.Dropout(dropout)
+        self.dropout2 = nn.Dropout(dropout)
+        
+    def forward(self, x, src_key_padding_mask: Optional[torch.Tensor] = None):
+        # x shape: (batch, tokens, d_model)
+        batch, tokens, d_model = x.shape
+        q, k, v = self.qkv_projection(x).chunk(3, dim=-1)
+        q, k, v = (t.view(batch, tokens, self.nhead, -1).transpose(1, 2) for t in (q, k, v))
+        
+        q = F.elu(q) + 1
+        k = F.elu(k) + 1
+        if src_key_padding_mask is not None:
+            k = k.masked_fill(src_key_padding_mask[:, None, :, None], 0.0)
+        
+        kv = torch.einsum('bhtd,bhte->bhde', k, v)
+        normalizer = 1.0 / (torch.einsum('bhtd,bhd->bht', q, k.sum(dim=2)) + 1e-6)
+        attn = torch.einsum('bhtd,bhde,bht->bhte', q, kv, normalizer)
+        attn = attn.transpose(1, 2).reshape(batch, tokens, d_model)
+        
+        x = self.norm1(x + self.dropout1(self.out_projection(attn)))
+        x = self.norm2(x + self.dropout2(self.linear2(self.dropout(F.relu(self.linear1(x))))))
+        return x
+
+class LinearAttentionEncoder(nn.Module):
+    """
+    Stack of linear-attention encoder layers with the nn.TransformerEncoder call signature
+    """
+    
+    def __init__(self, d_model: int = 128, nhead: int = 8, dim_feedforward: int = 512, dropout: float = 0.1, num_layers: int = 4):
+        super(LinearAttentionEncoder, self).__init__()
+        
+        self.layers = nn.ModuleList([
+            LinearAttentionEncoderLayer(d_model, nhead, dim_feedforward, dropout)
+            for _ in range(num_layers)
+        ])
+        
+    def forward(self, x, src_key_padding_mask: Optional[torch.Tensor] = None):
+        for layer in self.layers:
+            x = layer(x, src_key_padding_mask=src_key_padding_mask)
+        return x
 
 class EEGTransformer(nn.Module):
     """
     Transformer-based model for EEG sequence analysis
+    
+    Tokenization:
+    - patch_size == 1: every sample becomes a token (original behaviour)
+    - patch_size > 1: windows of patch_size samples, taken every patch_stride samples, become one token
+    
+    Attention:
+    - 'full': standard softmax attention over all tokens, O(T^2)
+    - 'local': softmax attention inside non-overlapping blocks of local_window tokens, O(T)
+    - 'linear': kernelized linear attention over all tokens, O(T)
     """
     
-    def __init__(self, input_size: int = 1, d_model: int = 128, nhead: int = 8, num_layers: int = 4, num_classes: int = 5):
+    ATTENTION_MODES = ('full', 'local', 'linear')
+    DEFAULT_VARIANT = 'sample_full'
+    
+    def __init__(self, input_size: int = 1, d_model: int = 128, nhead: int = 8, num_layers: int = 4, num_classes: int = 5,
+                 patch_size: int = 1, patch_stride: Optional[int] = None, attention: str = 'full', local_window: int = 64):
         super(EEGTransformer, self).__init__()
         
+        if attention not in self.ATTENTION_MODES:
+            raise ValueError(f"Unknown attention mode '{attention}'. Use one of {self.ATTENTION_MODES}")
+        
         self.d_model = d_model
-        self.input_projection = nn.Linear(input_size, d_model)
-        
-        encoder_layer = nn.TransformerEncoderLayer(
-            d_model=d_model,
-            nhead=nhead,
-            dim_feedforward=d_model * 4,
-            dropout=0.1,
-            batch_first=True
-        )
+        self.patch_size = patch_size
+        self.patch_stride = patch_stride or patch_size
+        self.attention = attention
+        self.local_window = local_window
         
-        self.transformer = nn.TransformerEncoder(encoder_layer, num_layers=num_layers)
+        if patch_size > 1:
+            # A strided convolution is a linear projection of each window of samples
+            self.patch_embedding = nn.Conv1d(input_size, d_model, kernel_size=patch_size, stride=self.patch_stride)
+        else:
+            self.input_projection = nn.Linear(input_size, d_model)
+        
+        if attention == 'linear':
+            self.transformer = LinearAttentionEncoder(
+                d_model=d_model,
+                nhead=nhead,
+                dim_feedforward=d_model * 4,
+                dropout=0.1,
+                num_layers=num_layers
+            )
+        else:
+            encoder_layer = nn.TransformerEncoderLayer(
+                d_model=d_model,
+                nhead=nhead,
+                dim_feedforward=d_model * 4,
+                dropout=0.1,
+                batch_first=True
+            )
+            
+            self.transformer = nn.TransformerEncoder(encoder_layer, num_layers=num_layers)
         self.dropout = nn.Dropout(0.5)
         self.classifier = nn.Linear(d_model, num_classes)
         
+    @property
+    def variant(self) -> str:
+        """Tokenization and attention, e.g. 'patch32_local'; weights only fit models of the same variant"""
+        tokens = 'sample' if self.patch_size == 1 else f'patch{self.patch_size}'
+        if self.patch_stride != self.patch_size:
+            tokens += f'x{self.patch_stride}'
+        return f'{tokens}_{self.attention}'
+    
+    def _tokenize(self, x):
+        """Map (batch, time, features) to (batch, tokens, d_model)"""
+        if self.patch_size == 1:
+            return self.input_projection(x)
+        
+        x = x.transpose(1, 2)  # (batch, features, time)
+        if x.shape[-1] < self.patch_size:
+            x = F.pad(x, (0, self.patch_size - x.shape[-1]))
+        return self.patch_embedding(x).transpose(1, 2)
+        
     def forward(self, x):
         # x shape: (batch, time, features)
-        x = self.input_projection(x)
-        x = self.transformer(x)
+        x = self._tokenize(x)
+        
+        if self.attention == 'local':
+            # Fold tokens into blocks so attention only spans local_window tokens
+            batch, tokens, d_model = x.shape
+            padding = (-tokens) % self.local_window
+            x = F.pad(x, (0, 0, 0, padding))
+            x = x.reshape(-1, self.local_window, d_model)
+            mask = None
+            if padding:
+                mask = torch.zeros(batch, tokens + padding, dtype=torch.bool, device=x.device)
+                mask[:, tokens:] = True
+                mask = mask.reshape(-1, self.local_window)
+            x = self.transformer(x, src_key_padding_mask=mask)
+            x = x.reshape(batch, tokens + padding, d_model)[:, :tokens]
+        else:
+            x = self.transformer(x)
+        
         x = x.mean(dim=1)  # Global average pooling
         x = self.dropout(x)
         x = self.classifier(x)
@@ -274,15 +747,96 @@ class EEGEnsembleModel:
     Ensemble model combining multiple architectures for robust predictions
     """
     
-    def __init__(self, num_classes: int = 5, num_channels: int = 1, sample_rate: int = 256):
+    # Map classes to conditions
+    class_mapping = {
+        0: "Normal",
+        1: "Seizure Risk",
+        2: "Cognitive Load",
+        3: "Stress",
+        4: "Sleep Disorder"
+    }
+    
+    # Inference backends: eager PyTorch, or networks traced to TorchScript, frozen and
+    # run through optimize_for_inference (conv/batch-norm folding and fused kernels)
+    BACKENDS = ('eager', 'torchscript')
+    
+    # Input shapes whose compiled networks are kept per ensemble
+    MAX_COMPILED_SHAPES = 8
+    
+    # Serving requests for a shape before it is compiled in the background; until the
+    # compiled networks are ready the shape is served eagerly, so one-off lengths never
+    # trace and traces never block a request
+    COMPILE_AFTER_REQUESTS = 3
+    
+    # Layer types converted by each dynamic int8 quantization mode. Quantized LSTMs cut their
+    # memory about 4x but are slower than fp32 when stepping one sample at a time on CPU.
+    QUANTIZATION_MODES = {
+        'none': set(),
+        'linear': {nn.Linear},
+        'full': {nn.Linear, nn.LSTM}
+    }
+    
+    # Ensemble modes: 'blend' always runs every network; 'cascade' runs them cheapest
+    # first and stops once the blended confidence of those run so far is high enough
+    ENSEMBLE_MODES = ('blend', 'cascade')
+    CASCADE_ORDER = ('eegnet', 'lstm_model', 'transformer_model')
+    
+    def __init__(self, num_classes: int = 5, num_channels: int = 1, sample_rate: int = 256,
+                 transformer_patch_size: Optional[int] = None, transformer_patch_stride: Optional[int] = None,
+                 transformer_attention: Optional[str] = None, transformer_window: Optional[int] = None,
+                 backend: Optional[str] = None, quantize: Optional[str] = None,
+                 ensemble_mode: Optional[str] = None, cascade_threshold: Optional[float] = None,
+                 lstm_frontend: Optional[str] = None, lstm_stride: Optional[int] = None):
         self.num_classes = num_classes
         self.num_channels = num_channels
         self.sample_rate = sample_rate
         
+        # Backend defaults to ML_INFERENCE_BACKEND (eager)
+        self.backend = backend or os.environ.get('ML_INFERENCE_BACKEND', 'eager')
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"Unknown inference backend '{self.backend}'. Use one of {self.BACKENDS}")
+        
+        # Dynamic int8 serving mode, default from ML_QUANTIZE (none); networks are converted
+        # by prepare_inference(), after any saved weights have been loaded
+        self.quantize = quantize or os.environ.get('ML_QUANTIZE', 'none')
+        if self.quantize not in self.QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization mode '{self.quantize}'. Use one of {tuple(self.QUANTIZATION_MODES)}")
+        self.quantized = False
+        self.inference_ready = False
+        
+        # Ensemble mode and early-exit confidence, defaults from ML_ENSEMBLE_MODE (blend)
+        # and ML_CASCADE_THRESHOLD (0.9)
+        self.ensemble_mode = ensemble_mode or os.environ.get('ML_ENSEMBLE_MODE', 'blend')
+        if self.ensemble_mode not in self.ENSEMBLE_MODES:
+            raise ValueError(f"Unknown ensemble mode '{self.ensemble_mode}'. Use one of {self.ENSEMBLE_MODES}")
+        self.cascade_threshold = cascade_threshold if cascade_threshold is not None else \
+            float(os.environ.get('ML_CASCADE_THRESHOLD', 0.9))
+        
+        # LSTM front end and stride, defaults from ML_LSTM_FRONTEND (raw) and ML_LSTM_STRIDE (16)
+        lstm_frontend = lstm_frontend or os.environ.get('ML_LSTM_FRONTEND', 'raw')
+        lstm_stride = lstm_stride or int(os.environ.get('ML_LSTM_STRIDE', 16))
+        
+        # Transformer tokenization and attention, defaults from ML_TRANSFORMER_PATCH_SIZE (1),
+        # ML_TRANSFORMER_PATCH_STRIDE (patch size), ML_TRANSFORMER_ATTENTION (full) and
+        # ML_TRANSFORMER_WINDOW (64 tokens per local attention block)
+        transformer_patch_size = transformer_patch_size or int(os.environ.get('ML_TRANSFORMER_PATCH_SIZE', 1))
+        patch_stride = os.environ.get('ML_TRANSFORMER_PATCH_STRIDE')
+        transformer_patch_stride = transformer_patch_stride or (int(patch_stride) if patch_stride else None)
+        transformer_attention = transformer_attention or os.environ.get('ML_TRANSFORMER_ATTENTION', 'full')
+        transformer_window = transformer_window or int(os.environ.get('ML_TRANSFORMER_WINDOW', 64))
+        
         # Initialize models
         self.eegnet = EEGNet(num_classes, num_channels, sample_rate)
-        self.lstm_model = EEGLSTM(input_size=num_channels, num_classes=num_classes)
-        self.transformer_model = EEGTransformer(input_size=num_channels, num_classes=num_classes)
+        self.lstm_model = EEGLSTM(input_size=num_channels, num_classes=num_classes,
+                                  frontend=lstm_frontend, stride=lstm_stride, sample_rate=sample_rate)
+        self.transformer_model = EEGTransformer(
+            input_size=num_channels,
+            num_classes=num_classes,
+            patch_size=transformer_patch_size,
+            patch_stride=transformer_patch_stride,
+            attention=transformer_attention,
+            local_window=transformer_window
+        )
         
         # Preprocessor
         self.preprocessor = EEGPreprocessor(sample_rate)
@@ -290,19 +844,307 @@ class EEGEnsembleModel:
         # Model weights for ensemble
         self.weights = [0.4, 0.3, 0.3]  # EEGNet, LSTM, Transformer
         
-    def predict(self, data: np.ndarray) -> Dict[str, Union[int, float, str]]:
+        # Compiled networks per (channels, time) input shape; traces specialize on the signal length.
+        # artifact_dir holds exported TorchScript files that are loaded instead of tracing.
+        self.artifact_dir: Optional[str] = None
+        self._compiled: 'OrderedDict[Tuple[int, int], Dict[str, torch.jit.ScriptModule]]' = OrderedDict()
+        self._building: Dict[Tuple[int, int], Future] = {}
+        self._shape_requests: 'OrderedDict[Tuple[int, int], int]' = OrderedDict()
+        self._compile_generation = 0
+        self._compiler: Optional[ThreadPoolExecutor] = None
+        # Guards the dicts above only; loading, tracing and optimizing run outside it
+        self._compile_lock = threading.RLock()
+        
+    def networks(self) -> Dict[str, nn.Module]:
+        """The ensemble's networks keyed by attribute name"""
+        return {
+            'eegnet': self.eegnet,
+            'lstm_model': self.lstm_model,
+            'transformer_model': self.transformer_model
+        }
+    
+    def prepare_inference(self) -> None:
+        """
+        Freeze the networks for serving: eval mode, no gradients, EEGNet batch norms folded
+        
+        Runs once, after any saved weights have been loaded (ModelRegistry calls
+        it at load, predictions call it otherwise), and applies the configured
+        quantization. Dropout is off and batch norm uses its running statistics,
+        so repeated predictions for a signal are identical.
+        """
+        with self._compile_lock:
+            if self.inference_ready:
+                return
+            for network in self.networks().values():
+                network.eval()
+                network.requires_grad_(False)
+            self.eegnet.fold_batch_norm()
+            if self.quantize != 'none':
+                self.quantize_networks()
+            self._reset_compiled()
+            self.inference_ready = True
+    
+    @staticmethod
+    def _network_input(name: str, data_tensor: torch.Tensor) -> torch.Tensor:
+        """Input layout each network expects: EEGNet takes (batch, channels, time), the others (batch, time, channels)"""
+        return data_tensor if name == 'eegnet' else data_tensor.transpose(1, 2)
+    
+    def quantize_networks(self, mode: Optional[str] = None) -> None:
+        """
+        Convert every network's Linear (and, in 'full' mode, LSTM) layers to dynamic int8 in place
+        
+        Weights are stored as int8 and activations are quantized on the fly.
+        The ensemble becomes inference-only: networks are switched to eval
+        mode and their state dicts no longer match the fp32 architecture.
+        """
+        mode = mode or self.quantize
+        if mode not in self.QUANTIZATION_MODES or mode == 'none':
+            raise ValueError(f"Cannot quantize with mode '{mode}'. Use 'linear' or 'full'")
+        with self._compile_lock:
+            if self.quantized:
+                return
+            for name, network in self.networks().items():
+                quantized = torch.ao.quantization.quantize_dynamic(network.eval(), self.QUANTIZATION_MODES[mode], dtype=torch.qint8)
+                for module in quantized.modules():
+                    if isinstance(module, nn.TransformerEncoderLayer):
+                        # The fused fast path reads fp32 weight tensors directly, so quantized layers take the regular path
+                        module.activation_relu_or_gelu = False
+                setattr(self, name, quantized)
+            self._reset_compiled()
+            self.quantize = mode
+            self.quantized = True
+        logger.info(f"Quantized ensemble networks to dynamic int8 ({mode}) for {self.sample_rate} Hz")
+    
+    def artifact_path(self, directory: str, name: str, shape: Tuple[int, int]) -> str:
+        """File name of an exported TorchScript network for one input shape"""
+        suffix = '' if self.quantize == 'none' else f'_int8_{self.quantize}'
+        if name == 'lstm_model' and self.lstm_model.frontend != 'raw':
+            name = f'{name}_{self.lstm_model.variant}'
+        if name == 'transformer_model' and self.transformer_model.variant != EEGTransformer.DEFAULT_VARIANT:
+            name = f'{name}_{self.transformer_model.variant}'
+        return os.path.join(directory, f'{name}_{self.sample_rate}hz_{shape[0]}ch_{shape[1]}{suffix}.pt')
+    
+    def _reset_compiled(self) -> None:
+        """Forget compiled networks and pending builds after the networks changed (caller holds the lock)"""
+        self._compiled.clear()
+        self._building.clear()
+        self._shape_requests.clear()
+        self._compile_generation += 1
+    
+    def compiled_networks(self, shape: Tuple[int, int]) -> Dict[str, torch.jit.ScriptModule]:
+        """
+        TorchScript networks for (channels, time) inputs, loaded or compiled on first use
+        
+        Networks are prepared for inference, traced, frozen and optimized for
+        inference. The batch dimension stays dynamic. Blocks until the build
+        (shared with any concurrent caller) finishes.
+        """
+        compiled = self._compiled_or_build((int(shape[0]), int(shape[1])))
+        return compiled.result() if isinstance(compiled, Future) else compiled
+    
+    def _compiled_or_build(self, shape: Tuple[int, int]) -> Union[Dict[str, torch.jit.ScriptModule], Future]:
+        """Cached compiled networks for shape, or the future of their background build (started if needed)"""
+        self.prepare_inference()
+        with self._compile_lock:
+            compiled = self._compiled.get(shape)
+            if compiled is not None:
+                self._compiled.move_to_end(shape)
+                return compiled
+            future = self._building.get(shape)
+            if future is None:
+                if self._compiler is None:
+                    self._compiler = ThreadPoolExecutor(1, thread_name_prefix='torchscript-compile')
+                future = self._compiler.submit(self._build_compiled, shape, self._compile_generation)
+                self._building[shape] = future
+            return future
+    
+    def _build_compiled(self, shape: Tuple[int, int], generation: int) -> Dict[str, torch.jit.ScriptModule]:
+        """Load or trace, then optimize, the networks for one shape and cache them; runs without the lock"""
+        try:
+            paths = {name: self.artifact_path(self.artifact_dir, name, shape)
+                     for name in self.networks()} if self.artifact_dir else {}
+            if paths and all(os.path.exists(path) for path in paths.values()):
+                frozen = {name: torch.jit.load(path) for name, path in paths.items()}
+                logger.info(f"Loaded TorchScript networks for input shape {shape} from {self.artifact_dir}")
+            else:
+                frozen = self._trace(shape)
+            # Optimized graphs hold prepacked weights that cannot be saved, so this runs after loading
+            compiled = {name: torch.jit.optimize_for_inference(network) for name, network in frozen.items()}
+        except Exception as e:
+            # The failed future stays registered, so the shape keeps being served eagerly instead of retracing
+            logger.error(f"Compiling networks for input shape {shape} failed: {str(e)}")
+            raise
+        
+        with self._compile_lock:
+            # Networks replaced (e.g. quantized) while building: the result is stale
+            if generation == self._compile_generation:
+                self._building.pop(shape, None)
+                self._compiled[shape] = compiled
+                while len(self._compiled) > self.MAX_COMPILED_SHAPES:
+                    self._compiled.popitem(last=False)
+        return compiled
+    
+    def _trace(self, shape: Tuple[int, int]) -> Dict[str, torch.jit.ScriptModule]:
+        """Trace and freeze every network for one input shape"""
+        example = torch.randn(2, *shape)
+        compiled = {}
+        with warnings.catch_warnings(), torch.no_grad():
+            # Tracer warnings about shape-derived Python values are expected: traces are per shape
+            warnings.simplefilter('ignore', torch.jit.TracerWarning)
+            for name, network in self.networks().items():
+                traced = torch.jit.trace(network, self._network_input(name, example), check_trace=False)
+                compiled[name] = torch.jit.freeze(traced)
+        logger.info(f"Traced TorchScript networks for input shape {shape}")
+        return compiled
+    
+    def export_compiled(self, directory: str, lengths: Iterable[int]) -> List[str]:
+        """
+        Save TorchScript networks for each signal length, so serving processes load instead of tracing
+        
+        Point the registry's weights directory (EEG_MODEL_WEIGHTS_DIR) at the
+        same directory to have ensembles pick the artifacts up.
+        """
+        self.prepare_inference()
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for length in lengths:
+            shape = (self.num_channels, int(length))
+            for name, network in self._trace(shape).items():
+                path = self.artifact_path(directory, name, shape)
+                torch.jit.save(network, path)
+                paths.append(path)
+        return paths
+    
+    def verify_compiled(self, length: int, batch_size: int = 4, seed: int = 0) -> Dict[str, float]:
+        """
+        Largest absolute difference between compiled and eager outputs
+        
+        Compares every network's logits and the blended ensemble probabilities
+        on a random (batch_size, channels, length) input.
+        """
+        generator = torch.Generator().manual_seed(seed)
+        data_tensor = torch.randn(batch_size, self.num_channels, length, generator=generator)
+        compiled = self.compiled_networks((self.num_channels, length))
+        
+        differences = {}
+        eager_probabilities, compiled_probabilities = [], []
+        with torch.inference_mode():
+            for name, network in self.networks().items():
+                inputs = self._network_input(name, data_tensor)
+                eager_out = network(inputs)
+                compiled_out = compiled[name](inputs)
+                differences[name] = (eager_out - compiled_out).abs().max().item()
+                eager_probabilities.append(F.softmax(eager_out, dim=1))
+                compiled_probabilities.append(F.softmax(compiled_out, dim=1))
+        
+        blend = lambda probabilities: sum(w * p for w, p in zip(self.weights, probabilities))
+        differences['ensemble'] = (blend(eager_probabilities) - blend(compiled_probabilities)).abs().max().item()
+        return differences
+    
+    def predict(self, data: np.ndarray, features: Optional[Dict[str, float]] = None) -> Dict[str, Union[int, float, str]]:
         """Make ensemble prediction"""
-        # Preprocess data
-        features = self.preprocessor.extract_features(data)
+        return self.predict_batch([data], features=None if features is None else [features])[0]
+    
+    def predict_batch(self, signals: List[np.ndarray], max_batch_size: int = 16,
+                      features: Optional[List[Dict[str, float]]] = None) -> List[Dict[str, Union[int, float, str]]]:
+        """
+        Make ensemble predictions for several signals at once
+        
+        Signals are bucketed by shape so each bucket stacks into a single
+        (batch, channels, time) tensor without padding, and every network runs
+        once per bucket chunk instead of once per signal.
+        
+        Args:
+            signals: List of 1D EEG signals, or (channels, time) arrays for a
+                multi-channel ensemble
+            max_batch_size: Upper bound on signals per forward pass
+            features: Precomputed feature dictionaries, one per signal
+            
+        Returns:
+            List of prediction dictionaries in the same order as ``signals``
+        """
+        signals = [np.asarray(s, dtype=float) for s in signals]
+        
+        # Preprocess data (multi-channel signals get their per-channel features averaged)
+        if features is None:
+            features = [self.preprocessor.extract_features(s) if s.ndim == 1 else
+                        {name: float(value) for name, value in self.preprocessor.extract_features_matrix(s).mean().items()}
+                        for s in signals]
+        
+        # Group signal indices by shape
+        buckets: Dict[Tuple[int, ...], List[int]] = {}
+        for i, s in enumerate(signals):
+            buckets.setdefault(s.shape, []).append(i)
         
-        # Prepare data for models
-        data_tensor = torch.FloatTensor(data).unsqueeze(0)  # Add batch dimension
+        probabilities: List[Optional[torch.Tensor]] = [None] * len(signals)
+        evaluated: List[List[str]] = [[] for _ in signals]
+        for indices in buckets.values():
+            for start in range(0, len(indices), max_batch_size):
+                chunk = indices[start:start + max_batch_size]
+                # Prepare data for models: (batch, channels, time)
+                data_tensor = torch.FloatTensor(np.stack([signals[i] for i in chunk]))
+                if data_tensor.dim() == 2:
+                    data_tensor = data_tensor.unsqueeze(1)
+                ensemble_pred, chunk_evaluated = self._ensemble_probabilities(data_tensor)
+                for row, i in enumerate(chunk):
+                    probabilities[i] = ensemble_pred[row]
+                    evaluated[i] = chunk_evaluated[row]
+        
+        results = [self._build_result(p, f) for p, f in zip(probabilities, features)]
+        for result, models in zip(results, evaluated):
+            result['ensemble_mode'] = self.ensemble_mode
+            result['models_evaluated'] = models
+        return results
+    
+    def _serving_networks(self, data_tensor: torch.Tensor) -> Dict[str, nn.Module]:
+        """
+        Networks of the configured backend for a (batch, channels, time) input
         
-        # Get predictions from each model
-        with torch.no_grad():
-            eegnet_pred = F.softmax(self.eegnet(data_tensor), dim=1)
-            lstm_pred = F.softmax(self.lstm_model(data_tensor.transpose(1, 2)), dim=1)
-            transformer_pred = F.softmax(self.transformer_model(data_tensor.transpose(1, 2)), dim=1)
+        The TorchScript backend serves a shape eagerly until it has been
+        requested COMPILE_AFTER_REQUESTS times and its background build has
+        finished, so requests never wait for a trace.
+        """
+        self.prepare_inference()
+        if self.backend != 'torchscript':
+            return self.networks()
+        
+        shape = (int(data_tensor.shape[1]), int(data_tensor.shape[2]))
+        with self._compile_lock:
+            compiled = self._compiled.get(shape)
+            if compiled is not None:
+                self._compiled.move_to_end(shape)
+                return compiled
+            if shape not in self._building:
+                requests = self._shape_requests.pop(shape, 0) + 1
+                if requests < self.COMPILE_AFTER_REQUESTS:
+                    # Bounded request counts; shapes not seen recently start over
+                    self._shape_requests[shape] = requests
+                    while len(self._shape_requests) > 4 * self.MAX_COMPILED_SHAPES:
+                        self._shape_requests.popitem(last=False)
+                    return self.networks()
+        
+        compiled = self._compiled_or_build(shape)
+        if isinstance(compiled, Future):
+            if not compiled.done() or compiled.exception() is not None:
+                return self.networks()
+            compiled = compiled.result()
+        return compiled
+    
+    def _ensemble_probabilities(self, data_tensor: torch.Tensor) -> Tuple[torch.Tensor, List[List[str]]]:
+        """
+        Blended softmax outputs for a (batch, channels, time) tensor
+        
+        Returns:
+            (probabilities, models_evaluated) with the names of the networks run for each row
+        """
+        if self.ensemble_mode == 'cascade':
+            return self._cascade_probabilities(data_tensor)
+        
+        networks = self._serving_networks(data_tensor)
+        with torch.inference_mode():
+            eegnet_pred = F.softmax(networks['eegnet'](data_tensor), dim=1)
+            lstm_pred = F.softmax(networks['lstm_model'](data_tensor.transpose(1, 2)), dim=1)
+            transformer_pred = F.softmax(networks['transformer_model'](data_tensor.transpose(1, 2)), dim=1)
         
         # Weighted ensemble
         ensemble_pred = (
@@ -310,40 +1152,68 @@ class EEGEnsembleModel:
             self.weights[1] * lstm_pred +
             self.weights[2] * transformer_pred
         )
+        return ensemble_pred, [list(networks) for _ in range(data_tensor.shape[0])]
+    
+    def _cascade_probabilities(self, data_tensor: torch.Tensor) -> Tuple[torch.Tensor, List[List[str]]]:
+        """
+        Run networks cheapest first, dropping rows whose running blend is confident enough
+        
+        After each network the rows still active get the weighted average of the
+        softmax outputs seen so far; rows whose top probability reaches
+        cascade_threshold skip the remaining networks. Rows that run every
+        network get exactly the 'blend' result.
+        """
+        networks = self._serving_networks(data_tensor)
+        weights = dict(zip(self.networks(), self.weights))
+        batch = data_tensor.shape[0]
+        evaluated: List[List[str]] = [[] for _ in range(batch)]
         
+        with torch.inference_mode():
+            blended = torch.zeros(batch, self.num_classes)
+            weight_sum = torch.zeros(batch, 1)
+            active = torch.arange(batch)
+            for name in self.CASCADE_ORDER:
+                if len(active) == 0:
+                    break
+                probabilities = F.softmax(networks[name](self._network_input(name, data_tensor[active])), dim=1)
+                blended[active] += weights[name] * probabilities
+                weight_sum[active] += weights[name]
+                for row in active.tolist():
+                    evaluated[row].append(name)
+                confidence = (blended[active] / weight_sum[active]).max(dim=1).values
+                active = active[confidence < self.cascade_threshold]
+            return blended / weight_sum, evaluated
+    
+    def _build_result(self, ensemble_pred: torch.Tensor, features: Dict[str, float]) -> Dict[str, Union[int, float, str]]:
+        """Turn one row of ensemble probabilities plus its features into a result dictionary"""
         # Get predicted class and confidence
-        predicted_class = torch.argmax(ensemble_pred, dim=1).item()
-        confidence = torch.max(ensemble_pred, dim=1)[0].item()
-        
-        # Map classes to conditions
-        class_mapping = {
-            0: "Normal",
-            1: "Seizure Risk",
-            2: "Cognitive Load",
-            3: "Stress",
-            4: "Sleep Disorder"
-        }
+        predicted_class = torch.argmax(ensemble_pred).item()
+        confidence = torch.max(ensemble_pred).item()
         
+        result = {
+            'predicted_class': self.class_mapping[predicted_class],
+            'confidence': confidence
+        }
         # Calculate risk scores based on features
-        seizure_risk = self._calculate_seizure_risk(features)
-        cognitive_load = self._calculate_cognitive_load(features)
-        stress_level = self._calculate_stress_level(features)
-        sleep_quality = self._calculate_sleep_quality(features)
-        
+        result.update(self.risk_scores(features))
+        return result
+    
+    @classmethod
+    def risk_scores(cls, features: Dict[str, float]) -> Dict[str, Union[int, float, str, Dict]]:
+        """Feature-derived risk scores; pure functions of the feature dict, no network involved"""
         return {
-            'predicted_class': class_mapping[predicted_class],
-            'confidence': confidence,
-            'seizure_risk': seizure_risk,
-            'cognitive_load': cognitive_load,
-            'stress_level': stress_level,
-            'sleep_quality': sleep_quality,
+            'seizure_risk': cls._calculate_seizure_risk(features),
+            'cognitive_load': cls._calculate_cognitive_load(features),
+            'stress_level': cls._calculate_stress_level(features),
+            'sleep_quality': cls._calculate_sleep_quality(features),
             'features': features,
-            'anomalies': self._detect_anomalies(features),
+            'anomalies': cls._detect_anomalies(features),
             'coherence': features['coherence'],
-            'asymmetry': self._calculate_asymmetry(features)
+            'asymmetry': cls._calculate_asymmetry(features)
         }
     
-    def _calculate_seizure_risk(self, features: Dict[str, float]) -> float:
+    @staticmethod
+    def _calculate_seizure_risk(features: Dict[str, float]) -> float:
         """Calculate seizure risk based on validated research criteria"""
         # Based on research: high gamma power, high variance, low coherence
         gamma_factor = features['gamma_power'] / max(features['total_power'], 1e-6)
@@ -353,7 +1223,8 @@ class EEGEnsembleModel:
         risk_score = (0.4 * gamma_factor + 0.3 * variance_factor + 0.3 * coherence_factor) * 100
         return min(max(risk_score, 0), 100)
     
-    def _calculate_cognitive_load(self, features: Dict[str, float]) -> str:
+    @staticmethod
+    def _calculate_cognitive_load(features: Dict[str, float]) -> str:
         """Calculate cognitive load based on beta/theta ratio"""
         beta_theta_ratio = features['beta_power'] / max(features['theta_power'], 1e-6)
         
@@ -364,7 +1235,8 @@ class EEGEnsembleModel:
         else:
             return "Low"
     
-    def _calculate_stress_level(self, features: Dict[str, float]) -> str:
+    @staticmethod
+    def _calculate_stress_level(features: Dict[str, float]) -> str:
         """Calculate stress level based on beta power and entropy"""
         beta_factor = features['beta_power'] / max(features['total_power'], 1e-6)
         entropy_factor = features['shannon_entropy'] / 10  # Normalized
@@ -378,7 +1250,8 @@ class EEGEnsembleModel:
         else:
             return "Normal"
     
-    def _calculate_sleep_quality(self, features: Dict[str, float]) -> Dict[str, float]:
+    @staticmethod
+    def _calculate_sleep_quality(features: Dict[str, float]) -> Dict[str, float]:
         """Calculate sleep stage distribution"""
         total_sleep_power = features['delta_power'] + features['theta_power'] + features['alpha_power']
         
@@ -395,7 +1268,8 @@ class EEGEnsembleModel:
             'light': min(max(light_percentage, 0), 100)
         }
     
-    def _detect_anomalies(self, features: Dict[str, float]) -> int:
+    @staticmethod
+    def _detect_anomalies(features: Dict[str, float]) -> int:
         """Detect anomalies using statistical methods"""
         # Calculate z-scores for key features
         z_scores = []
@@ -407,22 +1281,415 @@ class EEGEnsembleModel:
         anomaly_count = sum(1 for z in z_scores if z > 2.0)
         return min(anomaly_count, 10)
     
-    def _calculate_asymmetry(self, features: Dict[str, float]) -> float:
+    @staticmethod
+    def _calculate_asymmetry(features: Dict[str, float]) -> float:
         """Calculate hemispheric asymmetry"""
         # Simplified asymmetry calculation
         alpha_beta_diff = abs(features['alpha_power'] - features['beta_power'])
         return min((alpha_beta_diff / max(features['total_power'], 1e-6)) * 100, 100)
 
+class ModelRegistry:
+    """
+    Process-wide registry of ensemble models and preprocessors
+    
+    Each configuration is constructed (or loaded) once per process and shared by
+    every analyzer. Freshly built networks have their parameters moved to shared
+    memory, so workers forked after preload() reuse them and torch.multiprocessing
+    workers receive them without copying. Saved weights are loaded memory-mapped,
+    so separate processes share one copy through the OS page cache.
+    
+    Ensembles and preprocessors are kept in bounded LRU caches keyed by their
+    configuration (sample rate first of all), so mixed-rate traffic reuses
+    models instead of rebuilding them. Lookups are thread-safe and concurrent
+    misses on the same key build it only once.
+    
+    Weights are looked up as <weights_dir>/ensemble_<sample_rate>hz.pt (with a
+    _<n>ch suffix for n-channel montage models, e.g. _lstm_conv16 for a
+    strided LSTM front end and e.g. _transformer_patch32_local for a patched
+    transformer), with weights_dir defaulting
+    to the EEG_MODEL_WEIGHTS_DIR environment variable. TorchScript networks
+    saved there with EEGEnsembleModel.export_compiled are loaded by ensembles
+    using the 'torchscript' backend.
+    The ensemble cache size defaults to ML_MODEL_CACHE_SIZE (3).
+    """
+    
+    def __init__(self, weights_dir: Optional[str] = None, share_memory: bool = True,
+                 max_models: Optional[int] = None, max_preprocessors: int = 16):
+        self.weights_dir = weights_dir if weights_dir is not None else os.environ.get('EEG_MODEL_WEIGHTS_DIR')
+        self.share_memory = share_memory
+        self.max_sizes = {
+            'ensembles': max_models if max_models is not None else int(os.environ.get('ML_MODEL_CACHE_SIZE', 3)),
+            'preprocessors': max_preprocessors
+        }
+        self._caches: Dict[str, 'OrderedDict[Tuple, object]'] = {kind: OrderedDict() for kind in self.max_sizes}
+        self._stats = {kind: {'hits': 0, 'misses': 0, 'evictions': 0} for kind in self.max_sizes}
+        self._building: Dict[Tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+    
+    def _lookup(self, kind: str, key: Tuple, build):
+        """LRU lookup that builds a missing entry once, outside the registry lock"""
+        cache = self._caches[kind]
+        stats = self._stats[kind]
+        with self._lock:
+            if key in cache:
+                cache.move_to_end(key)
+                stats['hits'] += 1
+                return cache[key]
+            stats['misses'] += 1
+            build_lock = self._building.setdefault((kind,) + key, threading.Lock())
+        
+        with build_lock:
+            with self._lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    return cache[key]
+            value = build()
+            with self._lock:
+                cache[key] = value
+                while len(cache) > self.max_sizes[kind]:
+                    cache.popitem(last=False)
+                    stats['evictions'] += 1
+                self._building.pop((kind,) + key, None)
+        return value
+    
+    def get_ensemble(self, **config) -> EEGEnsembleModel:
+        """Return the shared ensemble for an EEGEnsembleModel configuration, building it on first use"""
+        # Fill in defaults so equivalent configurations share one entry
+        bound = inspect.signature(EEGEnsembleModel).bind(**config)
+        bound.apply_defaults()
+        key = tuple(sorted(bound.arguments.items()))
+        return self._lookup('ensembles', key, lambda: self._build(config))
+    
+    def get_preprocessor(self, sample_rate: int = 256) -> EEGPreprocessor:
+        """Return the shared preprocessor for a sample rate"""
+        return self._lookup('preprocessors', (sample_rate,), lambda: EEGPreprocessor(sample_rate))
+    
+    def cache_info(self) -> Dict[str, Dict[str, int]]:
+        """Size, capacity and hit/miss/eviction counters of each cache"""
+        with self._lock:
+            return {
+                kind: dict(self._stats[kind], size=len(cache), max_size=self.max_sizes[kind])
+                for kind, cache in self._caches.items()
+            }
+    
+    def preload(self, sample_rates: Iterable[int] = (256,), **config) -> None:
+        """Build ensembles up front, e.g. in a pre-fork server master process"""
+        for sample_rate in sample_rates:
+            self.get_ensemble(sample_rate=sample_rate, **config)
+    
+    def weights_path(self, sample_rate: int, num_channels: int = 1, lstm_variant: str = 'raw',
+                     transformer_variant: str = EEGTransformer.DEFAULT_VARIANT) -> Optional[str]:
+        """Location of saved weights for a sample rate, channel count and network variants, if a weights directory is configured"""
+        if not self.weights_dir:
+            return None
+        suffix = '' if num_channels == 1 else f'_{num_channels}ch'
+        if lstm_variant != 'raw':
+            suffix += f'_lstm_{lstm_variant}'
+        if transformer_variant != EEGTransformer.DEFAULT_VARIANT:
+            suffix += f'_transformer_{transformer_variant}'
+        return os.path.join(self.weights_dir, f'ensemble_{sample_rate}hz{suffix}.pt')
+    
+    def save_weights(self, model: EEGEnsembleModel, path: Optional[str] = None) -> str:
+        """Save an ensemble's network state dicts in a format that can be memory-mapped"""
+        if model.quantized:
+            raise ValueError("Quantized ensembles cannot be saved as weights; save the fp32 ensemble instead")
+        path = path or self.weights_path(model.sample_rate, model.num_channels, model.lstm_model.variant,
+                                         model.transformer_model.variant)
+        if path is None:
+            raise ValueError("No weights path given and EEG_MODEL_WEIGHTS_DIR is not set")
+        torch.save({name: network.state_dict() for name, network in model.networks().items()}, path)
+        return path
+    
+    def _build(self, config: Dict) -> EEGEnsembleModel:
+        """Construct an ensemble and load or share its parameters"""
+        model = EEGEnsembleModel(**config)
+        model.artifact_dir = self.weights_dir
+        
+        path = self.weights_path(model.sample_rate, model.num_channels, model.lstm_model.variant,
+                                 model.transformer_model.variant)
+        loaded = bool(path) and os.path.exists(path)
+        if loaded:
+            state = torch.load(path, mmap=True, weights_only=True)
+            for name, network in model.networks().items():
+                network.load_state_dict(state[name], assign=True)
+            logger.info(f"Loaded memory-mapped ensemble weights from {path}")
+        
+        # Freeze (and fold/quantize) before sharing, so the shared parameters are the ones served
+        model.prepare_inference()
+        if not loaded and self.share_memory:
+            for network in model.networks().values():
+                network.share_memory()
+        
+        logger.info(f"Ensemble model built for {model.sample_rate} Hz, {model.num_channels} channel(s)")
+        return model
+
+# Shared by every analyzer in the process
+model_registry = ModelRegistry()
+
+class FeatureStore:
+    """
+    Memoized feature dicts keyed by signal id
+    
+    A signal id is the content hash of the samples and sample rate, so a
+    recording sent to /api/features, /api/analyze or /api/batch-analyze is
+    filtered and featurized once, and its risk scores can later be requested
+    by id alone. Entries live in an LRU bounded by ML_FEATURE_STORE_SIZE (4096).
+    """
+    
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.environ.get('ML_FEATURE_STORE_SIZE', 4096))
+        self._entries: 'OrderedDict[str, Tuple[int, Dict[str, float]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def signal_id(data: np.ndarray, sample_rate: int, metrics: Optional[Iterable[str]] = None) -> str:
+        """Content-derived id of a signal at a sample rate, plus any explicitly selected complexity metrics"""
+        if metrics is None:
+            return content_hash(data, 'signal', int(sample_rate))
+        return content_hash(data, 'signal', int(sample_rate), sorted(metrics))
+    
+    def get(self, signal_id: str) -> Optional[Tuple[int, Dict[str, float]]]:
+        """(sample_rate, features) stored for a signal id, or None"""
+        with self._lock:
+            entry = self._entries.get(signal_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(signal_id)
+            self.hits += 1
+            return entry[0], dict(entry[1])
+    
+    def put(self, signal_id: str, sample_rate: int, features: Dict[str, float]) -> None:
+        """Remember the features of a signal"""
+        with self._lock:
+            self._entries[signal_id] = (int(sample_rate), dict(features))
+            self._entries.move_to_end(signal_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def info(self) -> Dict[str, int]:
+        """Number of stored signals and hit/miss counters"""
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses}
+
+# Shared by every analyzer in the process
+feature_store = FeatureStore()
+
+def _init_feature_worker() -> None:
+    """Feature workers are single-threaded; the pool provides the parallelism"""
+    torch.set_num_threads(1)
+
+def _features_by_length(preprocessor: EEGPreprocessor, signals: List[np.ndarray]) -> List[Dict[str, float]]:
+    """Feature dicts for several signals, with equal-length signals featurized as one matrix"""
+    buckets: Dict[int, List[int]] = {}
+    for i, s in enumerate(signals):
+        buckets.setdefault(len(s), []).append(i)
+    
+    features: List[Optional[Dict[str, float]]] = [None] * len(signals)
+    for indices in buckets.values():
+        table = preprocessor.extract_features_matrix(np.stack([signals[i] for i in indices]))
+        for i, (_, row) in zip(indices, table.iterrows()):
+            features[i] = {name: float(value) for name, value in row.items()}
+    return features
+
+def _shared_features(shm_name: str, size: int, spans: List[Tuple[int, int]], sample_rate: int) -> List[Dict[str, float]]:
+    """Features of signals held in a shared-memory block, computed in a worker process"""
+    # Spawned workers share the parent's resource tracker, so the parent's unlink also covers this attach
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        buffer = np.ndarray((size,), dtype=np.float64, buffer=shm.buf)
+        features = _features_by_length(model_registry.get_preprocessor(sample_rate),
+                                       [buffer[offset:offset + length] for offset, length in spans])
+        del buffer
+        return features
+    finally:
+        shm.close()
+
+class ParallelFeatureExtractor:
+    """
+    Batch feature extraction fanned out over a process pool
+    
+    The signals of a batch are copied once into a shared-memory block and each
+    worker attaches to it by name and featurizes a contiguous slice, so large
+    arrays are never pickled; only the small feature dicts come back. Batches
+    smaller than min_batch, or a pool of zero workers, are featurized in
+    process. Either way equal-length signals share one vectorized pass.
+    
+    The pool size defaults to the ML_FEATURE_WORKERS environment variable (0,
+    i.e. disabled).
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None, min_batch: int = 8):
+        self.max_workers = max_workers if max_workers is not None else int(os.environ.get('ML_FEATURE_WORKERS', 0))
+        self.min_batch = min_batch
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def _pool(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.max_workers, mp_context=mp.get_context('spawn'),
+                                                     initializer=_init_feature_worker)
+            return self._executor
+    
+    def extract(self, signals: List[np.ndarray], sample_rate: int = 256,
+                preprocessor: Optional[EEGPreprocessor] = None) -> List[Dict[str, float]]:
+        """
+        Feature dicts for a batch of 1D signals, in order
+        
+        Args:
+            signals: EEG signals (1D arrays)
+            sample_rate: Sampling rate in Hz
+            preprocessor: In-process preprocessor, default the registry's for sample_rate
+        """
+        signals = [np.asarray(s, dtype=np.float64) for s in signals]
+        if self.max_workers <= 1 or len(signals) < self.min_batch:
+            return _features_by_length(preprocessor or model_registry.get_preprocessor(sample_rate), signals)
+        
+        lengths = [len(s) for s in signals]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+        size = int(offsets[-1])
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1) * 8)
+        try:
+            buffer = np.ndarray((size,), dtype=np.float64, buffer=shm.buf)
+            for s, offset in zip(signals, offsets):
+                buffer[offset:offset + len(s)] = s
+            del buffer
+            
+            # A couple of slices per worker evens out unequal signal lengths
+            num_slices = min(len(signals), 2 * self.max_workers)
+            bounds = np.linspace(0, len(signals), num_slices + 1).astype(int)
+            futures = [
+                self._pool().submit(_shared_features, shm.name, size,
+                                    [(int(offsets[i]), lengths[i]) for i in range(start, stop)], sample_rate)
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            return [features for future in futures for features in future.result()]
+        finally:
+            shm.close()
+            shm.unlink()
+    
+    def shutdown(self) -> None:
+        """Stop the worker pool"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+# Shared by every analyzer in the process
+feature_extractor = ParallelFeatureExtractor()
+
 class ML_EEGAnalyzer:
     """
     Main ML-based EEG Analysis System
     """
     
-    def __init__(self):
-        self.ensemble_model = EEGEnsembleModel()
-        self.preprocessor = EEGPreprocessor()
+    # Fewest samples analyzed, counted at the analysis rate; shorter signals are rejected
+    MIN_ANALYSIS_SAMPLES = 100
+    
+    def __init__(self, registry: Optional[ModelRegistry] = None,
+                 extractor: Optional[ParallelFeatureExtractor] = None,
+                 store: Optional[FeatureStore] = None, canonical_rate: Optional[int] = None, **model_options):
+        # Extra EEGEnsembleModel options (e.g. transformer_patch_size) applied to every sample rate
+        self.model_options = model_options
+        self.registry = registry or model_registry
+        self.feature_extractor = extractor or feature_extractor
+        self.feature_store = store or feature_store
+        # Every signal is resampled to this rate before features and inference, so one set of
+        # models serves all devices. Default ML_CANONICAL_RATE (256); 0 analyzes at the input rate.
+        self.canonical_rate = canonical_rate if canonical_rate is not None else \
+            int(os.environ.get('ML_CANONICAL_RATE', 256))
+        # Default-rate models; requests at other rates look theirs up per call and never swap these
+        self.ensemble_model = self.get_ensemble()
+        self.preprocessor = self.get_preprocessor()
         logger.info("ML EEG Analyzer initialized successfully")
     
+    def get_ensemble(self, sample_rate: int = 256, num_channels: int = 1) -> EEGEnsembleModel:
+        """Cached ensemble for a sample rate and channel count"""
+        return self.registry.get_ensemble(sample_rate=sample_rate, num_channels=num_channels, **self.model_options)
+    
+    def get_preprocessor(self, sample_rate: int = 256) -> EEGPreprocessor:
+        """Cached preprocessor for a sample rate"""
+        return self.registry.get_preprocessor(sample_rate)
+    
+    def serving_settings(self) -> Dict[str, Union[int, float, str, List[str]]]:
+        """
+        Effective settings that change served results, including ones taken from the environment
+        
+        Result cache keys include these, so results computed under one
+        configuration are never served under another.
+        """
+        model = self.ensemble_model
+        return {
+            'ensemble_mode': model.ensemble_mode,
+            'cascade_threshold': model.cascade_threshold,
+            'lstm_variant': model.lstm_model.variant,
+            'transformer_variant': model.transformer_model.variant,
+            'quantize': model.quantize,
+            'canonical_rate': self.canonical_rate,
+            'complexity_metrics': sorted(self.preprocessor.complexity_metrics),
+            'entropy_max_exact_length': self.preprocessor.entropy_max_exact_length,
+            'entropy_max_pairs': self.preprocessor.entropy_max_pairs
+        }
+    
+    def analysis_rate(self, sample_rate: int) -> int:
+        """Rate a signal recorded at sample_rate is analyzed at"""
+        return self.canonical_rate or sample_rate
+    
+    def min_input_samples(self, sample_rate: int) -> int:
+        """Fewest samples recorded at sample_rate that still resample to MIN_ANALYSIS_SAMPLES"""
+        return math.ceil(self.MIN_ANALYSIS_SAMPLES * sample_rate / self.analysis_rate(sample_rate))
+    
+    def to_analysis_rate(self, data: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, int]:
+        """Resample data to its analysis rate; returns (data, analysis_rate)"""
+        rate = self.analysis_rate(sample_rate)
+        return self.get_preprocessor(rate).resample(data, sample_rate), rate
+    
+    def extract_features(self, data: np.ndarray, sample_rate: int = 256,
+                         analysis_data: Optional[np.ndarray] = None, metrics: Optional[Iterable[str]] = None,
+                         timings: Optional[Dict[str, float]] = None) -> Tuple[str, Dict[str, float]]:
+        """
+        Features of a signal, computed once per signal and reused afterwards
+        
+        Args:
+            data: EEG signal as recorded
+            sample_rate: Sampling rate of data in Hz
+            analysis_data: data already resampled to the analysis rate, if the caller has it
+            metrics: Complexity metrics to compute instead of the preprocessor's default selection
+            timings: If given, filled with the milliseconds each complexity metric took
+                (left empty when the features were already stored)
+        
+        Returns:
+            (signal_id, features); the id is derived from the signal as recorded
+            and, when given, the metric selection
+        """
+        signal_id = self.feature_store.signal_id(data, sample_rate, metrics)
+        entry = self.feature_store.get(signal_id)
+        if entry is not None:
+            return signal_id, entry[1]
+        rate = self.analysis_rate(sample_rate)
+        if analysis_data is None:
+            analysis_data, rate = self.to_analysis_rate(data, sample_rate)
+        features = self.get_preprocessor(rate).extract_features(analysis_data, metrics=metrics, timings=timings)
+        self.feature_store.put(signal_id, sample_rate, features)
+        return signal_id, features
+    
+    def risk_scores(self, signal_id: str) -> Optional[Dict[str, Union[int, float, str, Dict]]]:
+        """Risk scores of a previously featurized signal, or None if its features are not stored"""
+        entry = self.feature_store.get(signal_id)
+        if entry is None:
+            return None
+        sample_rate, features = entry
+        results = EEGEnsembleModel.risk_scores(features)
+        results['signal_id'] = signal_id
+        results['sample_rate'] = sample_rate
+        results['model_version'] = MODEL_VERSION
+        return results
+    
     def analyze_eeg_data(self, data: np.ndarray, sample_rate: int = 256) -> Dict[str, Union[int, float, str, Dict]]:
         """
         Perform comprehensive EEG analysis using ML models
@@ -435,20 +1702,14 @@ class ML_EEGAnalyzer:
             Dictionary containing analysis results
         """
         try:
-            # Update sample rate if needed
-            if sample_rate != self.preprocessor.sample_rate:
-                self.preprocessor.sample_rate = sample_rate
-                self.ensemble_model = EEGEnsembleModel(sample_rate=sample_rate)
-            
-            # Perform analysis
-            results = self.ensemble_model.predict(data)
+            # Perform analysis at the canonical rate, reusing stored features
+            analysis_data, rate = self.to_analysis_rate(data, sample_rate)
+            signal_id, features = self.extract_features(data, sample_rate, analysis_data)
+            results = self.get_ensemble(rate).predict(analysis_data, features=features)
+            results['signal_id'] = signal_id
             
             # Add metadata
-            results['sample_rate'] = sample_rate
-            results['data_length'] = len(data)
-            results['analysis_timestamp'] = pd.Timestamp.now().isoformat()
-            results['model_version'] = '1.0.0'
-            results['analysis_method'] = 'ML_Ensemble'
+            self._add_metadata(results, data, sample_rate, rate)
             
             logger.info(f"EEG analysis completed successfully. Predicted class: {results['predicted_class']}")
             return results
@@ -461,10 +1722,220 @@ class ML_EEGAnalyzer:
                 'analysis_timestamp': pd.Timestamp.now().isoformat()
             }
     
+    def analyze_eeg_batch(self, signals: List[np.ndarray], sample_rate: int = 256) -> List[Dict[str, Union[int, float, str, Dict]]]:
+        """
+        Analyze several EEG signals with batched forward passes
+        
+        Args:
+            signals: List of EEG signals (1D arrays), all at ``sample_rate``
+            sample_rate: Sampling rate in Hz
+            
+        Returns:
+            List of analysis result dictionaries, one per signal
+        """
+        try:
+            # Features fan out over the extractor's process pool, inference stays one batched pass
+            rate = self.analysis_rate(sample_rate)
+            model = self.get_ensemble(rate)
+            analysis_signals = [model.preprocessor.resample(s, sample_rate) for s in signals]
+            signal_ids = [self.feature_store.signal_id(s, sample_rate) for s in signals]
+            entries = [self.feature_store.get(signal_id) for signal_id in signal_ids]
+            features = [entry[1] if entry is not None else None for entry in entries]
+            missing = [i for i, f in enumerate(features) if f is None]
+            if missing:
+                computed = self.feature_extractor.extract([analysis_signals[i] for i in missing], rate, model.preprocessor)
+                for i, f in zip(missing, computed):
+                    features[i] = f
+                    self.feature_store.put(signal_ids[i], sample_rate, f)
+            
+            batch_results = model.predict_batch(analysis_signals, features=features)
+            for results, data, signal_id in zip(batch_results, signals, signal_ids):
+                results['signal_id'] = signal_id
+                self._add_metadata(results, data, sample_rate, rate)
+            
+            logger.info(f"Batch EEG analysis completed successfully for {len(signals)} signals")
+            return batch_results
+            
+        except Exception as e:
+            logger.error(f"Error in batch EEG analysis: {str(e)}")
+            return [{
+                'error': str(e),
+                'status': 'failed',
+                'analysis_timestamp': pd.Timestamp.now().isoformat()
+            } for _ in signals]
+    
+    def analyze_eeg_channels(self, data: np.ndarray, sample_rate: int = 256,
+                             channel_names: Optional[List[str]] = None) -> Dict[str, Union[str, List, Dict]]:
+        """
+        Analyze a multi-channel recording in one pass
+        
+        All channels are filtered and featurized together, then run through
+        the single-channel ensemble as one channel-batched tensor. The montage
+        result comes from an ensemble built for all channels, so EEGNet's
+        spatial convolution mixes them, with features averaged over channels.
+        
+        Args:
+            data: EEG signals shaped (channels, samples)
+            sample_rate: Sampling rate in Hz
+            channel_names: Optional channel labels, one per row of data
+            
+        Returns:
+            Dictionary with per-channel results under 'channels' and the
+            montage-level aggregate under 'montage'
+        """
+        try:
+            recorded = np.atleast_2d(np.asarray(data, dtype=float))
+            channel_names = list(channel_names) if channel_names is not None else \
+                [f'channel_{i + 1}' for i in range(len(recorded))]
+            data, rate = self.to_analysis_rate(recorded, sample_rate)
+            
+            # One filtering and feature pass over every channel
+            feature_table = self.get_preprocessor(rate).extract_features_matrix(data, channel_names)
+            channel_features = [{name: float(value) for name, value in row.items()}
+                                for _, row in feature_table.iterrows()]
+            
+            channel_results = self.get_ensemble(rate).predict_batch(list(data), features=channel_features)
+            for results in channel_results:
+                self._add_metadata(results, recorded[0], sample_rate, rate)
+            
+            montage = self.get_ensemble(rate, num_channels=len(data)).predict(
+                data, features={name: float(value) for name, value in feature_table.mean().items()})
+            self._add_metadata(montage, recorded[0], sample_rate, rate)
+            montage['num_channels'] = len(data)
+            montage['channel_votes'] = pd.Series([r['predicted_class'] for r in channel_results]).value_counts().to_dict()
+            
+            logger.info(f"Montage analysis completed for {len(data)} channels. Predicted class: {montage['predicted_class']}")
+            return {
+                'channels': dict(zip(channel_names, channel_results)),
+                'channel_names': channel_names,
+                'montage': montage
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in multi-channel EEG analysis: {str(e)}")
+            return {
+                'error': str(e),
+                'status': 'failed',
+                'analysis_timestamp': pd.Timestamp.now().isoformat()
+            }
+    
+    def analyze_stream(self, data: Union[np.ndarray, Iterable[np.ndarray]], sample_rate: int = 256,
+                       window_seconds: float = 4.0, hop_seconds: float = 1.0,
+                       batch_size: int = 8, incremental: bool = False) -> Iterator[Dict[str, Union[int, float, str, Dict]]]:
+        """
+        Analyze a long recording window by window
+        
+        The signal is filtered causally with filter state carried from chunk to
+        chunk, so overlapping samples are never re-filtered, and only the
+        current window (plus up to batch_size pending windows) is held in memory.
+        Features come from the filtered window; the networks see the raw window,
+        as they do in analyze_eeg_data, so both give the same prediction.
+        A trailing remainder shorter than one hop is not analyzed. When hop is
+        longer than window, the samples between windows are filtered and then
+        discarded, however the chunks split them.
+        
+        Args:
+            data: Whole 1D signal, or an iterable of consecutive 1D chunks
+            sample_rate: Sampling rate in Hz
+            window_seconds: Window length in seconds
+            hop_seconds: Distance between window starts in seconds
+            batch_size: Number of windows sent through the ensemble together
+            incremental: Update moments and band powers in O(hop) per window with an
+                IncrementalFeatureAccumulator instead of recomputing every feature from scratch
+                (skips artifact interpolation; entropies are still computed per window)
+            
+        Yields:
+            Analysis result dictionary for every window, in order
+        """
+        window = int(round(window_seconds * sample_rate))
+        hop = int(round(hop_seconds * sample_rate))
+        if window <= 0 or hop <= 0:
+            raise ValueError("window_seconds and hop_seconds must cover at least one sample")
+        
+        model = self.get_ensemble(sample_rate)
+        preprocessor = model.preprocessor
+        stream_filter = StreamingSOSFilter(preprocessor.filter_bank.notch_bandpass(
+            sample_rate, preprocessor.notch_freq, 0.5, 40.0, 4, 30))
+        
+        accumulator = IncrementalFeatureAccumulator(window, preprocessor) if incremental else None
+        
+        chunks = data
+        if isinstance(data, np.ndarray):
+            # Views over the array, so nothing beyond the current window is copied
+            chunks = (data[start:start + hop] for start in range(0, len(data), hop))
+        
+        # Filtered samples feed the features, raw samples the networks; both advance together
+        buffer = np.empty(0)
+        raw_buffer = np.empty(0)
+        # Samples still to discard before the next window starts, once hop overruns the buffer
+        skip = 0
+        window_index = 0
+        pending: List[Tuple[int, np.ndarray, Dict[str, float]]] = []
+        
+        for chunk in chunks:
+            chunk = np.ravel(chunk).astype(float)
+            filtered = stream_filter.process(chunk)
+            if skip:
+                dropped = min(skip, len(chunk))
+                chunk, filtered = chunk[dropped:], filtered[dropped:]
+                skip -= dropped
+            buffer = np.concatenate([buffer, filtered])
+            raw_buffer = np.concatenate([raw_buffer, chunk])
+            while len(buffer) >= window:
+                segment = buffer[:window].copy()
+                if accumulator is not None:
+                    accumulator.push(segment if window_index == 0 or hop >= window else segment[-hop:])
+                    features = accumulator.features()
+                else:
+                    features = preprocessor.extract_features(segment, filtered=True)
+                pending.append((window_index, raw_buffer[:window].copy(), features))
+                window_index += 1
+                advance = min(hop, len(buffer))
+                buffer = buffer[advance:]
+                raw_buffer = raw_buffer[advance:]
+                skip = hop - advance
+                if len(pending) >= batch_size:
+                    yield from self._predict_windows(model, pending, sample_rate, window, hop)
+                    pending = []
+        
+        if pending:
+            yield from self._predict_windows(model, pending, sample_rate, window, hop)
+    
+    def _predict_windows(self, model: EEGEnsembleModel, pending: List[Tuple[int, np.ndarray, Dict[str, float]]],
+                         sample_rate: int, window: int, hop: int) -> Iterator[Dict[str, Union[int, float, str, Dict]]]:
+        """Run a group of raw windows and their features through the ensemble and attach window metadata"""
+        batch_results = model.predict_batch(
+            [segment for _, segment, _ in pending],
+            features=[features for _, _, features in pending]
+        )
+        for (index, segment, _), results in zip(pending, batch_results):
+            self._add_metadata(results, segment, sample_rate)
+            results['window_index'] = index
+            results['start_sample'] = index * hop
+            results['end_sample'] = index * hop + window
+            results['start_time'] = index * hop / sample_rate
+            results['end_time'] = (index * hop + window) / sample_rate
+            yield results
+    
+    def _add_metadata(self, results: Dict, data: np.ndarray, sample_rate: int,
+                      analysis_rate: Optional[int] = None) -> None:
+        """Attach analysis metadata to a result dictionary"""
+        results['sample_rate'] = sample_rate
+        results['analysis_rate'] = analysis_rate or sample_rate
+        results['data_length'] = len(data)
+        results['analysis_timestamp'] = pd.Timestamp.now().isoformat()
+        results['model_version'] = MODEL_VERSION
+        results['analysis_method'] = 'ML_Ensemble'
+    
     def get_model_info(self) -> Dict[str, str]:
         """Get information about the ML models"""
         return {
             'model_type': 'Ensemble (EEGNet + LSTM + Transformer)',
+            'inference_backend': self.ensemble_model.backend,
+            'quantization': self.ensemble_model.quantize,
+            'ensemble_mode': self.ensemble_model.ensemble_mode,
+            'canonical_rate': self.canonical_rate or 'input rate',
+            'lstm_frontend': self.ensemble_model.lstm_model.variant,
             'architecture': 'Deep Learning',
             'accuracy': '90-95% (research-grade)',
             'validation': 'Cross-validation with proper metrics',
@@ -472,14 +1943,31 @@ class ML_EEGAnalyzer:
             'disclaimer': 'Research/educational use only, not for clinical diagnosis'
         }
 
-# Global instance
-ml_analyzer = ML_EEGAnalyzer()
+# Global instance, created on first use rather than at import
+_ml_analyzer: Optional[ML_EEGAnalyzer] = None
+_ml_analyzer_lock = threading.Lock()
+
+def get_ml_analyzer() -> ML_EEGAnalyzer:
+    """
+    Return the process-wide analyzer, creating it on first call
+    """
+    global _ml_analyzer
+    with _ml_analyzer_lock:
+        if _ml_analyzer is None:
+            _ml_analyzer = ML_EEGAnalyzer()
+    return _ml_analyzer
+
+def __getattr__(name: str):
+    # Keep `from ml_eeg_analyzer import ml_analyzer` working without building models at import
+    if name == 'ml_analyzer':
+        return get_ml_analyzer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def analyze_eeg_with_ml(data: np.ndarray, sample_rate: int = 256) -> Dict:
     """
     Convenience function for EEG analysis
     """
-    return ml_analyzer.analyze_eeg_data(data, sample_rate)
+    return get_ml_analyzer().analyze_eeg_data(data, sample_rate)
 
 if __name__ == "__main__":
     # Test the system
@@ -496,5 +1984,11 @@ if __name__ == "__main__":
     print("Analysis Results:")
     print(json.dumps(results, indent=2))
     
+    # Inference mode is deterministic: a repeated call must predict exactly the same
+    repeated = analyze_eeg_with_ml(test_signal)
+    assert (repeated['predicted_class'], repeated['confidence']) == (results['predicted_class'], results['confidence']), \
+        "Repeated analysis of the same signal gave a different prediction"
+    print("\nRepeated analysis: identical prediction")
+    
     print("\nModel Information:")
-    print(json.dumps(ml_analyzer.get_model_info(), indent=2))
+    print(json.dumps(get_ml_analyzer().get_model_info(), indent=2))
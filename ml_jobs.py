@@ -0,0 +1,314 @@
+"""
+ML Analysis Job Queue
+Runs long EEG analyses in a bounded process pool and lets clients poll for results
+
+This module provides:
+- JobQueue: submit analyses, poll status/progress/results, cancel
+- Process-based workers, so the feature code scales across cores
+- Backpressure: submissions fail fast with QueueFullError once the queue is full
+- Optional SQLite job store, so any API worker process can answer polls
+
+No external broker is needed. Batch jobs are split into chunks that run as
+separate pool tasks, which is what drives the reported progress.
+"""
+
+import json
+import logging
+import multiprocessing as mp
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+JOB_TYPES = ('analyze', 'batch')
+
+# Job states; the last three are final
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = 'queued', 'running', 'completed', 'failed', 'cancelled'
+FINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue has no room for another job"""
+
+
+# Queue on which a worker announces the job id of each task it starts (set in workers)
+_started = None
+
+
+def _init_worker(num_threads: int, started=None) -> None:
+    """Limit each worker's torch threads so the pool does not oversubscribe the CPU"""
+    global _started
+    _started = started
+    # Job workers already run in parallel; a nested feature-extraction pool would only oversubscribe
+    os.environ['ML_FEATURE_WORKERS'] = '0'
+    import torch
+    torch.set_num_threads(num_threads)
+
+
+def _run_task(job_id: str, job_type: str, signals: List[np.ndarray], sample_rate: int) -> List[Dict]:
+    """Analyze one chunk of a job inside a worker process"""
+    from ml_eeg_analyzer import get_ml_analyzer
+
+    if _started is not None:
+        _started.put(job_id)
+
+    analyzer = get_ml_analyzer()
+    if job_type == 'analyze':
+        return [analyzer.analyze_eeg_data(signals[0], sample_rate)]
+    return analyzer.analyze_eeg_batch(signals, sample_rate)
+
+
+def _to_json(value: Any) -> Any:
+    """json.dumps fallback for NumPy scalars and arrays"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JobQueue:
+    """
+    Bounded queue of analysis jobs executed by a process pool
+
+    Args:
+        max_workers: Worker processes, default ML_JOB_WORKERS or half the CPUs
+        max_pending: Unfinished jobs accepted before submit() raises QueueFullError,
+            default ML_JOB_QUEUE_SIZE (64)
+        chunk_size: Signals per pool task for batch jobs
+        db_path: SQLite file that mirrors job records, default ML_JOB_DB (unset: in-process only)
+        ttl: Seconds finished jobs are kept before they are pruned
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 chunk_size: int = 16, db_path: Optional[str] = None, ttl: float = 3600.0):
+        self.max_workers = max_workers or int(os.environ.get('ML_JOB_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+        self.max_pending = max_pending or int(os.environ.get('ML_JOB_QUEUE_SIZE', 64))
+        self.chunk_size = chunk_size
+        self.db_path = db_path if db_path is not None else os.environ.get('ML_JOB_DB')
+        self.ttl = ttl
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._started = None
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._futures: Dict[str, List[Future]] = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+        if self.db_path:
+            with self._connect() as db:
+                db.execute('CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, record TEXT, updated REAL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """New SQLite connection; one per call keeps the store usable from any thread"""
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use"""
+        with self._lock:
+            if self._executor is None:
+                # Spawned workers avoid inheriting torch's thread pools through fork
+                context = mp.get_context('spawn')
+                threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+                self._started = context.SimpleQueue()
+                self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context, initializer=_init_worker,
+                                                     initargs=(threads, self._started))
+                threading.Thread(target=self._watch_started, args=(self._started,),
+                                 name='job-start-watcher', daemon=True).start()
+            return self._executor
+
+    def _watch_started(self, started) -> None:
+        """Mark jobs running as workers report their tasks starting; None stops the watcher"""
+        while True:
+            job_id = started.get()
+            if job_id is None:
+                return
+            self._mark_running(job_id)
+
+    def _mark_running(self, job_id: str) -> None:
+        """Move a queued job to running and persist it"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != QUEUED:
+                return
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+        self._persist(job_id)
+
+    def submit(self, job_type: str, signals: Sequence[np.ndarray], sample_rate: int = 256,
+               signal_indices: Optional[Sequence[int]] = None) -> str:
+        """
+        Queue an analysis and return its job id
+
+        Args:
+            job_type: 'analyze' for one signal or 'batch' for several
+            signals: EEG signals (1D arrays)
+            sample_rate: Sampling rate in Hz
+            signal_indices: Label stored as 'signal_index' on each result, default 0..n-1
+
+        Raises:
+            QueueFullError: if max_pending jobs are already unfinished
+        """
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type '{job_type}'. Use one of {JOB_TYPES}")
+        signals = [np.asarray(s, dtype=float) for s in signals]
+        chunk_size = 1 if job_type == 'analyze' else self.chunk_size
+        chunks = [(start, signals[start:start + chunk_size]) for start in range(0, len(signals), chunk_size)]
+
+        with self._lock:
+            self._prune()
+            pending = sum(1 for job in self._jobs.values() if job['status'] not in FINAL_STATES)
+            if pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"Job queue is full ({pending} pending jobs)")
+
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'type': job_type,
+                'status': QUEUED,
+                'progress': 0.0,
+                'tasks_done': 0,
+                'tasks_total': len(chunks),
+                'num_signals': len(signals),
+                'sample_rate': sample_rate,
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'results': [None] * len(signals),
+                'error': None
+            }
+            self._jobs[job_id] = job
+            self._futures[job_id] = []
+
+        indices = list(signal_indices) if signal_indices is not None else list(range(len(signals)))
+        try:
+            for start, chunk in chunks:
+                future = self._pool().submit(_run_task, job_id, job_type, chunk, sample_rate)
+                with self._lock:
+                    self._futures[job_id].append(future)
+                future.add_done_callback(lambda f, start=start: self._task_done(job_id, start, indices, f))
+        except Exception:
+            # Do not leave a job that can never finish occupying a queue slot
+            self.cancel(job_id)
+            raise
+        self._persist(job_id)
+
+        logger.info(f"Queued {job_type} job {job_id} with {len(signals)} signal(s) in {len(chunks)} task(s)")
+        return job_id
+
+    def _task_done(self, job_id: str, start: int, indices: List[int], future: Future) -> None:
+        """Store one finished task's results and update the job's progress and status"""
+        remaining: List[Future] = []
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in FINAL_STATES:
+                return
+            try:
+                results = future.result()
+            except CancelledError:
+                return
+            except Exception as e:
+                job['status'] = FAILED
+                job['error'] = str(e)
+                job['finished_at'] = time.time()
+                remaining = self._futures.get(job_id, [])
+                logger.error(f"Job {job_id} failed: {str(e)}")
+            else:
+                if job['status'] == QUEUED:
+                    # Finished before the worker's start notice was processed
+                    job['status'] = RUNNING
+                    job['started_at'] = time.time()
+                for offset, result in enumerate(results):
+                    result['signal_index'] = indices[start + offset]
+                    job['results'][start + offset] = result
+                job['tasks_done'] += 1
+                job['progress'] = job['tasks_done'] / job['tasks_total']
+                if job['tasks_done'] == job['tasks_total']:
+                    job['status'] = COMPLETED
+                    job['finished_at'] = time.time()
+        # Future.cancel() runs done callbacks (this method) synchronously, so never under the lock
+        for other in remaining:
+            other.cancel()
+        self._persist(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a job record, or None if the job is unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return dict(job, results=list(job['results']))
+        return self._load(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job's tasks that have not started yet; returns False if the job already finished"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in FINAL_STATES:
+                return False
+            job['status'] = CANCELLED
+            job['finished_at'] = time.time()
+            futures = list(self._futures.get(job_id, []))
+        for future in futures:
+            future.cancel()
+        self._persist(job_id)
+        return True
+
+    def info(self) -> Dict[str, int]:
+        """Worker count, queue bound and job counts by status"""
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED)}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return dict(counts, workers=self.max_workers, max_pending=self.max_pending, rejected=self.rejected)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool, cancelling tasks that have not started"""
+        with self._lock:
+            executor, started = self._executor, self._started
+            self._executor = self._started = None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+            started.put(None)
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the TTL (caller holds the lock)"""
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job['status'] in FINAL_STATES and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+            self._futures.pop(job_id, None)
+        # Only these records are known to be final; other rows may be live jobs of other processes
+        if self.db_path and expired:
+            with self._connect() as db:
+                db.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in expired])
+
+    def _persist(self, job_id: str) -> None:
+        """Mirror a job record into the SQLite store"""
+        if not self.db_path:
+            return
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            record = json.dumps(job, default=_to_json)
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO jobs (id, record, updated) VALUES (?, ?, ?)',
+                       (job_id, record, time.time()))
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job record from the SQLite store, e.g. one submitted through another process"""
+        if not self.db_path:
+            return None
+        with self._connect() as db:
+            row = db.execute('SELECT record FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+# Shared by the API; the worker pool starts with the first submitted job
+job_queue = JobQueue()
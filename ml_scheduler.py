@@ -0,0 +1,213 @@
+"""
+ML Inference Scheduler
+Coalesces concurrent single-signal analyses into batched forward passes
+
+This module provides:
+- InferenceScheduler: queue that groups requests arriving within a few
+  milliseconds into one analyze_eeg_batch call and fans the results back
+- A latency budget that shortens the batching wait when batches run slow
+- Queue depth, batch size histogram, wait and service time statistics
+
+Each forward pass carries a fixed framework overhead, so many concurrent
+batch-of-one requests waste most of the CPU on it. Batching amortizes that
+overhead across requests at the cost of at most max_wait_ms extra latency.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceScheduler:
+    """
+    Micro-batching front end for ML_EEGAnalyzer.analyze_eeg_batch
+
+    A single dispatcher thread takes the oldest request, waits until
+    max_batch_size requests are queued or the oldest has waited max_wait_ms,
+    and analyzes every queued request at the same sample rate in one batch.
+
+    Args:
+        max_batch_size: Signals per batch, default ML_BATCH_MAX_SIZE (16); 1 disables batching
+        max_wait_ms: Longest the oldest request waits for companions,
+            default ML_BATCH_MAX_WAIT_MS (5); 0 disables waiting
+        latency_budget_ms: Target queue wait plus batch time per request,
+            default ML_BATCH_LATENCY_BUDGET_MS (unset: no budget). The wait is
+            cut to what the budget leaves after the recent batch time.
+        analyzer: Analyzer to run batches on, default the process-wide one
+    """
+
+    def __init__(self, max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None,
+                 latency_budget_ms: Optional[float] = None, analyzer=None):
+        self.max_batch_size = max_batch_size or int(os.environ.get('ML_BATCH_MAX_SIZE', 16))
+        self.max_wait_ms = max_wait_ms if max_wait_ms is not None else \
+            float(os.environ.get('ML_BATCH_MAX_WAIT_MS', 5))
+        budget = os.environ.get('ML_BATCH_LATENCY_BUDGET_MS')
+        self.latency_budget_ms = latency_budget_ms if latency_budget_ms is not None else \
+            (float(budget) if budget else None)
+        self._analyzer = analyzer
+        self._queue: Deque[Tuple[np.ndarray, int, float, Future]] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+        # Statistics, guarded by the condition's lock
+        self._histogram: Counter = Counter()
+        self._stats = {'requests': 0, 'analyzed': 0, 'batches': 0, 'failed_batches': 0, 'over_budget': 0}
+        self._wait_total = 0.0
+        self._service_ewma: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        """False when batches are limited to a single signal"""
+        return self.max_batch_size > 1
+
+    def analyze(self, data: np.ndarray, sample_rate: int = 256, timeout: Optional[float] = None) -> Dict:
+        """
+        Analyze one signal as part of the next batch and return its result
+
+        Features are computed on the calling thread first, so concurrent
+        callers featurize in parallel and the batch only runs the networks.
+        """
+        try:
+            self._get_analyzer().extract_features(data, sample_rate)
+        except Exception:
+            # Left to the batch, which reports the error in this signal's result
+            pass
+        return self.submit(data, sample_rate).result(timeout)
+
+    def submit(self, data: np.ndarray, sample_rate: int = 256) -> Future:
+        """Queue one signal; the future resolves to its analysis result"""
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Inference scheduler is shut down")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='inference-scheduler', daemon=True)
+                self._thread.start()
+            self._queue.append((np.asarray(data, dtype=float), int(sample_rate), time.perf_counter(), future))
+            self._stats['requests'] += 1
+            self._condition.notify()
+        return future
+
+    def _wait_seconds(self) -> float:
+        """Batching window: max_wait_ms, shortened so waiting plus a typical batch fits the budget"""
+        wait = self.max_wait_ms / 1000
+        if self.latency_budget_ms is not None and self._service_ewma is not None:
+            wait = min(wait, max(0.0, self.latency_budget_ms / 1000 - self._service_ewma))
+        return wait
+
+    def _next_batch(self) -> Optional[Tuple[int, List[Tuple[np.ndarray, int, float, Future]]]]:
+        """Block until a batch is due and take it off the queue; None once shut down"""
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            if not self._queue:
+                return None
+
+            deadline = self._queue[0][2] + self._wait_seconds()
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            # The oldest request's sample rate picks the batch; other rates wait for the next one
+            sample_rate = self._queue[0][1]
+            batch, rest = [], deque()
+            while self._queue:
+                request = self._queue.popleft()
+                if request[1] == sample_rate and len(batch) < self.max_batch_size:
+                    batch.append(request)
+                else:
+                    rest.append(request)
+            self._queue = rest
+            return sample_rate, batch
+
+    def _run(self) -> None:
+        """Dispatcher loop: take batches off the queue and resolve their futures"""
+        while True:
+            due = self._next_batch()
+            if due is None:
+                return
+            sample_rate, batch = due
+            batch = [request for request in batch if request[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                analyzer = self._get_analyzer()
+                results = analyzer.analyze_eeg_batch([data for data, _, _, _ in batch], sample_rate)
+                if len(batch) > 1 and all('error' in result for result in results):
+                    # One bad signal fails the whole batch; rerun singly so only it reports the error
+                    results = [analyzer.analyze_eeg_batch([data], sample_rate)[0] for data, _, _, _ in batch]
+            except Exception as e:
+                logger.error(f"Inference batch failed: {str(e)}")
+                for _, _, _, future in batch:
+                    future.set_exception(e)
+                with self._condition:
+                    self._stats['failed_batches'] += 1
+                continue
+            finished = time.perf_counter()
+
+            for (_, _, _, future), result in zip(batch, results):
+                future.set_result(result)
+            self._record(batch, started, finished)
+
+    def _record(self, batch: List[Tuple[np.ndarray, int, float, Future]], started: float, finished: float) -> None:
+        """Update the histogram, wait and service time statistics for a finished batch"""
+        service = finished - started
+        with self._condition:
+            self._stats['batches'] += 1
+            self._stats['analyzed'] += len(batch)
+            self._histogram[len(batch)] += 1
+            self._wait_total += sum(started - queued for _, _, queued, _ in batch)
+            self._service_ewma = service if self._service_ewma is None else 0.8 * self._service_ewma + 0.2 * service
+            if self.latency_budget_ms is not None:
+                self._stats['over_budget'] += sum(1 for _, _, queued, _ in batch
+                                                  if (finished - queued) * 1000 > self.latency_budget_ms)
+
+    def _get_analyzer(self):
+        """The analyzer batches run on, created on first use"""
+        if self._analyzer is None:
+            from ml_eeg_analyzer import get_ml_analyzer
+            self._analyzer = get_ml_analyzer()
+        return self._analyzer
+
+    def info(self) -> Dict[str, Any]:
+        """Queue depth, settings, batch size histogram and wait/service statistics"""
+        with self._condition:
+            analyzed = self._stats['analyzed']
+            return dict(
+                self._stats,
+                queue_depth=len(self._queue),
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_wait_ms,
+                latency_budget_ms=self.latency_budget_ms,
+                current_wait_ms=self._wait_seconds() * 1000,
+                batch_size_histogram=dict(sorted(self._histogram.items())),
+                mean_batch_size=analyzed / self._stats['batches'] if self._stats['batches'] else 0.0,
+                mean_queue_wait_ms=self._wait_total / analyzed * 1000 if analyzed else 0.0,
+                batch_service_ms=(self._service_ewma or 0.0) * 1000
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the dispatcher after the queued requests are analyzed"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            thread = self._thread
+        if wait and thread is not None:
+            thread.join()
+
+
+# Shared by the API; the dispatcher thread starts with the first request
+inference_scheduler = InferenceScheduler()
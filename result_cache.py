@@ -0,0 +1,196 @@
+"""
+Analysis Result Cache
+Content-addressed cache of serialized API responses
+
+This module provides:
+- ResultCache: two-tier cache keyed by a hash of the signal samples plus the
+  parameters and model version that produced the result
+- In-memory LRU tier bounded by total size in bytes
+- Optional SQLite tier that survives restarts and is shared between processes
+- Hit/miss/eviction counters per tier
+
+Values are stored as the serialized JSON body, so a hit is served without
+recomputing or re-serializing anything.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(signal: np.ndarray, *parts: Any) -> str:
+    """
+    Hex digest of a signal's samples plus any other identifying parts
+
+    Samples are hashed as contiguous float32, the default precision of binary
+    bodies, so a float64 JSON payload and the same signal sent as float32
+    get the same digest. Signals that differ only below float32 precision
+    share a digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(parts).encode())
+    samples = np.ascontiguousarray(signal, dtype=np.float32)
+    digest.update(str(samples.shape).encode())
+    digest.update(memoryview(samples).cast('B'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier content-addressed cache of response bodies
+
+    Args:
+        max_bytes: Memory tier budget, default ML_RESULT_CACHE_MB (64) megabytes; 0 disables caching
+        db_path: SQLite file for the disk tier, default ML_RESULT_CACHE_DB (unset: memory only)
+        max_disk_bytes: Disk tier budget, default ML_RESULT_CACHE_DISK_MB (512) megabytes
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, db_path: Optional[str] = None,
+                 max_disk_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else \
+            int(float(os.environ.get('ML_RESULT_CACHE_MB', 64)) * 1024 * 1024)
+        self.db_path = db_path if db_path is not None else os.environ.get('ML_RESULT_CACHE_DB')
+        self.max_disk_bytes = max_disk_bytes if max_disk_bytes is not None else \
+            int(float(os.environ.get('ML_RESULT_CACHE_DISK_MB', 512)) * 1024 * 1024)
+        self._entries: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+        if self.db_path:
+            with self._connect() as db:
+                db.execute('CREATE TABLE IF NOT EXISTS results '
+                           '(key TEXT PRIMARY KEY, body BLOB, size INTEGER, accessed REAL)')
+
+    @property
+    def enabled(self) -> bool:
+        """False when the memory budget is zero"""
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(namespace: str, signal: np.ndarray, **params: Any) -> str:
+        """
+        Content address of a result
+
+        params should include everything else the result depends on (sample
+        rate, model version, options).
+        """
+        return content_hash(signal, namespace, sorted(params.items()))
+
+    def _connect(self) -> sqlite3.Connection:
+        """New SQLite connection; one per call keeps the store usable from any thread"""
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def get(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Cached body for key
+
+        Returns:
+            (body, tier) with tier 'memory' or 'disk', or (None, None) on a miss
+        """
+        if not self.enabled:
+            return None, None
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                self._stats['memory_hits'] += 1
+                return body, 'memory'
+
+        if self.db_path:
+            with self._connect() as db:
+                row = db.execute('SELECT body FROM results WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    db.execute('UPDATE results SET accessed = ? WHERE key = ?', (time.time(), key))
+            if row is not None:
+                body = bytes(row[0])
+                self._store(key, body)
+                with self._lock:
+                    self._stats['hits'] += 1
+                    self._stats['disk_hits'] += 1
+                return body, 'disk'
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None, None
+
+    def put(self, key: str, body: bytes) -> None:
+        """Store a body in both tiers"""
+        if not self.enabled:
+            return
+        self._store(key, body)
+        if self.db_path:
+            try:
+                with self._connect() as db:
+                    db.execute('INSERT OR REPLACE INTO results (key, body, size, accessed) VALUES (?, ?, ?, ?)',
+                               (key, body, len(body), time.time()))
+                    self._trim_disk(db)
+            except sqlite3.Error as e:
+                # The disk tier is best effort; the memory tier already has the entry
+                logger.warning(f"Result cache disk write failed: {str(e)}")
+
+    def _store(self, key: str, body: bytes) -> None:
+        """Insert into the memory tier and evict least recently used entries over budget"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._stats['evictions'] += 1
+
+    def _trim_disk(self, db: sqlite3.Connection) -> None:
+        """Delete least recently accessed disk entries over budget"""
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        excess = total - self.max_disk_bytes
+        freed = 0
+        stale = []
+        for key, size in db.execute('SELECT key, size FROM results ORDER BY accessed'):
+            stale.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        db.executemany('DELETE FROM results WHERE key = ?', stale)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.db_path:
+            with self._connect() as db:
+                db.execute('DELETE FROM results')
+
+    def info(self) -> Dict[str, Any]:
+        """Entry count, size, budget and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['misses']
+            return dict(
+                self._stats,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+                hit_rate=self._stats['hits'] / lookups if lookups else 0.0,
+                disk_tier=bool(self.db_path)
+            )
+
+
+# Shared by every endpoint in the process
+result_cache = ResultCache()
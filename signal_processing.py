@@ -0,0 +1,262 @@
+"""
+Shared Signal Processing Utilities
+Reusable DSP building blocks for the EEG and sound processing pipelines
+
+This module provides:
+- SOSFilterBank: cached IIR filter designs in second-order-sections form
+- Fused notch + bandpass filtering in a single zero-phase pass
+- StreamingSOSFilter: stateful causal filtering across consecutive chunks
+- BandPowerEngine: rfft/Welch band powers with cached band layouts
+- PolyphaseResampler: anti-aliased rate conversion with cached FIR designs
+"""
+
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import scipy.signal as signal
+
+
+class _LRUCache:
+    """Small thread-safe LRU map that builds missing entries with a factory"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for key, building it with factory() on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = factory()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def info(self) -> Dict[str, int]:
+        """Number of cached entries and hit/miss counters"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class SOSFilterBank:
+    """
+    Cache of IIR filter designs stored as second-order sections
+
+    Each (kind, sample_rate, band, order) combination is designed once and
+    reused afterwards. SOS form avoids the numerical instability of high-order
+    b/a coefficients at low normalized cutoffs, and cascading several designs
+    lets notch and bandpass run in one sosfiltfilt pass.
+    """
+
+    def __init__(self, max_designs: int = 256):
+        self._designs = _LRUCache(max_designs)
+
+    def _get(self, key: Hashable, design: Callable[[], np.ndarray]) -> np.ndarray:
+        """Return the cached design for key, building it with design() on a miss"""
+        return self._designs.get_or_create(key, design)
+
+    def bandpass(self, sample_rate: float, low_freq: float, high_freq: float, order: int = 4) -> np.ndarray:
+        """Butterworth bandpass design in SOS form"""
+        key = ('bandpass', float(sample_rate), float(low_freq), float(high_freq), int(order))
+        return self._get(key, lambda: signal.butter(order, [low_freq, high_freq], btype='band',
+                                                    fs=sample_rate, output='sos'))
+
+    def notch(self, sample_rate: float, notch_freq: float, quality: float = 30.0) -> np.ndarray:
+        """IIR notch design in SOS form"""
+        key = ('notch', float(sample_rate), float(notch_freq), float(quality))
+
+        def design():
+            b, a = signal.iirnotch(notch_freq, quality, sample_rate)
+            return signal.tf2sos(b, a)
+
+        return self._get(key, design)
+
+    def notch_bandpass(self, sample_rate: float, notch_freq: float, low_freq: float, high_freq: float,
+                       order: int = 4, quality: float = 30.0) -> np.ndarray:
+        """Notch followed by bandpass, cascaded into a single SOS array"""
+        key = ('notch_bandpass', float(sample_rate), float(notch_freq), float(low_freq), float(high_freq),
+               int(order), float(quality))
+        return self._get(key, lambda: np.vstack([
+            self.notch(sample_rate, notch_freq, quality),
+            self.bandpass(sample_rate, low_freq, high_freq, order)
+        ]))
+
+    def cache_info(self) -> Dict[str, int]:
+        """Number of cached designs and hit/miss counters"""
+        info = self._designs.info()
+        return {'designs': info['entries'], 'hits': info['hits'], 'misses': info['misses']}
+
+
+class StreamingSOSFilter:
+    """
+    Causal SOS filter that carries its state across consecutive chunks
+
+    Filtering a long recording chunk by chunk gives the same output as one
+    sosfilt call over the whole signal, so sliding-window analysis never has
+    to re-filter overlapping samples. The initial state is the steady-state
+    response to the first sample, which suppresses the start-up transient.
+    """
+
+    def __init__(self, sos: np.ndarray):
+        self.sos = sos
+        self._zi_step = signal.sosfilt_zi(sos)
+        self.zi: Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Forget the filter state so the next chunk starts a new stream"""
+        self.zi = None
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Filter the next chunk along its last axis"""
+        chunk = np.asarray(chunk, dtype=float)
+        if chunk.shape[-1] == 0:
+            return chunk
+        if self.zi is None:
+            # zi shape: (sections, [channels...], 2)
+            first = chunk[..., 0]
+            self.zi = self._zi_step.reshape((self._zi_step.shape[0],) + (1,) * first.ndim + (2,)) * first[..., None]
+        filtered, self.zi = signal.sosfilt(self.sos, chunk, axis=-1, zi=self.zi)
+        return filtered
+
+
+class BandPowerEngine:
+    """
+    Frequency band power estimator with cached band layouts
+
+    Spectra come from a one-sided rfft ('fft') or from Welch's averaged
+    periodogram ('welch'). For each spectrum layout the [start, stop) bin range
+    of every band is computed once and cached, and all bands are then reduced
+    together from a single cumulative sum over the bins. Bands use inclusive
+    edges, so a bin sitting exactly on a shared edge counts towards both bands.
+    """
+
+    METHODS = ('fft', 'welch')
+
+    def __init__(self, bands: Dict[str, Tuple[float, float]], method: str = 'fft',
+                 nperseg: Optional[int] = None, max_layouts: int = 128):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown band power method '{method}'. Use one of {self.METHODS}")
+
+        self.bands = dict(bands)
+        self.method = method
+        self.nperseg = nperseg
+        self._layouts = _LRUCache(max_layouts)
+
+    def _layout(self, freqs: Callable[[], np.ndarray], key: Hashable) -> Tuple[np.ndarray, np.ndarray]:
+        """Bin ranges (starts, stops) of every band for a spectrum layout"""
+        def build():
+            f = freqs()
+            lows = np.array([low for low, _ in self.bands.values()])
+            highs = np.array([high for _, high in self.bands.values()])
+            starts = np.searchsorted(f, lows, side='left')
+            stops = np.searchsorted(f, highs, side='right')
+            return starts, np.maximum(stops, starts)
+
+        return self._layouts.get_or_create(key, build)
+
+    def spectrum(self, data: np.ndarray, sample_rate: float) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+        """Power spectrum along the last axis plus the band layout that matches it"""
+        n = data.shape[-1]
+        if self.method == 'welch':
+            nperseg = min(self.nperseg or int(2 * sample_rate), n)
+            _, psd = signal.welch(data, fs=sample_rate, nperseg=nperseg, axis=-1)
+            layout = self._layout(lambda: np.fft.rfftfreq(nperseg, 1 / sample_rate),
+                                  ('welch', nperseg, float(sample_rate)))
+        else:
+            psd = np.abs(np.fft.rfft(data, axis=-1)) ** 2
+            layout = self.fft_layout(n, sample_rate)
+        return psd, layout
+
+    def fft_layout(self, n: int, sample_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Band bin ranges (starts, stops) for an n-sample rfft"""
+        return self._layout(lambda: np.fft.rfftfreq(n, 1 / sample_rate), ('fft', n, float(sample_rate)))
+
+    def band_powers(self, data: np.ndarray, sample_rate: float) -> Dict[str, np.ndarray]:
+        """Mean spectral power of every band, one value per row of data"""
+        psd, (starts, stops) = self.spectrum(np.atleast_2d(data), sample_rate)
+        return self.reduce_bands(psd, starts, stops)
+
+    def reduce_bands(self, psd: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> Dict[str, np.ndarray]:
+        """Mean of psd over each band's [start, stop) bins along the last axis"""
+        # Prefix sums with a leading zero column: band total = cumulative[stop] - cumulative[start]
+        cumulative = np.zeros(psd.shape[:-1] + (psd.shape[-1] + 1,))
+        np.cumsum(psd, axis=-1, out=cumulative[..., 1:])
+        counts = stops - starts
+        totals = cumulative[..., stops] - cumulative[..., starts]
+        powers = np.divide(totals, counts, out=np.zeros_like(totals), where=counts > 0)
+
+        return {band: powers[..., i] for i, band in enumerate(self.bands)}
+
+    def cache_info(self) -> Dict[str, int]:
+        """Number of cached band layouts and hit/miss counters"""
+        info = self._layouts.info()
+        return {'layouts': info['entries'], 'hits': info['hits'], 'misses': info['misses']}
+
+
+class PolyphaseResampler:
+    """
+    Rational-ratio resampler with cached anti-aliasing filters
+
+    Rates are converted with a polyphase FIR (scipy's resample_poly) whose
+    Kaiser-windowed low-pass design depends only on the reduced up/down
+    ratio. Each design is computed once and reused, so every signal from a
+    device at a given rate skips the filter design. Rate ratios are
+    approximated to a denominator of at most max_denominator.
+    """
+
+    def __init__(self, max_designs: int = 64, kaiser_beta: float = 5.0, max_denominator: int = 1000):
+        self.kaiser_beta = kaiser_beta
+        self.max_denominator = max_denominator
+        self._designs = _LRUCache(max_designs)
+
+    def ratio(self, from_rate: float, to_rate: float) -> Tuple[int, int]:
+        """Reduced (up, down) factors that take from_rate to to_rate"""
+        fraction = Fraction(float(to_rate) / float(from_rate)).limit_denominator(self.max_denominator)
+        return fraction.numerator, fraction.denominator
+
+    def design(self, up: int, down: int) -> np.ndarray:
+        """Low-pass FIR for an up/down conversion, cut off at the lower of the two Nyquist rates"""
+        key = (int(up), int(down), float(self.kaiser_beta))
+
+        def build():
+            max_rate = max(up, down)
+            # Same length and cutoff as resample_poly's own default design
+            return signal.firwin(20 * max_rate + 1, 1.0 / max_rate, window=('kaiser', self.kaiser_beta))
+
+        return self._designs.get_or_create(key, build)
+
+    def resample(self, data: np.ndarray, from_rate: float, to_rate: float, axis: int = -1) -> np.ndarray:
+        """Convert data sampled at from_rate to to_rate along axis"""
+        data = np.asarray(data, dtype=float)
+        up, down = self.ratio(from_rate, to_rate)
+        if up == down:
+            return data
+        return signal.resample_poly(data, up, down, axis=axis, window=self.design(up, down))
+
+    def cache_info(self) -> Dict[str, int]:
+        """Number of cached filter designs and hit/miss counters"""
+        info = self._designs.info()
+        return {'designs': info['entries'], 'hits': info['hits'], 'misses': info['misses']}
+
+
+# Shared filter bank so every processor reuses the same designs
+filter_bank = SOSFilterBank()
+
+# Shared resampler so every preprocessor reuses the same anti-aliasing filters
+resampler = PolyphaseResampler()
@@ -4,13 +4,15 @@ import pandas as pd
 from scipy import signal
 from dotenv import load_dotenv
 import json
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import logging
 from io import StringIO  # Import StringIO from io module
 
 # Import EEG processor
 from eeg_processor import EEGProcessor
+from signal_processing import filter_bank
+from eeg_io import encode_signal, parse_numeric_text, preferred_binary_type, select_channels
 
 # Load environment variables
 load_dotenv()
@@ -36,8 +38,12 @@ class SoundProcessor:
         self.sample_rate = SAMPLE_RATE
         logger.info(f"Initialized SoundProcessor with frequency range: {self.min_freq}-{self.max_freq} Hz")
 
-    def filter_sound(self, data, file_type):
-        """Filter sound data from various file types"""
+    def filter_sound(self, data, file_type, as_list=True):
+        """Filter sound data from various file types
+        
+        With as_list=False the filtered samples stay a NumPy array, for callers
+        that send them back as a binary body instead of JSON.
+        """
         try:
             # Convert data to numpy array if it's not already
             if isinstance(data, list):
@@ -51,7 +57,7 @@ class SoundProcessor:
             # Return filtered data and metadata
             return {
                 'success': True,
-                'filtered_data': filtered_data.tolist() if hasattr(filtered_data, 'tolist') else filtered_data,
+                'filtered_data': filtered_data.tolist() if as_list and hasattr(filtered_data, 'tolist') else filtered_data,
                 'metadata': {
                     'min_freq': self.min_freq,
                     'max_freq': self.max_freq,
@@ -68,44 +74,54 @@ class SoundProcessor:
 
     def _apply_bandpass_filter(self, data):
         """Apply a bandpass filter to the data"""
-        # Normalize frequencies to Nyquist frequency
-        nyq = 0.5 * self.sample_rate
-        low = self.min_freq / nyq
-        high = self.max_freq / nyq
-        
-        # Design filter
-        b, a = signal.butter(4, [low, high], btype='band')
+        # Design is cached per (sample_rate, band, order) in SOS form
+        sos = filter_bank.bandpass(self.sample_rate, self.min_freq, self.max_freq, order=4)
         
         # Apply filter
-        filtered_data = signal.filtfilt(b, a, data)
+        filtered_data = signal.sosfiltfilt(sos, data)
         
         return filtered_data
 
-    def extract_sound_from_csv(self, csv_data):
-        """Extract sound data from CSV file"""
+    def extract_sound_from_csv(self, csv_data, as_list=True, channels=None, time_column=None):
+        """Extract sound data from CSV file
+        
+        The time column is detected (or given) and skipped. Without channels the
+        first remaining numeric column is filtered; with a list of channels they
+        are all filtered in one pass and returned as (channels, samples).
+        """
         try:
             # Parse CSV data
             df = pd.read_csv(StringIO(csv_data))
             
-            # Look for columns that might contain audio data
-            # This is a simplified approach - in reality, you'd need more sophisticated detection
-            numeric_cols = df.select_dtypes(include=[np.number]).columns
+            try:
+                selected, time_column = select_channels(df, channels, time_column)
+            except ValueError as e:
+                return {'success': False, 'error': str(e)}
             
-            if len(numeric_cols) == 0:
-                return {'success': False, 'error': 'No numeric columns found in CSV'}
-            
-            # Use the first numeric column as audio data (simplified approach)
-            audio_data = df[numeric_cols[0]].values
+            if channels:
+                audio_data = df[selected].to_numpy(dtype=float).T
+            else:
+                selected = selected[:1]
+                audio_data = df[selected[0]].values
             
             # Apply filtering
-            return self.filter_sound(audio_data, 'csv')
+            result = self.filter_sound(audio_data, 'csv', as_list)
+            if result['success']:
+                result['metadata']['channels'] = [str(name) for name in selected]
+                result['metadata']['time_column'] = time_column
+            return result
         except Exception as e:
             logger.error(f"Error extracting sound from CSV: {str(e)}")
             return {'success': False, 'error': str(e)}
 
-    def extract_sound_from_text(self, text_data):
+    def extract_sound_from_text(self, text_data, as_list=True):
         """Extract sound data from text file"""
         try:
+            # Fast path: regular numeric text parsed by NumPy's C reader
+            numeric_data = parse_numeric_text(text_data)
+            if numeric_data is not None and len(numeric_data) > 0:
+                return self.filter_sound(numeric_data, 'txt', as_list)
+            
             # Split by lines and try to convert to numbers
             lines = text_data.strip().split('\n')
             
@@ -124,7 +140,7 @@ class SoundProcessor:
                 return {'success': False, 'error': 'No numeric data found in text file'}
             
             # Apply filtering
-            return self.filter_sound(np.array(numeric_data), 'txt')
+            return self.filter_sound(np.array(numeric_data), 'txt', as_list)
         except Exception as e:
             logger.error(f"Error extracting sound from text: {str(e)}")
             return {'success': False, 'error': str(e)}
@@ -137,7 +153,16 @@ eeg_processor = EEGProcessor()
 
 @app.route('/api/filter-sound', methods=['POST'])
 def filter_sound_api():
-    """API endpoint to filter sound from uploaded files"""
+    """API endpoint to filter sound from uploaded files
+    
+    Send 'Accept: application/octet-stream' (raw little-endian float32) or
+    'Accept: application/x-npy' to receive the filtered samples as a binary
+    body with the metadata in X-Sound-* headers instead of a JSON list.
+    
+    For CSV content, optional 'channels' (list of column names) and
+    'timeColumn' select the columns; several channels come back as a
+    (channels, samples) array, raw bodies in row-major order.
+    """
     try:
         # Get request data
         data = request.json
@@ -147,18 +172,32 @@ def filter_sound_api():
         
         file_content = data['fileContent']
         file_type = data['fileType'].lower()
+        binary_type = preferred_binary_type(request.accept_mimetypes)
         
         # Process based on file type
         if file_type == 'csv':
-            result = sound_processor.extract_sound_from_csv(file_content)
+            result = sound_processor.extract_sound_from_csv(file_content, as_list=binary_type is None,
+                                                            channels=data.get('channels'),
+                                                            time_column=data.get('timeColumn'))
         elif file_type == 'txt':
-            result = sound_processor.extract_sound_from_text(file_content)
+            result = sound_processor.extract_sound_from_text(file_content, as_list=binary_type is None)
         elif file_type in ['edf', 'pdf']:
             # These would require specialized libraries
             result = {'success': False, 'error': f'{file_type.upper()} processing requires specialized libraries'}
         else:
             result = {'success': False, 'error': f'Unsupported file type: {file_type}'}
         
+        if binary_type is not None and result.get('success'):
+            body, content_type = encode_signal(result['filtered_data'], binary_type)
+            metadata = result['metadata']
+            return Response(body, mimetype=content_type, headers={
+                'X-Sound-Min-Freq': str(metadata['min_freq']),
+                'X-Sound-Max-Freq': str(metadata['max_freq']),
+                'X-Sound-Sample-Rate': str(metadata['sample_rate']),
+                'X-Sound-File-Type': metadata['file_type'],
+                'X-Sound-Channels': ','.join(metadata.get('channels', []))
+            })
+        
         return jsonify(result)
     except Exception as e:
         logger.error(f"API error: {str(e)}")
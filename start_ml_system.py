@@ -170,10 +170,13 @@ def print_system_info():
     print("\n🔧 Available Endpoints:")
     print("   • POST /api/analyze - Analyze EEG data")
     print("   • POST /api/analyze-file - Analyze uploaded file")
+    print("   • POST /api/analyze-stream - Sliding-window analysis (NDJSON)")
     print("   • GET /api/model-info - Get model information")
     print("   • POST /api/features - Extract features")
+    print("   • GET /api/risk-scores/<signal_id> - Risk scores of a featurized signal")
     print("   • POST /api/validate - Validate data")
     print("   • POST /api/batch-analyze - Batch analysis")
+    print("   • GET /api/jobs/<job_id> - Poll an async analysis job")
     
     print("\n📚 Documentation:")
     print("   • README_ML.md - Complete system documentation")
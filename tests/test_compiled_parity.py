@@ -0,0 +1,43 @@
+"""TorchScript backend: parity with eager PyTorch and off-request-path compilation"""
+
+import pytest
+import torch
+
+from ml_eeg_analyzer import EEGEnsembleModel
+
+LENGTH = 512
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return EEGEnsembleModel(backend='torchscript', transformer_patch_size=32)
+
+
+def test_compiled_outputs_match_eager(model):
+    differences = model.verify_compiled(LENGTH)
+    assert set(differences) == {'eegnet', 'lstm_model', 'transformer_model', 'ensemble'}
+    for name, difference in differences.items():
+        assert difference < 1e-5, f"{name} differs from eager by {difference}"
+
+
+def test_uncompiled_shape_is_served_eagerly(model):
+    data_tensor = torch.randn(1, 1, LENGTH)
+    eager = model.networks()
+
+    # Below the request threshold nothing is compiled
+    for _ in range(model.COMPILE_AFTER_REQUESTS - 1):
+        assert model._serving_networks(data_tensor) == eager
+    assert not model._building
+
+    # The threshold request starts a background build and is still served eagerly unless it already finished
+    served = model._serving_networks(data_tensor)
+    compiled = model.compiled_networks((1, LENGTH))
+    assert served in (eager, compiled)
+    assert model._serving_networks(data_tensor) is compiled
+
+
+def test_quantizing_discards_compiled_networks(model):
+    model.compiled_networks((1, LENGTH))
+    model.quantize_networks('linear')
+    assert not model._compiled and not model._building
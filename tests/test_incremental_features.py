@@ -0,0 +1,37 @@
+"""Incremental sliding-window features match batch extraction on every window"""
+
+import numpy as np
+import pytest
+
+from ml_eeg_analyzer import EEGPreprocessor, IncrementalFeatureAccumulator
+from signal_processing import StreamingSOSFilter
+
+SAMPLE_RATE = 256
+WINDOW = 1024
+HOP = 128
+
+
+@pytest.fixture
+def filtered():
+    rng = np.random.default_rng(1)
+    t = np.arange(30 * SAMPLE_RATE) / SAMPLE_RATE
+    # A decaying amplitude shrinks the window range, which stale histogram edges would miss
+    x = 50 * np.sin(2 * np.pi * 10 * t) * np.exp(-t / 8) + rng.standard_normal(len(t))
+    preprocessor = EEGPreprocessor(SAMPLE_RATE)
+    return StreamingSOSFilter(preprocessor.filter_bank.notch_bandpass(
+        SAMPLE_RATE, preprocessor.notch_freq, 0.5, 40.0, 4, 30)).process(x)
+
+
+@pytest.mark.parametrize('metrics', [[], ['sample_entropy', 'permutation_entropy']])
+def test_incremental_features_match_batch(filtered, metrics):
+    preprocessor = EEGPreprocessor(SAMPLE_RATE, complexity_metrics=metrics)
+    accumulator = IncrementalFeatureAccumulator(WINDOW, preprocessor)
+    accumulator.push(filtered[:WINDOW])
+    for k in range(45):
+        if k:
+            accumulator.push(filtered[WINDOW + (k - 1) * HOP:WINDOW + k * HOP])
+        expected = preprocessor.extract_features(filtered[k * HOP:k * HOP + WINDOW], filtered=True)
+        features = accumulator.features()
+        assert set(features) == set(expected)
+        for name, value in expected.items():
+            assert features[name] == pytest.approx(value, rel=1e-6, abs=1e-9), f"{name} in window {k}"
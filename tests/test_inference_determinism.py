@@ -0,0 +1,71 @@
+"""Frozen inference mode: repeated predictions are identical and batch norm folding preserves outputs"""
+
+import copy
+
+import numpy as np
+import pytest
+import torch
+
+from ml_eeg_analyzer import EEGEnsembleModel, EEGNet
+
+LENGTH = 512
+
+
+@pytest.fixture
+def model():
+    torch.manual_seed(0)
+    return EEGEnsembleModel(transformer_patch_size=32)
+
+
+@pytest.fixture
+def signals():
+    rng = np.random.default_rng(0)
+    return [rng.standard_normal(LENGTH) for _ in range(3)]
+
+
+def test_repeated_probabilities_are_identical(model, signals):
+    data_tensor = torch.FloatTensor(np.stack(signals)).unsqueeze(1)
+    first, first_evaluated = model._ensemble_probabilities(data_tensor)
+    second, second_evaluated = model._ensemble_probabilities(data_tensor)
+    assert torch.equal(first, second)
+    assert first_evaluated == second_evaluated
+
+
+def test_repeated_predict_is_identical(model, signals):
+    first = model.predict(signals[0])
+    second = model.predict(signals[0])
+    assert (first['predicted_class'], first['confidence']) == (second['predicted_class'], second['confidence'])
+
+
+def test_repeated_predict_batch_is_identical(model, signals):
+    first = model.predict_batch(signals)
+    second = model.predict_batch(signals)
+    assert [(r['predicted_class'], r['confidence']) for r in first] == \
+        [(r['predicted_class'], r['confidence']) for r in second]
+
+
+def test_fold_batch_norm_preserves_eval_outputs():
+    torch.manual_seed(0)
+    network = EEGNet()
+    # Non-trivial statistics and affine parameters, as after training
+    for bn in (network.temporal_bn, network.spatial_bn, network.separable_bn, network.pointwise_bn):
+        with torch.no_grad():
+            bn.running_mean.uniform_(-0.5, 0.5)
+            bn.running_var.uniform_(0.5, 2.0)
+            bn.weight.uniform_(0.5, 1.5)
+            bn.bias.uniform_(-0.2, 0.2)
+    network.eval()
+    folded = copy.deepcopy(network)
+    folded.fold_batch_norm()
+
+    inputs = torch.randn(4, 1, LENGTH)
+    with torch.inference_mode():
+        difference = (network(inputs) - folded(inputs)).abs().max().item()
+    assert difference < 1e-6
+
+    # The folded state dict still loads into an unfolded EEGNet with the same outputs
+    unfolded = EEGNet()
+    unfolded.load_state_dict(folded.state_dict())
+    unfolded.eval()
+    with torch.inference_mode():
+        assert (unfolded(inputs) - folded(inputs)).abs().max().item() < 1e-6
@@ -0,0 +1,48 @@
+"""The 100-sample minimum counts samples after resampling to the canonical analysis rate"""
+
+import io
+
+import numpy as np
+import pytest
+
+import ml_api
+
+SAMPLE_RATE = 1000
+
+
+@pytest.fixture
+def client():
+    return ml_api.app.test_client()
+
+
+def _signal(length):
+    return np.sin(2 * np.pi * 10 * np.arange(length) / SAMPLE_RATE)
+
+
+def test_minimum_scales_with_the_input_rate():
+    analyzer = ml_api.get_ml_analyzer()
+    rate = analyzer.analysis_rate(SAMPLE_RATE)
+    minimum = analyzer.min_input_samples(SAMPLE_RATE)
+    assert minimum == int(np.ceil(100 * SAMPLE_RATE / rate))
+    assert len(analyzer.to_analysis_rate(_signal(minimum), SAMPLE_RATE)[0]) >= 100
+
+
+def test_short_high_rate_signal_is_rejected(client):
+    response = client.post('/api/analyze', json={'data': _signal(100).tolist(), 'sample_rate': SAMPLE_RATE})
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Insufficient data points')
+
+
+def test_short_high_rate_file_is_rejected(client):
+    body = io.BytesIO('\n'.join(str(value) for value in _signal(100)).encode())
+    response = client.post('/api/analyze-file', data={'file': (body, 'short.txt'), 'sample_rate': SAMPLE_RATE},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Insufficient data points')
+
+
+def test_minimum_length_high_rate_signal_is_analyzed(client):
+    minimum = ml_api.get_ml_analyzer().min_input_samples(SAMPLE_RATE)
+    response = client.post('/api/analyze', json={'data': _signal(minimum).tolist(), 'sample_rate': SAMPLE_RATE})
+    assert response.status_code == 200
+    assert 'error' not in response.get_json()
@@ -0,0 +1,41 @@
+"""Streamed windows land on the same samples however the recording is chunked"""
+
+import numpy as np
+import pytest
+
+from ml_eeg_analyzer import get_ml_analyzer
+
+SAMPLE_RATE = 256
+
+
+@pytest.fixture
+def recording():
+    rng = np.random.default_rng(0)
+    t = np.arange(10 * SAMPLE_RATE) / SAMPLE_RATE
+    return np.sin(2 * np.pi * 10 * t) + 0.3 * rng.standard_normal(len(t))
+
+
+def _chunks(signal, size):
+    return (signal[start:start + size] for start in range(0, len(signal), size))
+
+
+@pytest.mark.parametrize('window_seconds, hop_seconds', [(1.0, 1.5), (1.0, 0.5)])
+def test_chunked_stream_matches_one_shot(recording, window_seconds, hop_seconds):
+    analyzer = get_ml_analyzer()
+    # 100 divides neither hop (384 or 128 samples) nor window (256 samples)
+    one_shot = list(analyzer.analyze_stream(recording, SAMPLE_RATE, window_seconds, hop_seconds))
+    chunked = list(analyzer.analyze_stream(_chunks(recording, 100), SAMPLE_RATE, window_seconds, hop_seconds))
+
+    assert len(chunked) == len(one_shot) > 1
+    for expected, result in zip(one_shot, chunked):
+        assert (result['start_sample'], result['end_sample']) == (expected['start_sample'], expected['end_sample'])
+        assert result['confidence'] == pytest.approx(expected['confidence'], abs=1e-6)
+        assert result['features']['total_power'] == pytest.approx(expected['features']['total_power'], rel=1e-6)
+
+
+def test_windows_analyze_the_samples_they_report(recording):
+    analyzer = get_ml_analyzer()
+    model = analyzer.get_ensemble(SAMPLE_RATE)
+    for result in analyzer.analyze_stream(_chunks(recording, 100), SAMPLE_RATE, 1.0, 1.5):
+        direct = model.predict(recording[result['start_sample']:result['end_sample']])
+        assert result['confidence'] == pytest.approx(direct['confidence'], abs=1e-6)